@@ -1,8 +1,13 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import json
-import numpy as np
+import time
+from config import REGRESSORS
+from dashboard_data import FEATURE_LABELS
+from scenarios import monte_carlo_paths, evaluate, summarize
+from chart_prep import COMPARISON_VIEWS, with_selected_country
+from dashboard_cache import (load_overview, load_country, load_comparison_spec, load_country_backtest, load_scenario_base,
+                             load_country_vintages, country_csv)
 
 # --- Configuration ---
 st.set_page_config(
@@ -12,69 +17,34 @@ st.set_page_config(
 )
 
 # --- Data Loading ---
-@st.cache_data
-def load_data():
-    """Loads all necessary data for the dashboard."""
-    try:
-        # Load forecasting results
-        with open('forecasting_results.json', 'r') as f:
-            results = json.load(f)
-        
-        # Convert forecasts to a single DataFrame
-        all_forecasts = []
-        for country, data in results['forecasts'].items():
-            df = pd.DataFrame(data)
-            df['ds'] = pd.to_datetime(df['ds'])
-            all_forecasts.append(df)
-        df_forecast = pd.concat(all_forecasts, ignore_index=True)
-        
-        # Load feature importance
-        df_importance = pd.read_csv('feature_importance_data.csv')
-        
-        # Load model metrics
-        df_metrics = pd.DataFrame.from_dict(results['metrics'], orient='index')
-        df_metrics.index.name = 'Country'
-        df_metrics = df_metrics.reset_index()
-        
-        # Load insights
-        with open('eda_insights.txt', 'r') as f:
-            eda_insights = f.read()
-        with open('model_insights.txt', 'r') as f:
-            model_insights = f.read()
-            
-        return df_forecast, df_importance, df_metrics, eda_insights, model_insights
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return None, None, None, None, None
-
-df_forecast, df_importance, df_metrics, eda_insights, model_insights = load_data()
-
-if df_forecast is None:
+# All data comes from the cached loaders of dashboard_cache.py, so a rerun (any widget
+# interaction) only touches the data of the selected country.
+df_metrics, df_importance, eda_insights, model_insights = load_overview()
+
+if df_metrics is None:
     st.stop()
 
 # --- Sidebar ---
 st.sidebar.title("Dashboard Controls")
-countries = df_forecast['Country'].unique().tolist()
+countries = df_metrics['Country'].tolist()
 selected_country = st.sidebar.selectbox("Select Country", countries)
 
 # --- Main Content ---
 st.title(f"GDP Growth Forecasting MVP: {selected_country}")
 st.markdown("A time-series forecasting application for the GDP growth of key African economies.")
 
-# Filter data for the selected country
-df_country = df_forecast[df_forecast['Country'] == selected_country].copy()
-df_country_metrics = df_metrics[df_metrics['Country'] == selected_country].iloc[0]
-df_country_importance = df_importance[df_importance['Country'] == selected_country].copy()
+# Data of the selected country, already split into actuals and forecasts
+country_data = load_country(selected_country)
+df_country_metrics = country_data.metrics
+df_country_importance = country_data.importance
+df_historical = country_data.historical
+df_forecast_viz = country_data.forecast_viz
 
 # --- 1. Historical Trends and Forecast ---
 st.header("1. Historical Trends and 5-Year Forecast (2021-2025)")
 
-# Separate historical and forecast data for visualization
-df_historical = df_country[df_country['type'].isin(['Historical (Train)', 'Historical (Test)'])].copy()
-df_forecast_viz = df_country[df_country['type'].isin(['Forecast (Test)', 'Forecast (Future)'])].copy()
-
 # Create the base chart
-base = alt.Chart(df_country).encode(
+base = alt.Chart(df_historical).encode(
     x=alt.X('ds:T', title='Year')
 )
 
@@ -83,8 +53,6 @@ historical_line = base.mark_line(point=True).encode(
     y=alt.Y('y:Q', title='GDP Growth (Annual %)'),
     color=alt.value('darkblue'),
     tooltip=[alt.Tooltip('ds:T', title='Year', format='%Y'), alt.Tooltip('y:Q', title='Actual Growth', format='.2f')]
-).transform_filter(
-    alt.FieldOneOfPredicate(field='type', oneOf=['Historical (Train)', 'Historical (Test)'])
 )
 
 # Forecast line (Predicted)
@@ -108,7 +76,28 @@ chart = (confidence_interval + historical_line + forecast_line).properties(
     title=f'GDP Growth: Historical vs. Forecast for {selected_country}'
 ).interactive()
 
-st.altair_chart(chart, use_container_width=True)
+st.altair_chart(chart, width='stretch')
+
+# Forecasts of the country made with earlier releases of the source data (vintages.py)
+vintage_forecasts = load_country_vintages(selected_country)
+if vintage_forecasts is not None and vintage_forecasts['Vintage'].nunique() > 1:
+    st.subheader("Forecast Revisions Across Data Vintages")
+    vintage_ids = vintage_forecasts['Vintage'].unique().tolist()
+    compared = st.multiselect("Compare the forecasts of the vintages", vintage_ids, default=vintage_ids[-2:])
+    df_compared = vintage_forecasts[vintage_forecasts['Vintage'].isin(compared)]
+
+    vintage_chart = alt.Chart(df_compared).mark_line(point=True).encode(
+        x=alt.X('ds:T', title='Year'),
+        y=alt.Y('y:Q', title='Forecasted GDP Growth (Annual %)'),
+        color=alt.Color('Vintage:N', sort=vintage_ids),
+        tooltip=['Vintage', alt.Tooltip('ds:T', title='Year', format='%Y'), alt.Tooltip('y:Q', title='Forecasted Growth', format='.2f')]
+    ).properties(title=f'GDP Growth Forecast for {selected_country} by Data Vintage')
+    st.altair_chart(vintage_chart, width='stretch')
+
+    if len(compared) > 1:
+        revisions = df_compared.assign(Year=df_compared['ds'].dt.year).pivot(index='Year', columns='Vintage', values='y')[compared]
+        revisions[f'Revision ({compared[0]} to {compared[-1]})'] = revisions[compared[-1]] - revisions[compared[0]]
+        st.dataframe(revisions.style.format('{:.2f}'), width='stretch')
 
 # --- 2. Model Performance and Feature Importance ---
 col1, col2 = st.columns(2)
@@ -118,25 +107,37 @@ with col1:
     st.metric(label="Root Mean Squared Error (RMSE)", value=f"{df_country_metrics['RMSE']:.4f}")
     st.metric(label="Mean Absolute Error (MAE)", value=f"{df_country_metrics['MAE']:.4f}")
     st.metric(label="Mean Absolute Percentage Error (MAPE)", value=f"{df_country_metrics['MAPE']:.2f}%")
+    if pd.notna(df_country_metrics.get('sMAPE')):
+        st.metric(label="Symmetric MAPE (sMAPE)", value=f"{df_country_metrics['sMAPE']:.2f}%")
+    if pd.notna(df_country_metrics.get('MASE')):
+        st.metric(label="Mean Absolute Scaled Error (MASE)", value=f"{df_country_metrics['MASE']:.2f}")
     
     st.markdown(f"""
     **Interpretation:**
     - The model's average absolute error (MAE) is **{df_country_metrics['MAE']:.2f}** percentage points.
-    - The high MAPE for countries like Nigeria and South Africa is likely due to actual GDP growth values being close to zero in the test period, which inflates the percentage error.
+    - The high MAPE for countries like Nigeria and South Africa is likely due to actual GDP growth values being close to zero in the test period, which inflates the percentage error. sMAPE and MASE do not have this problem; a MASE below 1 means the forecast beats carrying the last year's growth forward.
     """)
 
+    # Rolling-origin backtest (backtest.py): error over many training cutoffs, not just 2015
+    country_backtest = load_country_backtest(selected_country)
+    if country_backtest is not None:
+        backtest_summary, first_cutoff, last_cutoff = country_backtest
+        st.subheader("Rolling-Origin Backtest")
+        st.markdown(
+            f"Mean error over the training cutoffs {first_cutoff}-{last_cutoff}, "
+            f"per model. The forecasts use the model with the lowest RMSE (**{df_country_metrics.get('model', 'prophet')}**)."
+        )
+        st.dataframe(
+            backtest_summary.style.format({
+                column: fmt for column, fmt in {'RMSE': '{:.3f}', 'MAE': '{:.3f}', 'sMAPE': '{:.1f}%', 'MASE': '{:.2f}'}.items()
+                if column in backtest_summary.columns
+            }),
+            width='stretch'
+        )
+
 with col2:
     st.header("3. Feature Importance (Average Absolute Effect)")
     
-    # Sort by importance and rename features for display
-    df_country_importance['Feature'] = df_country_importance['Feature'].replace({
-        'Fiscal_Balance': 'Fiscal Balance',
-        'Current_Account_Balance': 'Current Account Balance',
-        'Inflation': 'Inflation',
-        'Trend': 'Prophet Trend',
-        'Seasonality': 'Prophet Seasonality'
-    })
-    
     # Bar chart for feature importance
     importance_chart = alt.Chart(df_country_importance).mark_bar().encode(
         x=alt.X('Importance:Q', title='Average Absolute Effect on Forecast'),
@@ -146,27 +147,68 @@ with col2:
         title=f'Drivers of GDP Growth Forecast for {selected_country}'
     )
     
-    st.altair_chart(importance_chart, use_container_width=True)
+    st.altair_chart(importance_chart, width='stretch')
+
+# --- 4. What-If Scenarios ---
+# The country's fitted model is prepared once (cached); every change of the controls then
+# evaluates all the scenario paths at once, in milliseconds (see scenarios.py).
+st.header("4. What-If Scenarios for the Regressors (2021-2025)")
+with st.spinner("Preparing the scenario model..."):
+    scenario_base = load_scenario_base(selected_country)
+
+if scenario_base is None:
+    st.info("The scenarios need the split data of the pipeline. Run `python pipeline.py` first.")
+else:
+    if scenario_base.model not in ('prophet', 'pooled'):
+        st.info(f"{selected_country} is forecast with the {scenario_base.model} baseline, which does not use the regressors: every scenario has the same forecast.")
+
+    # Shift of every regressor from its forecast, around which the random paths are drawn
+    shift_cols = st.columns(len(REGRESSORS) + 1)
+    shift = [
+        col.slider(f"{FEATURE_LABELS.get(regressor, regressor)} (change vs. forecast)", -10.0, 10.0, 0.0, 0.5)
+        for col, regressor in zip(shift_cols, REGRESSORS)
+    ]
+    n_paths = shift_cols[-1].select_slider("Random paths", options=[100, 1000, 10000], value=1000)
+
+    start_time = time.perf_counter()
+    scenario_forecasts = evaluate(scenario_base, monte_carlo_paths(scenario_base, n_paths, shift))
+    df_scenarios = summarize(scenario_base, scenario_forecasts)
+    scenario_seconds = time.perf_counter() - start_time
+
+    base_scenarios = alt.Chart(df_scenarios).encode(x=alt.X('ds:T', title='Year'))
+    outer_band = base_scenarios.mark_area(opacity=0.2, color='darkorange').encode(
+        y=alt.Y('q05:Q', title='GDP Growth (Annual %)'), y2='q95:Q'
+    )
+    inner_band = base_scenarios.mark_area(opacity=0.4, color='darkorange').encode(y='q25:Q', y2='q75:Q')
+    median_line = base_scenarios.mark_line(point=True, color='darkorange').encode(
+        y='q50:Q',
+        tooltip=[alt.Tooltip('ds:T', title='Year', format='%Y'), alt.Tooltip('q50:Q', title='Median', format='.2f'),
+                 alt.Tooltip('q05:Q', title='5th Percentile', format='.2f'), alt.Tooltip('q95:Q', title='95th Percentile', format='.2f')]
+    )
+    reference_line = base_scenarios.mark_line(strokeDash=[5, 5], color='red').encode(
+        y='reference:Q',
+        tooltip=[alt.Tooltip('ds:T', title='Year', format='%Y'), alt.Tooltip('reference:Q', title='Forecast Regressors', format='.2f')]
+    )
+    scenario_chart = (outer_band + inner_band + median_line + reference_line).properties(
+        title=f"GDP Growth under {n_paths} Regressor Paths for {selected_country} (median, 25-75% and 5-95%)"
+    )
+    st.altair_chart(scenario_chart, width='stretch')
+    st.caption(f"Dashed: the regressors at their forecast values (the stored forecast). Evaluated {n_paths} scenarios in {scenario_seconds * 1000:.1f} ms.")
 
-# --- 4. Country Comparison and Insights ---
-st.header("4. Country Comparison and Key Insights")
+# --- 5. Country Comparison and Insights ---
+st.header("5. Country Comparison and Key Insights")
 
 # Comparison Table (Metrics)
 st.subheader("Model Performance Comparison")
-st.dataframe(df_metrics.set_index('Country').style.format({'RMSE': '{:.4f}', 'MAE': '{:.4f}', 'MAPE': '{:.2f}%'}), use_container_width=True)
+st.dataframe(df_metrics.set_index('Country').style.format({'RMSE': '{:.4f}', 'MAE': '{:.4f}', 'MAPE': '{:.2f}%'}), width='stretch')
 
-# Comparison Chart (Historical) - Re-using the historical line chart logic for all countries
+# Comparison Chart (Historical) - a precomputed summary of all countries, with the selected
+# country drawn on top
 st.subheader("Historical GDP Growth Comparison (1981-2020)")
-base_comp = alt.Chart(df_historical).encode(
-    x=alt.X('ds:T', title='Year'),
-    y=alt.Y('y:Q', title='GDP Growth (Annual %)'),
-    color=alt.Color('Country:N'),
-    tooltip=[alt.Tooltip('ds:T', title='Year', format='%Y'), alt.Tooltip('y:Q', title='Growth', format='.2f'), 'Country']
-).properties(
-    title='Historical GDP Growth: Kenya vs. Nigeria vs. South Africa'
-).interactive()
-
-st.altair_chart(base_comp.mark_line(point=True), use_container_width=True)
+comparison_view = st.radio("Compare with", COMPARISON_VIEWS, horizontal=True)
+comparison_spec = with_selected_country(load_comparison_spec(comparison_view), df_historical, selected_country)
+st.vega_lite_chart(comparison_spec, width='stretch')
+st.caption(f"{selected_country} is shown in black.")
 
 # Textual Insights
 st.subheader("Textual Insights")
@@ -177,11 +219,7 @@ with st.expander("Expand for Model Performance and Forecast Insights"):
     st.markdown(model_insights)
     
 # --- Optional: Allow download of forecast data as CSV ---
-@st.cache_data
-def convert_df_to_csv(df):
-    return df.to_csv(index=False).encode('utf-8')
-
-csv = convert_df_to_csv(df_country)
+csv = country_csv(selected_country)
 
 st.sidebar.download_button(
     label="Download Forecast Data as CSV",
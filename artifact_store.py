@@ -0,0 +1,172 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import span
+
+# Intermediate datasets passed between pipeline stages are stored as Parquet files in
+# this directory. Parquet keeps the column dtypes (including the 'ds' datetimes), so the
+# next stage does not have to re-parse text or call pd.to_datetime again.
+ARTIFACT_DIR = 'artifacts'
+
+# Also write each artifact as '<name>.csv' in the project root, as the stages did before.
+# Set AEO_EXPORT_CSV=0 to skip the CSV copies.
+EXPORT_CSV = os.environ.get('AEO_EXPORT_CSV', '1') != '0'
+
+
+def artifact_path(name):
+    """Returns the Parquet path of the artifact `name`."""
+    return os.path.join(ARTIFACT_DIR, f'{name}.parquet')
+
+
+def csv_path(name):
+    """Returns the path of the CSV export of the artifact `name`."""
+    return f'{name}.csv'
+
+
+def artifact_exists(name):
+    """Checks whether the artifact `name` is available (as Parquet or as a CSV export)."""
+    return os.path.exists(artifact_path(name)) or os.path.exists(csv_path(name))
+
+
+def write_artifact(df, name, export_csv=None, float_format=None):
+    """Saves `df` as the artifact `name`, and optionally as a CSV export (with its floats
+    formatted with `float_format`, e.g. '%.10g'; the Parquet file keeps them exactly)."""
+    os.makedirs(ARTIFACT_DIR, exist_ok=True)
+    if export_csv is None:
+        export_csv = EXPORT_CSV
+    with span('artifact.write', artifact=name, rows=len(df), csv=export_csv):
+        df.to_parquet(artifact_path(name), index=False)
+        if export_csv:
+            df.to_csv(csv_path(name), index=False, float_format=float_format)
+
+
+def write_artifact_chunks(chunks, name, export_csv=None, transform=None):
+    """Saves an iterable of DataFrames as the artifact `name`, one Parquet row group per chunk.
+
+    Only one chunk is held in memory at a time, so large inputs can be streamed to the store.
+    The chunks must have the same columns; their types are taken from the first non-empty
+    chunk. `transform` (e.g. compact.compact_panel) is applied to every chunk before it is
+    written to Parquet; the CSV export keeps the chunks as they are. The artifact is replaced
+    only once every chunk has been written. Returns the number of chunk rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if export_csv is None:
+        export_csv = EXPORT_CSV
+    os.makedirs(ARTIFACT_DIR, exist_ok=True)
+    path = artifact_path(name)
+    tmp_path = path + '.tmp'
+    tmp_csv_path = csv_path(name) + '.tmp'
+
+    writer = None
+    n_rows = 0
+    columns = None
+    try:
+        for chunk in chunks:
+            columns = chunk.columns
+            if chunk.empty:
+                continue
+            table = pa.Table.from_pandas(transform(chunk) if transform else chunk, preserve_index=False)
+            if writer is None:
+                # Categorical columns get the smallest code type of their chunk's categories,
+                # so the dictionary indices are widened to int32 for all the chunks to fit
+                schema = pa.schema([
+                    field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+                    if pa.types.is_dictionary(field.type) else field
+                    for field in table.schema
+                ], metadata=table.schema.metadata)
+                writer = pq.ParquetWriter(tmp_path, schema)
+            writer.write_table(table.cast(writer.schema))
+            if export_csv:
+                chunk.to_csv(tmp_csv_path, mode='w' if n_rows == 0 else 'a', header=n_rows == 0, index=False)
+            n_rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        # No rows at all: store an empty table with the columns of the chunks
+        empty = pd.DataFrame(columns=columns)
+        write_artifact(transform(empty) if transform else empty, name, export_csv=False)
+        if export_csv:
+            empty.to_csv(csv_path(name), index=False)
+        return 0
+
+    os.replace(tmp_path, path)
+    if export_csv:
+        os.replace(tmp_csv_path, csv_path(name))
+    return n_rows
+
+
+def splice_csv(path, rows, new_rows, n_previous, **to_csv_kwargs):
+    """Rewrites the CSV export `path` with the rows `rows` of the current file, where -1
+    stands for the next row of the DataFrame `new_rows` (formatted with
+    `to_csv(**to_csv_kwargs)`).
+
+    Formatting the values is what makes a CSV export slow, so a few new rows cost about the
+    time of copying the file. Returns False, without writing anything, if the file is
+    missing or does not have the header of `new_rows` and `n_previous` rows.
+    """
+    if n_previous == 0 or not os.path.exists(path):
+        return False
+    with open(path, 'rb') as f:
+        lines = f.read().split(b'\n')
+    header = new_rows.iloc[:0].to_csv(index=False, **to_csv_kwargs).encode('utf-8')
+    if len(lines) != n_previous + 2 or lines[-1] != b'' or lines[0] + b'\n' != header:
+        return False
+
+    rows = np.asarray(rows)
+    new = rows < 0
+    spliced = np.array(lines[1:-1], dtype=object)[np.where(new, 0, rows)]
+    if new.any():
+        formatted = new_rows.to_csv(index=False, header=False, **to_csv_kwargs).encode('utf-8').split(b'\n')[:-1]
+        if len(formatted) != new.sum():
+            # (A value with a line break)
+            return False
+        spliced[new] = formatted
+    with open(path + '.tmp', 'wb') as f:
+        f.write(header + b'\n'.join(spliced) + b'\n')
+    os.replace(path + '.tmp', path)
+    return True
+
+
+def read_artifact(name, columns=None, countries=None, country_col='Country'):
+    """Loads the artifact `name`.
+
+    `columns` restricts the read to the given columns and `countries` to the rows whose
+    `country_col` is in that list. Both are pushed down to the Parquet reader, so only
+    the requested data is decoded. If only the CSV export exists (e.g. a checkout that
+    predates the artifact store), it is read instead and 'ds' is parsed as datetime.
+    """
+    path = artifact_path(name)
+    with span('artifact.read', artifact=name) as fields:
+        if os.path.exists(path):
+            filters = [(country_col, 'in', list(countries))] if countries is not None else None
+            df = pd.read_parquet(path, columns=columns, filters=filters)
+        else:
+            fields['csv'] = True
+            df = pd.read_csv(csv_path(name), usecols=columns)
+            if 'ds' in df.columns:
+                df['ds'] = pd.to_datetime(df['ds'])
+            if countries is not None:
+                df = df[df[country_col].isin(countries)].reset_index(drop=True)
+        fields['rows'] = len(df)
+    return df
+
+
+def export_artifact_csv(name, path=None):
+    """Exports the artifact `name` to CSV (by default '<name>.csv') and returns the path."""
+    path = path or csv_path(name)
+    read_artifact(name).to_csv(path, index=False)
+    return path
+
+
+if __name__ == '__main__':
+    import sys
+
+    # Usage: python artifact_store.py <name> [<name> ...]
+    for artifact_name in sys.argv[1:]:
+        print(f"Exported {artifact_name} to {export_artifact_csv(artifact_name)}")
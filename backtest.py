@@ -0,0 +1,223 @@
+import argparse
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import feature_screening
+import metrics
+from artifact_store import read_artifact
+from baseline_models import backtest_baselines
+from instrumentation import span
+from config import BACKTEST_FIRST_CUTOFF, REGRESSORS, TEST_END_YEAR, TRAIN_END_YEAR
+from pooled_model import backtest_pooled
+
+# Rolling-origin backtest of the per-country Prophet models.
+#
+# For every country and every cutoff year, a model is fitted on the years up to the cutoff
+# (an expanding window, or the last `window` years) and evaluated on the following
+# `horizon` years. The folds of a country are fitted in cutoff order so that each fit can
+# start the Stan optimization from the parameters of the previous cutoff's model; the
+# countries (or chunks of their cutoffs) run in parallel worker processes.
+#
+# The Prophet model of every fold uses the regressors selected for its country
+# (feature_screening.py), like the Prophet model the country would be forecast with. The
+# selection is scored on the years up to FIRST_CUTOFF, which no fold is scored on (with an
+# earlier --first-cutoff, the first folds are scored on some of those years).
+#
+# The baseline models (baseline_models.py) and the pooled model (pooled_model.py) are
+# scored on the same folds, so that forecasting_model.py can use Prophet only for the
+# countries where it beats them. Every model returns its forecasts of the test years of
+# each fold, and the metrics of all folds and models are computed at once (metrics.py).
+#
+# The backtest picks the model of each country, so by default it only uses the training
+# years (up to TRAIN_END_YEAR): the last cutoff is TRAIN_END_YEAR - horizon, and no fold
+# forecasts or warm-starts on the held-out test years. `include_test` (--include-test-years)
+# adds the folds up to TEST_END_YEAR, e.g. to look at the errors over the test period.
+
+BACKTEST_FILE = 'backtest_results.csv'
+# Columns of the fold table left out of BACKTEST_FILE: the fit timings differ on every run,
+# and the file is tracked with the other outputs
+TIMING_COLUMNS = ['fit_seconds']
+
+FIRST_CUTOFF = BACKTEST_FIRST_CUTOFF
+HORIZON = 5
+
+
+def expected_changepoints(model, n_history):
+    """Number of changepoints Prophet will place for a history of `n_history` rows."""
+    hist_size = int(np.floor(n_history * model.changepoint_range))
+    return max(min(model.n_changepoints, hist_size - 1), 0)
+
+
+def warm_start_init(previous_model, n_changepoints):
+    """Returns Stan initial values taken from the fitted parameters of `previous_model`.
+
+    The growth rate, offset, noise and regressor coefficients are carried over. The
+    changepoint deltas start from zero as in a cold fit: starting Newton's method from the
+    previous (sparse, Laplace-penalized) deltas takes more iterations than it saves.
+    """
+    params = previous_model.params
+    return {
+        'k': params['k'][0][0],
+        'm': params['m'][0][0],
+        'sigma_obs': params['sigma_obs'][0][0],
+        'delta': np.zeros(max(n_changepoints, 1)),
+        'beta': params['beta'][0],
+    }
+
+
+def run_country_folds(country, df_country, cutoffs, horizon, window=None, warm_start=True, regressors=None):
+    """Fits the folds of one country with `regressors` (default: all the configured ones), in
+    cutoff order. Returns the forecasts of the test years of every fold, in the format of
+    metrics.fold_predictions()."""
+    # Imported in the worker so that the parent process does not need Prophet loaded
+    from forecasting_model import build_model
+
+    logging.getLogger('cmdstanpy').disabled = True
+    regressors = list(REGRESSORS if regressors is None else regressors)
+    years = df_country['ds'].dt.year
+    folds = []
+    previous_model = None
+
+    for cutoff in cutoffs:
+        train_mask = years <= cutoff
+        if window is not None:
+            train_mask &= years > cutoff - window
+        train_data = df_country[train_mask]
+        test_data = df_country[(years > cutoff) & (years <= cutoff + horizon)]
+        if len(train_data) < 3 or test_data.empty:
+            continue
+
+        start_time = time.perf_counter()
+        model = build_model(regressors)
+        fit_kwargs = {}
+        if warm_start and previous_model is not None:
+            fit_kwargs['init'] = warm_start_init(previous_model, expected_changepoints(model, len(train_data)))
+        with span('backtest.fit', country=country, cutoff=cutoff, warm_start=bool(fit_kwargs)):
+            model.fit(train_data[['ds', 'y'] + regressors], **fit_kwargs)
+        fit_seconds = time.perf_counter() - start_time
+
+        # Only the point forecast is evaluated, so skip the uncertainty sampling
+        model.uncertainty_samples = 0
+        with span('backtest.predict', country=country, cutoff=cutoff):
+            y_pred = model.predict(test_data[['ds'] + regressors])['yhat'].to_numpy()
+
+        folds.append(metrics.fold_predictions(
+            'prophet', cutoff, test_data, y_pred, pd.Series(len(train_data), index=[country]),
+            metrics.naive_scale(train_data), fit_seconds, bool(fit_kwargs)
+        ))
+        previous_model = model
+
+    return folds
+
+
+def run_backtest(df, first_cutoff=FIRST_CUTOFF, last_cutoff=None, horizon=HORIZON, window=None,
+                 workers=1, warm_start=True, baselines=True, pooled=True, include_test=False,
+                 regressor_selection=None):
+    """Runs the rolling-origin backtest for every country in `df` (the multivariate data).
+
+    Returns the per-fold table, sorted by country, model and cutoff. With `baselines` and
+    `pooled`, the baseline models and the pooled model are scored on the same folds as Prophet.
+    Unless `include_test`, the years after TRAIN_END_YEAR are left out, and the default last
+    cutoff is TRAIN_END_YEAR - `horizon` (TEST_END_YEAR - 1 with `include_test`). The Prophet
+    folds use the regressors of `regressor_selection` (default: feature_screening.load_selection()).
+    """
+    if regressor_selection is None:
+        regressor_selection = feature_screening.load_selection()
+    if not include_test:
+        df = df[df['ds'].dt.year <= TRAIN_END_YEAR]
+    if last_cutoff is None:
+        last_cutoff = TEST_END_YEAR - 1 if include_test else TRAIN_END_YEAR - horizon
+    cutoffs = list(range(first_cutoff, last_cutoff + 1))
+    countries = df['Country'].unique()
+
+    # With more workers than countries, split each country's cutoffs into consecutive chunks
+    # (each chunk starts cold, then warm-starts within the chunk)
+    chunks_per_country = max(1, min(len(cutoffs), math.ceil(workers / max(len(countries), 1))))
+    chunk_size = math.ceil(len(cutoffs) / chunks_per_country)
+    tasks = [
+        (country, df[df['Country'] == country], cutoffs[i:i + chunk_size], horizon, window, warm_start,
+         feature_screening.country_regressors(country, regressor_selection))
+        for country in countries
+        for i in range(0, len(cutoffs), chunk_size)
+    ]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            fold_lists = list(executor.map(run_country_folds, *zip(*tasks)))
+    else:
+        fold_lists = [run_country_folds(*task) for task in tasks]
+
+    predictions = [fold for fold_list in fold_lists for fold in fold_list]
+    if baselines:
+        predictions.append(backtest_baselines(df, cutoffs, horizon, window))
+    if pooled:
+        predictions.append(backtest_pooled(df, cutoffs, horizon, window))
+    predictions = [fold for fold in predictions if not fold.empty]
+    if not predictions:
+        return pd.DataFrame()
+    folds = metrics.score_folds(pd.concat(predictions, ignore_index=True))
+    return folds.sort_values(['Country', 'model', 'cutoff']).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rolling-origin backtest of the per-country Prophet models.')
+    parser.add_argument('--first-cutoff', type=int, default=FIRST_CUTOFF, help='First training cutoff year.')
+    parser.add_argument(
+        '--last-cutoff', type=int,
+        help=f'Last training cutoff year (default: {TRAIN_END_YEAR} - horizon, or {TEST_END_YEAR - 1} with --include-test-years).'
+    )
+    parser.add_argument('--horizon', type=int, default=HORIZON, help='Years evaluated after each cutoff.')
+    parser.add_argument('--window', type=int, help='Train on the last N years only (default: expanding window).')
+    parser.add_argument(
+        '--workers', type=int, default=int(os.environ.get('FORECAST_WORKERS', 1)),
+        help='Worker processes (default: 1, or $FORECAST_WORKERS).'
+    )
+    parser.add_argument('--no-warm-start', action='store_true', help='Fit every fold from the default initialization.')
+    parser.add_argument('--no-baselines', action='store_true', help='Do not backtest the baseline models.')
+    parser.add_argument('--no-pooled', action='store_true', help='Do not backtest the pooled model.')
+    parser.add_argument(
+        '--include-test-years', action='store_true',
+        help=f'Also evaluate folds in the test years (after {TRAIN_END_YEAR}); model selection ignores them.'
+    )
+    args = parser.parse_args()
+
+    df = read_artifact('gdp_growth_multivariate_data')
+
+    start_time = time.perf_counter()
+    folds = run_backtest(
+        df,
+        first_cutoff=args.first_cutoff,
+        last_cutoff=args.last_cutoff,
+        horizon=args.horizon,
+        window=args.window,
+        workers=args.workers,
+        warm_start=not args.no_warm_start,
+        baselines=not args.no_baselines,
+        pooled=not args.no_pooled,
+        include_test=args.include_test_years
+    )
+    wall_seconds = time.perf_counter() - start_time
+
+    if folds.empty:
+        print("No folds to evaluate: check the cutoff years against the available data.")
+        return
+
+    print("--- Backtest Summary (mean over folds) ---")
+    print(folds.groupby(['Country', 'model'])[['RMSE', 'MAE', 'sMAPE', 'MASE']].mean().to_markdown(floatfmt='.3f'))
+    prophet_folds = folds[folds['model'] == 'prophet']
+    print(f"\n{len(prophet_folds)} Prophet folds in {wall_seconds:.2f}s with {args.workers} worker(s): "
+          f"{len(prophet_folds) / wall_seconds:.2f} folds/second "
+          f"(mean fit time {prophet_folds['fit_seconds'].mean():.3f}s)")
+
+    folds.drop(columns=TIMING_COLUMNS).to_csv(BACKTEST_FILE, index=False, float_format='%.6g')
+    print(f"\nPer-fold results saved to {BACKTEST_FILE}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+# Cheap univariate baselines for the GDP growth series.
+#
+# With ~40 annual points per country, these models are fitted for all countries at once:
+# the series are stacked into a (country x year) matrix, left-aligned so that every row
+# starts at its first year (rows are NaN-padded after their last year), and every model is
+# a handful of array operations over that matrix. Each model takes `(values, lengths,
+# horizon)` and returns `(forecast, std)`, two (country x horizon) arrays with the point
+# forecast and the standard deviation of the forecast error `h` steps ahead.
+
+# Prophet's default interval_width is 0.8, so the baselines report 80% intervals as well
+INTERVAL_Z = 1.2816
+
+AR_ORDER = 2
+
+# Smoothing parameters tried for the damped trend model (the best one is picked per country)
+DAMPED_ALPHAS = (0.2, 0.5, 0.8)
+DAMPED_BETAS = (0.05, 0.2)
+DAMPED_PHIS = (0.8, 0.9, 0.98)
+
+
+def series_matrix(df, value_col='y'):
+    """Stacks the series of a long frame ('Country', 'ds', value) into a left-aligned matrix.
+
+    Returns `(countries, values, lengths, last_years)`, with the countries in order of first
+    appearance. The years of each country are assumed to be consecutive.
+    """
+    codes, countries = pd.factorize(df['Country'])
+    order = np.lexsort((df['ds'].to_numpy(), codes))
+    codes = codes[order]
+
+    lengths = np.bincount(codes, minlength=len(countries))
+    starts = np.cumsum(lengths) - lengths
+    position = np.arange(len(codes)) - starts[codes]
+
+    values = np.full((len(countries), lengths.max(initial=0)), np.nan)
+    values[codes, position] = df[value_col].to_numpy(dtype=float)[order]
+    last_years = df['ds'].dt.year.to_numpy()[order][starts + lengths - 1]
+    return countries, values, lengths, last_years
+
+
+def _last_values(values, lengths):
+    return values[np.arange(len(values)), lengths - 1]
+
+
+def _masked_sum(x, mask):
+    return np.where(mask, x, 0.0).sum(axis=1)
+
+
+def naive(values, lengths, horizon):
+    """Random walk: the last value, with errors growing like sqrt(h)."""
+    steps = np.arange(1, horizon + 1)
+    diffs = np.diff(values, axis=1)
+    valid = np.arange(diffs.shape[1]) < (lengths - 1)[:, None]
+    sigma = np.sqrt(_masked_sum(diffs ** 2, valid) / np.maximum(lengths - 1, 1))
+
+    forecast = np.repeat(_last_values(values, lengths)[:, None], horizon, axis=1)
+    return forecast, sigma[:, None] * np.sqrt(steps)
+
+
+def drift(values, lengths, horizon):
+    """Random walk with drift: the line through the first and last values, extended."""
+    steps = np.arange(1, horizon + 1)
+    last = _last_values(values, lengths)
+    slope = (last - values[:, 0]) / np.maximum(lengths - 1, 1)
+
+    diffs = np.diff(values, axis=1)
+    valid = np.arange(diffs.shape[1]) < (lengths - 1)[:, None]
+    sigma = np.sqrt(_masked_sum((diffs - slope[:, None]) ** 2, valid) / np.maximum(lengths - 2, 1))
+
+    # The error variance includes the uncertainty of the estimated slope
+    n = np.maximum(lengths - 1, 1)[:, None]
+    forecast = last[:, None] + slope[:, None] * steps
+    return forecast, sigma[:, None] * np.sqrt(steps * (1 + steps / n))
+
+
+def autoregressive(values, lengths, horizon, order=AR_ORDER):
+    """AR(`order`) with intercept, fitted by least squares for all countries in one batched solve.
+
+    Countries with too few points for the regression get the naive forecast.
+    """
+    n_countries, n_years = values.shape
+    if n_years < 2 * order + 2:
+        return naive(values, lengths, horizon)
+
+    # Design matrices (country x sample x [1, y(t-1), ..., y(t-order)]), with the samples past
+    # the end of each series zeroed out so that they do not contribute to the normal equations
+    target = values[:, order:]
+    lags = np.stack([values[:, order - k:n_years - k] for k in range(1, order + 1)], axis=-1)
+    design = np.concatenate([np.ones_like(lags[..., :1]), lags], axis=-1)
+    valid = np.arange(order, n_years)[None, :] < lengths[:, None]
+    design = np.where(valid[..., None], design, 0.0)
+    target = np.where(valid, target, 0.0)
+
+    # A tiny ridge term keeps the normal equations solvable for constant series
+    gram = np.einsum('csi,csj->cij', design, design) + 1e-8 * np.eye(order + 1)
+    coef = np.linalg.solve(gram, np.einsum('csi,cs->ci', design, target)[..., None])[..., 0]
+
+    n_samples = valid.sum(axis=1)
+    residuals = np.where(valid, target - np.einsum('csi,ci->cs', design, coef), 0.0)
+    sigma = np.sqrt((residuals ** 2).sum(axis=1) / np.maximum(n_samples - order - 1, 1))
+
+    # Recursive multi-step forecast. `history[:, k]` is y(t-1-k).
+    history = np.stack([values[np.arange(n_countries), lengths - 1 - k] for k in range(order)], axis=1)
+    forecast = np.empty((n_countries, horizon))
+    for h in range(horizon):
+        forecast[:, h] = coef[:, 0] + (coef[:, 1:] * history).sum(axis=1)
+        history = np.concatenate([forecast[:, h:h + 1], history[:, :-1]], axis=1)
+
+    # Error variance from the MA(infinity) weights of the fitted AR polynomial
+    psi = np.zeros((n_countries, horizon))
+    psi[:, 0] = 1.0
+    for j in range(1, horizon):
+        for i in range(1, min(j, order) + 1):
+            psi[:, j] += coef[:, i] * psi[:, j - i]
+    std = sigma[:, None] * np.sqrt(np.cumsum(psi ** 2, axis=1))
+
+    # Too few samples for a meaningful regression
+    too_short = n_samples < order + 2
+    if too_short.any():
+        naive_forecast, naive_std = naive(values, lengths, horizon)
+        forecast[too_short] = naive_forecast[too_short]
+        std[too_short] = naive_std[too_short]
+    return forecast, std
+
+
+def damped_trend(values, lengths, horizon, alphas=DAMPED_ALPHAS, betas=DAMPED_BETAS, phis=DAMPED_PHIS):
+    """Holt's linear method with a damped trend.
+
+    Every (alpha, beta, phi) combination of the grid is run for every country at once, and
+    each country keeps the combination with the smallest one-step-ahead squared error. The
+    error std grows like sqrt(h), an approximation of the exact formula.
+    """
+    grid = np.array(list(itertools.product(alphas, betas, phis)))
+    alpha, beta, phi = (grid[:, i, None] for i in range(3))
+
+    n_countries, n_years = values.shape
+    level = np.repeat(values[None, :, 0], len(grid), axis=0)
+    trend = np.zeros_like(level)
+    sse = np.zeros_like(level)
+
+    # Error-correction form: l(t) = l(t-1) + phi b(t-1) + alpha e(t), b(t) = phi b(t-1) + alpha beta e(t)
+    for t in range(1, n_years):
+        active = t < lengths
+        prediction = level + phi * trend
+        error = values[:, t] - prediction
+        level = np.where(active, prediction + alpha * error, level)
+        trend = np.where(active, phi * trend + alpha * beta * error, trend)
+        sse += np.where(active, error ** 2, 0.0)
+
+    best = sse.argmin(axis=0)
+    countries = np.arange(n_countries)
+    level, trend, sse = level[best, countries], trend[best, countries], sse[best, countries]
+    phi = grid[best, 2]
+
+    steps = np.arange(1, horizon + 1)
+    damping = np.cumsum(phi[:, None] ** steps, axis=1)
+    sigma = np.sqrt(sse / np.maximum(lengths - 1, 1))
+    return level[:, None] + trend[:, None] * damping, sigma[:, None] * np.sqrt(steps)
+
+
+BASELINE_MODELS = {
+    'naive': naive,
+    'drift': drift,
+    'ar': autoregressive,
+    'damped_trend': damped_trend,
+}
+
+
+def forecast_baseline(model, df_train, horizon):
+    """Fits `model` on the training series of every country in `df_train`.
+
+    Returns `(countries, forecast, std, last_years)`; column `h` of `forecast` and `std` is
+    the year `last_years + h + 1` of each country.
+    """
+    countries, values, lengths, last_years = series_matrix(df_train)
+    forecast, std = BASELINE_MODELS[model](values, lengths, horizon)
+    return countries, forecast, std, last_years
+
+
+def backtest_baselines(df, cutoffs, horizon, window=None, models=None):
+    """Forecasts every baseline on the same rolling-origin folds as backtest.py.
+
+    Returns the forecasts of the test rows of every (model, cutoff), in the format of
+    metrics.fold_predictions().
+    """
+    if models is None:
+        models = list(BASELINE_MODELS)
+    years = df['ds'].dt.year
+    rows = []
+
+    for cutoff in cutoffs:
+        train_mask = years <= cutoff
+        if window is not None:
+            train_mask &= years > cutoff - window
+        df_train = df[train_mask]
+        df_test = df[(years > cutoff) & (years <= cutoff + horizon)]
+
+        # Same fold rules as the Prophet backtest: at least 3 training years and a test period
+        train_sizes = df_train['Country'].value_counts()
+        eligible = train_sizes.index[train_sizes >= 3].intersection(df_test['Country'].unique())
+        df_train = df_train[df_train['Country'].isin(eligible)]
+        df_test = df_test[df_test['Country'].isin(eligible)]
+        if df_test.empty:
+            continue
+        scale = metrics.naive_scale(df_train)
+
+        for model in models:
+            start_time = time.perf_counter()
+            countries, forecast, _, last_years = forecast_baseline(model, df_train, horizon)
+            fit_seconds = (time.perf_counter() - start_time) / len(countries)
+
+            # Match every test row with the forecast of its country and step
+            codes = countries.get_indexer(df_test['Country'])
+            steps = df_test['ds'].dt.year.to_numpy() - last_years[codes] - 1
+            rows.append(metrics.fold_predictions(model, cutoff, df_test, forecast[codes, steps], train_sizes, scale, fit_seconds))
+
+    if not rows:
+        return pd.DataFrame()
+    return pd.concat(rows, ignore_index=True)
@@ -0,0 +1,162 @@
+"""Payload size and latency of the dashboard's comparison chart: raw series vs summarized views.
+
+Usage (from the project root):
+    python -m benchmarks.bench_charts [--countries 64 640 6400] [--reruns 20]
+
+For every country count, a synthetic comparison dataset (40 years of actual GDP growth per
+country, spread over the five regions) is charted in two ways:
+
+- raw:   one line per country with all its points, the former comparison chart. Altair
+         converts the chart to a spec on every rerun.
+- views: the summaries of chart_prep.py (regional means, percentile bands, most volatile
+         countries), built into a spec once; a rerun only adds the selected country.
+
+The report shows the rows and marks (points drawn) sent to the browser, the payload as
+JSON and as Arrow (which is what Streamlit sends), the time to build the spec and the time
+a rerun spends preparing it. The browser's rendering time grows with the number of marks;
+it is measured as well when vl-convert (vl-convert-python, which renders specs with Vega)
+is installed.
+"""
+import argparse
+import io
+import json
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import chart_prep
+from regions import REGIONS
+from benchmarks.synthetic import country_names
+
+try:
+    import vl_convert
+except ImportError:
+    vl_convert = None
+
+YEARS = range(1981, 2021)
+
+
+def make_comparison(n_countries, seed=0):
+    """Returns a synthetic comparison dataset ('Country', 'ds', 'y') and a region per country."""
+    rng = np.random.default_rng(seed)
+    countries = country_names(n_countries)
+    growth = rng.normal(3.0, 1.5, size=(n_countries, 1)) + rng.normal(0.0, 3.0, size=(n_countries, len(YEARS)))
+    df = pd.DataFrame({
+        'Country': np.repeat(countries, len(YEARS)),
+        'ds': np.tile(pd.to_datetime([f'{year}-01-01' for year in YEARS]), n_countries),
+        'y': growth.ravel(),
+    })
+    regions = {country: REGIONS[i % len(REGIONS)] for i, country in enumerate(countries)}
+    return df, regions
+
+
+def raw_chart(df_comparison):
+    """The former comparison chart: every point of every country."""
+    return alt.Chart(df_comparison).mark_line(point=True).encode(
+        x=alt.X('ds:T', title='Year'),
+        y=alt.Y('y:Q', title='GDP Growth (Annual %)'),
+        color=alt.Color('Country:N'),
+        tooltip=[alt.Tooltip('ds:T', title='Year', format='%Y'), alt.Tooltip('y:Q', title='Growth', format='.2f'), 'Country']
+    ).interactive()
+
+
+def raw_spec(df_comparison):
+    with alt.data_transformers.enable('default', max_rows=None):
+        return raw_chart(df_comparison).to_dict()
+
+
+def arrow_bytes(spec):
+    """Serializes the datasets of a spec to Arrow IPC, as Streamlit does before sending them."""
+    total = 0
+    for values in spec.get('datasets', {}).values():
+        table = pa.Table.from_pandas(pd.DataFrame(values), preserve_index=False)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        total += len(sink.getvalue())
+    return total
+
+
+def _layer_marks(layer, datasets, data):
+    data = layer.get('data', data)
+    if 'layer' in layer:
+        return sum(_layer_marks(sublayer, datasets, data) for sublayer in layer['layer'])
+    n_rows = len(datasets.get(data.get('name'), []))
+    mark = layer.get('mark', {})
+    # Lines with points draw every row twice
+    return n_rows * (2 if isinstance(mark, dict) and mark.get('point') else 1)
+
+
+def count_marks(spec):
+    """Returns (rows, marks): the data rows of a spec and the points drawn for them."""
+    datasets = spec.get('datasets', {})
+    rows = sum(len(dataset) for dataset in datasets.values())
+    return rows, _layer_marks(spec, datasets, spec.get('data', {}))
+
+
+def render_seconds(spec):
+    if vl_convert is None:
+        return np.nan
+    start = time.perf_counter()
+    vl_convert.vegalite_to_svg(spec)
+    return time.perf_counter() - start
+
+
+def measure(name, build, rerun, reruns):
+    start = time.perf_counter()
+    spec = build()
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(reruns):
+        final = rerun(spec)
+        arrow_bytes(final)
+    rerun_seconds = (time.perf_counter() - start) / reruns
+
+    rows, marks = count_marks(final)
+    return {
+        'Chart': name, 'Rows': rows, 'Marks': marks,
+        'JSON (KB)': len(json.dumps(final)) / 1024, 'Arrow (KB)': arrow_bytes(final) / 1024,
+        'Build (s)': build_seconds, 'Rerun (s)': rerun_seconds, 'Render (s)': render_seconds(final),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--countries', type=int, nargs='+', default=[64, 640, 6400], help='Country counts.')
+    parser.add_argument('--reruns', type=int, default=20, help='Timed reruns per chart.')
+    args = parser.parse_args()
+
+    rows = []
+    for n_countries in args.countries:
+        df_comparison, regions = make_comparison(n_countries)
+        selected = df_comparison['Country'].iloc[0]
+        df_selected = df_comparison[df_comparison['Country'] == selected]
+
+        # The raw chart is rebuilt from the full data on every rerun
+        results = [measure('raw', lambda: raw_spec(df_comparison), lambda spec: raw_spec(df_comparison), max(1, args.reruns // 10))]
+        for view in chart_prep.COMPARISON_VIEWS:
+            results.append(measure(
+                view,
+                lambda: chart_prep.comparison_spec(view, df_comparison, regions),
+                lambda spec: chart_prep.with_selected_country(spec, df_selected, selected),
+                args.reruns
+            ))
+        for result in results:
+            rows.append({'Countries': n_countries, **result})
+            print(f"{n_countries} countries, {result['Chart']}: {result['Rows']} rows, {result['Arrow (KB)']:.1f} KB, "
+                  f"rerun {result['Rerun (s)'] * 1000:.2f} ms", flush=True)
+
+    report = pd.DataFrame(rows)
+    if vl_convert is None:
+        report = report.drop(columns='Render (s)')
+        print("\nvl-convert-python is not installed, so the rendering time is not measured.")
+    print()
+    print(report.to_markdown(index=False, floatfmt='.3f'))
+
+
+if __name__ == '__main__':
+    main()
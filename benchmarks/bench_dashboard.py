@@ -0,0 +1,96 @@
+"""Start-up and rerun latency of the Streamlit dashboard for an increasing number of countries.
+
+Usage (from the project root):
+    python -m benchmarks.bench_dashboard [--countries 3 30 300] [--reruns 10]
+
+For every country count, synthetic pipeline outputs (see benchmarks/synthetic.py) are
+written to a scratch directory and app.py is run there headless with Streamlit's AppTest.
+The report shows the first run (empty caches) and the mean time of the reruns that follow
+a change of the selected country, alternating between two countries so that the reruns
+hit the per-country caches.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import model_summary
+from config import REGRESSORS
+from metrics import METRICS_FILE
+from results_store import write_results
+from benchmarks.synthetic import country_names, make_results
+
+APP_PATH = os.path.abspath('app.py')
+
+
+def write_outputs(workdir, n_countries):
+    results = make_results(country_names(n_countries), REGRESSORS)
+    write_results(results, workdir)
+    model_summary.summary_table(results).to_csv(os.path.join(workdir, METRICS_FILE), index=False)
+    for name in ['eda_insights.txt', 'model_insights.txt']:
+        with open(os.path.join(workdir, name), 'w') as f:
+            f.write('insights')
+
+
+def time_app(workdir, reruns):
+    """Returns `(first run seconds, mean rerun seconds)` of app.py in `workdir`."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    # The caches live in this process, so they would still hold the previous outputs
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        app = AppTest.from_file(APP_PATH, default_timeout=300)
+        start = time.perf_counter()
+        app.run()
+        first = time.perf_counter() - start
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+
+        selectbox = app.sidebar.selectbox[0]
+        options = selectbox.options[:2]
+        timings = []
+        for i in range(reruns):
+            selectbox.select(options[i % len(options)])
+            start = time.perf_counter()
+            app.run()
+            timings.append(time.perf_counter() - start)
+        return first, sum(timings) / len(timings)
+    finally:
+        os.chdir(cwd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--countries', type=int, nargs='+', default=[3, 30, 300], help='Country counts.')
+    parser.add_argument('--reruns', type=int, default=10, help='Timed reruns per country count.')
+    args = parser.parse_args()
+
+    # app.py imports the project modules from the scratch directory's point of view
+    sys.path.insert(0, os.getcwd())
+
+    rows = []
+    for n_countries in args.countries:
+        workdir = tempfile.mkdtemp(prefix='aeo_dashboard_')
+        try:
+            write_outputs(workdir, n_countries)
+            first, rerun = time_app(workdir, args.reruns)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        rows.append({'Countries': n_countries, 'First Run (s)': first, 'Rerun (s)': rerun})
+        print(f"{n_countries} countries: first run {first:.3f}s, rerun {rerun:.3f}s", flush=True)
+
+    print()
+    print(pd.DataFrame(rows).to_markdown(index=False, floatfmt='.3f'))
+
+
+if __name__ == '__main__':
+    main()
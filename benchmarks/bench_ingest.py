@@ -0,0 +1,120 @@
+"""Peak memory of the source ingest: whole-file read vs streaming reader.
+
+Usage (from the project root):
+    python -m benchmarks.bench_ingest [--scales 1 10 100] [--year-scale 1] [--chunksize 5000]
+
+For every scale, a synthetic AEO CSV with the shape of the real file (61 countries x 29
+indicators x 41 years) times the scale in countries, and times --year-scale in years, is
+written to a scratch directory. Each ingest mode then runs in its own Python process, which
+reports its peak resident memory (ru_maxrss) and wall time:
+
+- full:   pd.read_csv of the whole file, then filtering (data_loader.load_source + filter_data)
+- stream: chunked read, filtered while reading and appended to Parquet (data_loader.ingest)
+
+Both keep the rows of three countries and the KPI and regressor indicators, like the
+default pipeline. The streaming peak should stay flat as the file grows.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from config import COUNTRY_COL, TARGET_KPI_CODE, REGRESSOR_INDICATORS
+from benchmarks.synthetic import country_names, make_aeo_table
+
+# Shape of african-economic-outlook.csv
+BASE_COUNTRIES = 61
+BASE_INDICATORS = 29
+BASE_YEARS = 41
+
+# Countries kept by the ingest, like the three default countries of the pipeline
+KEPT_COUNTRIES = 3
+
+
+def write_source(path, scale, year_scale):
+    """Writes a synthetic source CSV, a block of countries at a time, and returns its size in MB."""
+    filler = [f'X.FILLER.{i:02d}' for i in range(BASE_INDICATORS - 1 - len(REGRESSOR_INDICATORS))]
+    indicator_codes = [TARGET_KPI_CODE] + list(REGRESSOR_INDICATORS) + filler
+    for block in range(scale):
+        df = make_aeo_table(BASE_COUNTRIES, BASE_YEARS * year_scale, indicator_codes=indicator_codes, seed=block)
+        if block:
+            # Distinct country names per block, so that only the first block has the kept countries
+            offset = block * BASE_COUNTRIES
+            names = dict(zip(country_names(BASE_COUNTRIES), country_names(offset + BASE_COUNTRIES)[offset:]))
+            df[COUNTRY_COL] = df[COUNTRY_COL].map(names)
+        df.to_csv(path, mode='a' if block else 'w', header=not block, index=False)
+    return os.path.getsize(path) / 1e6
+
+
+def run_mode(mode, path, chunksize):
+    """Runs one ingest mode in this process and returns its measurements."""
+    import data_loader
+    from artifact_store import write_artifact
+
+    countries = country_names(KEPT_COUNTRIES)
+    baseline_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    start = time.perf_counter()
+    if mode == 'full':
+        df = data_loader.filter_data(data_loader.load_source(path), countries=countries)
+        write_artifact(df, 'bench_ingest', export_csv=False)
+        rows = len(df)
+    else:
+        rows = data_loader.ingest(path, 'bench_ingest', countries=countries, chunksize=chunksize)
+    seconds = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {'mode': mode, 'rows': rows, 'seconds': seconds, 'peak_rss_mb': peak_mb, 'import_rss_mb': baseline_mb}
+
+
+def measure(mode, path, chunksize, workdir):
+    """Runs `run_mode` in a fresh process (so that the peak RSS is its own) and returns the result."""
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_ingest', '--child', mode, path, '--chunksize', str(chunksize)],
+        cwd=os.getcwd(), env=dict(os.environ, AEO_EXPORT_CSV='0', AEO_BENCH_WORKDIR=workdir),
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100], help='Country count multipliers of the source file.')
+    parser.add_argument('--year-scale', type=int, default=1, help='Year count multiplier of the source file.')
+    parser.add_argument('--chunksize', type=int, default=5000, help='Rows per chunk of the streaming reader.')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Write the artifacts in the scratch directory, not in the project's store
+        os.chdir(os.environ['AEO_BENCH_WORKDIR'])
+        print(json.dumps(run_mode(args.child[0], args.child[1], args.chunksize)))
+        return
+
+    rows = []
+    for scale in args.scales:
+        workdir = tempfile.mkdtemp(prefix='aeo_ingest_')
+        try:
+            path = os.path.join(workdir, 'source.csv')
+            size_mb = write_source(path, scale, args.year_scale)
+            for mode in ['full', 'stream']:
+                result = measure(mode, path, args.chunksize, workdir)
+                rows.append({'Scale': scale, 'File (MB)': size_mb, **result})
+                print(f"{scale}x ({size_mb:.0f} MB) {mode:<6} {result['seconds']:7.2f}s  peak RSS {result['peak_rss_mb']:7.1f} MB", flush=True)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = pd.DataFrame(rows)
+    report['Ingest RSS (MB)'] = report['peak_rss_mb'] - report['import_rss_mb']
+    print()
+    print(report.rename(columns={'mode': 'Mode', 'rows': 'Rows Kept', 'seconds': 'Time (s)', 'peak_rss_mb': 'Peak RSS (MB)'})
+          .drop(columns='import_rss_mb').to_markdown(index=False, floatfmt='.1f'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Speed and calibration of the interval modes of intervals.py.
+
+Usage (from the project root):
+    python -m benchmarks.bench_intervals [--countries 5] [--source synthetic|artifacts] [--reference-samples 20000]
+
+A Prophet model is fitted for every country (synthetic countries, or the countries of the
+pipeline's train_data/test_data artifacts with --source artifacts), and its test period
+(2016-2020) and forecast period (2021-2025) are predicted like forecasting_model.py does,
+with every interval mode. For each mode the report shows:
+
+- the time of the two predictions
+- the coverage: the share of Prophet's own simulated forecasts (--reference-samples paths,
+  the distribution the former intervals were drawn from) inside the interval. It should be
+  close to the interval width (0.8).
+- the largest distance of the bounds from the percentiles of the simulated forecasts
+- with --source artifacts, the share of the actual test values inside the interval
+
+Prophet's own mode ('prophet', 1000 samples) is included as the reference point.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import intervals
+from artifact_store import read_artifact
+from config import INTERVAL_SAMPLES, REGRESSORS, TEST_START_YEAR, TEST_END_YEAR, TRAIN_END_YEAR
+from forecasting_model import fit_model, future_dates
+from benchmarks.bench_scenarios import make_country
+
+
+def synthetic_countries(n_countries):
+    """Returns `(country, train frame, test frame)` for synthetic countries ending at TEST_END_YEAR."""
+    countries = []
+    for seed in range(n_countries):
+        df = make_country(n_years=41, seed=seed)
+        df['ds'] = df['ds'] + pd.DateOffset(years=TEST_END_YEAR - TRAIN_END_YEAR)
+        is_test = df['ds'].dt.year >= TEST_START_YEAR
+        countries.append((f'Synthetic {seed}', df[~is_test], df[is_test]))
+    return countries
+
+
+def artifact_countries(n_countries):
+    df_train, df_test = read_artifact('train_data'), read_artifact('test_data')
+    names = df_train['Country'].unique()[:n_countries]
+    return [(name, df_train[df_train['Country'] == name], df_test[df_test['Country'] == name]) for name in names]
+
+
+def prediction_frames(df_test):
+    """The frames forecasting_model.py predicts: the test period, and the forecast period with
+    the last regressor values carried forward."""
+    future = future_dates().to_frame()
+    for regressor in REGRESSORS:
+        future[regressor] = df_test[regressor].iloc[-1]
+    return [df_test[['ds'] + REGRESSORS], future]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--countries', type=int, default=5, help='Number of countries.')
+    parser.add_argument('--source', choices=['synthetic', 'artifacts'], default='synthetic')
+    parser.add_argument('--reference-samples', type=int, default=20000, help="Simulated paths of Prophet's reference distribution.")
+    parser.add_argument('--samples', type=int, default=INTERVAL_SAMPLES, help='Paths of the cached mode.')
+    args = parser.parse_args()
+
+    countries = synthetic_countries(args.countries) if args.source == 'synthetic' else artifact_countries(args.countries)
+    rows = []
+    for country, df_train, df_test in countries:
+        model = fit_model(df_train)
+        frames = prediction_frames(df_test)
+
+        # Prophet's simulated forecasts, for the coverage
+        np.random.seed(0)
+        model.uncertainty_samples = args.reference_samples
+        simulated = [model.predictive_samples(frame)['yhat'] for frame in frames]
+        model.uncertainty_samples = 1000
+        lower_q, upper_q = 100 * (1 - model.interval_width) / 2, 100 * (1 + model.interval_width) / 2
+
+        for mode in intervals.INTERVAL_MODES:
+            start = time.perf_counter()
+            forecasts = [intervals.predict(model, frame, mode, args.samples) for frame in frames]
+            seconds = time.perf_counter() - start
+
+            inside, bound_error = [], []
+            for forecast, sims in zip(forecasts, simulated):
+                lower, upper = forecast['yhat_lower'].to_numpy()[:, None], forecast['yhat_upper'].to_numpy()[:, None]
+                inside.append(((sims >= lower) & (sims <= upper)).ravel())
+                bound_error.append(np.abs(np.percentile(sims, [lower_q, upper_q], axis=1) - np.stack([lower[:, 0], upper[:, 0]])).max())
+            row = {'Country': country, 'Mode': mode, 'Predict (s)': seconds,
+                   'Coverage': np.concatenate(inside).mean(), 'Max Bound Error': max(bound_error)}
+            if args.source == 'artifacts':
+                test = forecasts[0].merge(df_test[['ds', 'y']], on='ds')
+                row['Test Coverage'] = test['y'].between(test['yhat_lower'], test['yhat_upper']).mean()
+            rows.append(row)
+
+    report = pd.DataFrame(rows)
+    print(report.to_markdown(index=False, floatfmt='.3f'))
+    print()
+    print(report.drop(columns='Country').groupby('Mode', sort=False).mean().to_markdown(floatfmt='.3f'))
+
+
+if __name__ == '__main__':
+    main()
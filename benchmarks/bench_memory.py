@@ -0,0 +1,125 @@
+"""Peak memory of the long-format AEO panel: legacy frames vs the compact panel.
+
+Usage (from the project root):
+    python -m benchmarks.bench_memory [--scales 1 10 30] [--vintages 3] [--year-scale 1]
+
+For every scale, --vintages synthetic AEO tables with the shape of the real file (61
+countries x 29 indicators x 41 years) times the scale in countries, and times --year-scale
+in years, are generated (one per vintage, with different values, like successive AEO
+editions). Every vintage is turned into a long panel and all of them are kept in memory,
+then the KPI of every country is selected and interpolated in each vintage. Each
+representation runs in its own Python process, which reports its peak resident memory
+(ru_maxrss):
+
+- legacy:  the wide table melted to long format - the identifiers as Python strings on
+           every row, the year as a string, the values as float64
+- compact: compact.compact_panel() - categorical identifiers, int16 year, float32 values
+           and a bool missing mask (the representation of the pipeline)
+
+The report also shows the size of the kept panels (DataFrame.memory_usage(deep=True)).
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from config import COUNTRY_COL, ID_COLUMNS, INDICATOR_CODE_COL, TARGET_KPI_CODE, REGRESSOR_INDICATORS
+from benchmarks.bench_ingest import BASE_COUNTRIES, BASE_INDICATORS, BASE_YEARS
+from benchmarks.synthetic import make_aeo_table
+
+MODES = ['legacy', 'compact']
+
+
+def make_vintage(scale, year_scale, vintage):
+    """Returns the synthetic wide table of one vintage (all indicators of every country)."""
+    filler = [f'X.FILLER.{i:02d}' for i in range(BASE_INDICATORS - 1 - len(REGRESSOR_INDICATORS))]
+    indicator_codes = [TARGET_KPI_CODE] + list(REGRESSOR_INDICATORS) + filler
+    return make_aeo_table(BASE_COUNTRIES * scale, BASE_YEARS * year_scale, indicator_codes=indicator_codes, seed=vintage)
+
+
+def legacy_kpi(long):
+    """The KPI of every country, interpolated, from a legacy long frame."""
+    from reshape import interpolate_cube
+
+    kpi = long[long[INDICATOR_CODE_COL] == TARGET_KPI_CODE]
+    wide = kpi.pivot_table(index=COUNTRY_COL, columns='year', values='value', dropna=False)
+    return interpolate_cube(wide.to_numpy())
+
+
+def run_mode(mode, scale, year_scale, n_vintages):
+    """Builds the panels of every vintage in this process and returns its measurements."""
+    import compact
+    import data_prep
+
+    baseline_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    start = time.perf_counter()
+    panels = []
+    for vintage in range(n_vintages):
+        df = make_vintage(scale, year_scale, vintage)
+        if mode == 'legacy':
+            panels.append(df.melt(id_vars=ID_COLUMNS, var_name='year', value_name='value'))
+        else:
+            panels.append(compact.compact_panel(df))
+        del df
+    for panel in panels:
+        if mode == 'legacy':
+            legacy_kpi(panel)
+        else:
+            data_prep.prepare_gdp_growth(panel)
+    seconds = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        'mode': mode, 'cells': sum(len(panel) for panel in panels), 'seconds': seconds,
+        'frame_mb': sum(panel.memory_usage(deep=True).sum() for panel in panels) / 1e6,
+        'peak_rss_mb': peak_mb, 'import_rss_mb': baseline_mb,
+    }
+
+
+def measure(mode, scale, year_scale, n_vintages):
+    """Runs `run_mode` in a fresh process (so that the peak RSS is its own) and returns the result."""
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_memory', '--child', mode, str(scale),
+         '--year-scale', str(year_scale), '--vintages', str(n_vintages)],
+        cwd=os.getcwd(), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 30], help='Country count multipliers of the tables.')
+    parser.add_argument('--vintages', type=int, default=3, help='Vintages kept in memory.')
+    parser.add_argument('--year-scale', type=int, default=1, help='Year count multiplier of the tables.')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'SCALE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.child[0], int(args.child[1]), args.year_scale, args.vintages)))
+        return
+
+    rows = []
+    for scale in args.scales:
+        for mode in MODES:
+            result = measure(mode, scale, args.year_scale, args.vintages)
+            rows.append({'Scale': scale, 'Vintages': args.vintages, **result})
+            print(f"{scale}x {mode:<7} {result['cells']:>10,} cells  {result['seconds']:6.2f}s  "
+                  f"peak RSS {result['peak_rss_mb']:7.1f} MB", flush=True)
+
+    report = pd.DataFrame(rows)
+    report['Panel RSS (MB)'] = report['peak_rss_mb'] - report['import_rss_mb']
+    legacy = report[report['mode'] == 'legacy'].set_index('Scale')['Panel RSS (MB)']
+    reduction = 1 - report['Panel RSS (MB)'] / report['Scale'].map(legacy)
+    report['Reduction'] = [f'{value:.0%}' if mode != 'legacy' else '' for mode, value in zip(report['mode'], reduction)]
+    print()
+    print(report.rename(columns={
+        'mode': 'Panel', 'cells': 'Cells', 'seconds': 'Time (s)', 'frame_mb': 'Frames (MB)', 'peak_rss_mb': 'Peak RSS (MB)'
+    }).drop(columns='import_rss_mb').to_markdown(index=False, floatfmt=('.0f', '.0f', '', '.0f', '.2f', '.1f', '.1f', '.1f', '')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Grouped metrics of metrics.py vs the former per-series loops.
+
+Usage (from the project root):
+    python -m benchmarks.bench_metrics [--series 1000 10000 100000] [--max-loop 10000]
+
+Three workloads are timed for every series count:
+
+- folds: backtest forecasts of (country, model, cutoff) series of 5 test years each, scored
+  with metrics.score_folds(), vs a loop computing the metrics of every fold on its own
+  (as backtest.py did per Prophet fold)
+- importance: the components of synthetic forecasting results (one series per country),
+  summarized with metrics.component_importance(), vs the former model_summary.py loop
+  building a DataFrame per country from the results
+- tidy: the whole metrics.tidy_table() of the results, including the flattening of the
+  results structure into frames (most of its time), the test metrics and the importance
+
+The loops only run up to --max-loop series, and their results are compared with the
+grouped ones.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from config import REGRESSORS
+from benchmarks.synthetic import country_names, make_results
+
+MODELS = ['prophet', 'naive', 'drift', 'ar', 'damped_trend', 'pooled']
+CUTOFFS = range(2005, 2010)
+HORIZON = 5
+
+
+def make_predictions(n_series, seed=0):
+    """Returns fold forecasts (metrics.fold_predictions() rows) of `n_series` series."""
+    rng = np.random.default_rng(seed)
+    series = np.arange(n_series)
+    countries = np.array(country_names(n_series // (len(MODELS) * len(CUTOFFS)) + 1))
+    keys = pd.DataFrame({
+        'Country': countries[series // (len(MODELS) * len(CUTOFFS))],
+        'model': np.array(MODELS)[series // len(CUTOFFS) % len(MODELS)],
+        'cutoff': np.array(CUTOFFS)[series % len(CUTOFFS)],
+    })
+    predictions = keys.loc[keys.index.repeat(HORIZON)].reset_index(drop=True)
+    y = rng.normal(3.0, 2.5, len(predictions))
+    predictions['y'] = y
+    predictions['yhat'] = y + rng.normal(0.0, 1.5, len(predictions))
+    predictions['scale'] = np.repeat(rng.gamma(4.0, 0.5, n_series), HORIZON)
+    predictions['train_size'] = 25
+    predictions['fit_seconds'] = 0.0
+    predictions['warm_start'] = False
+    return predictions
+
+
+def loop_folds(predictions):
+    """Scores every fold on its own, like the former per-fold code."""
+    rows = []
+    for (country, model, cutoff), fold in predictions.groupby(['Country', 'model', 'cutoff'], sort=False):
+        y_true, y_pred = fold['y'].to_numpy(), fold['yhat'].to_numpy()
+        error = y_true - y_pred
+        denominator = np.abs(y_true) + np.abs(y_pred)
+        ratio = np.divide(2 * np.abs(error), denominator, out=np.zeros_like(denominator), where=denominator > 0)
+        mae = float(np.mean(np.abs(error)))
+        rows.append({'Country': country, 'model': model, 'cutoff': cutoff,
+                     'RMSE': float(np.sqrt(np.mean(error ** 2))), 'MAE': mae,
+                     'MAPE': float(np.mean(np.abs(error / y_true)) * 100), 'sMAPE': float(np.mean(ratio) * 100),
+                     'MASE': mae / fold['scale'].iloc[0]})
+    return pd.DataFrame(rows)
+
+
+def loop_importance(results, regressors=REGRESSORS):
+    """The former model_summary.py feature importance: one DataFrame per country."""
+    rows = []
+    for country, components_list in results['components'].items():
+        components_df = pd.DataFrame(components_list)
+        effects = components_df[regressors].abs().mean().to_dict()
+        effects['Trend'] = components_df['trend'].abs().mean()
+        effects['Seasonality'] = components_df['yearly'].abs().mean()
+        for feature, importance in effects.items():
+            rows.append({'Country': country, 'Feature': feature, 'Importance': importance})
+    return pd.DataFrame(rows)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--series', type=int, nargs='+', default=[1000, 10000, 100000], help='Series counts.')
+    parser.add_argument('--max-loop', type=int, default=10000, help='Largest series count run through the loops.')
+    args = parser.parse_args()
+
+    rows = []
+    for n_series in args.series:
+        predictions = make_predictions(n_series)
+        folds, grouped_seconds = timed(lambda: metrics.score_folds(predictions))
+        row = {'Workload': 'folds', 'Series': n_series, 'Rows': len(predictions), 'Grouped (s)': grouped_seconds}
+        if n_series <= args.max_loop:
+            looped, loop_seconds = timed(lambda: loop_folds(predictions))
+            merged = folds.merge(looped, on=['Country', 'model', 'cutoff'], suffixes=('', '_loop'))
+            row.update({'Loop (s)': loop_seconds, 'Speedup': loop_seconds / grouped_seconds,
+                        'Max Difference': max(np.abs(merged[m] - merged[f'{m}_loop']).max() for m in metrics.METRICS)})
+        rows.append(row)
+        print(f"folds, {n_series} series: {grouped_seconds * 1000:.1f} ms", flush=True)
+
+        results = make_results(country_names(n_series), REGRESSORS)
+        _, components, _ = metrics.results_frames(results)
+        importance, grouped_seconds = timed(lambda: metrics.component_importance(components, REGRESSORS))
+        row = {'Workload': 'importance', 'Series': n_series, 'Rows': len(importance), 'Grouped (s)': grouped_seconds}
+        if n_series <= args.max_loop:
+            looped, loop_seconds = timed(lambda: loop_importance(results))
+            row.update({'Loop (s)': loop_seconds, 'Speedup': loop_seconds / grouped_seconds,
+                        'Max Difference': np.abs(importance['Importance'] - looped['Importance']).max()})
+        rows.append(row)
+        print(f"importance, {n_series} series: {grouped_seconds * 1000:.1f} ms", flush=True)
+
+        tidy, grouped_seconds = timed(lambda: metrics.tidy_table(results, REGRESSORS))
+        rows.append({'Workload': 'tidy', 'Series': n_series, 'Rows': len(tidy), 'Grouped (s)': grouped_seconds})
+        print(f"tidy, {n_series} series: {grouped_seconds * 1000:.1f} ms", flush=True)
+
+    print()
+    print(pd.DataFrame(rows).to_markdown(index=False, floatfmt=('', '.0f', '.0f', '.3f', '.3f', '.0f', '.1e')))
+
+
+if __name__ == '__main__':
+    main()
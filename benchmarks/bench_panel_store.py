@@ -0,0 +1,121 @@
+"""Query latency of the indexed panel store vs boolean-mask filtering.
+
+Usage (from the project root):
+    python -m benchmarks.bench_panel_store [--scales 1 10 100] [--repeat 200]
+
+For every scale, a synthetic AEO table with the shape of the real file (61 countries x 29
+indicators x 41 years) times the scale in countries is generated, with the countries spread
+over the regions of regions.py. Each query is answered in three ways:
+
+- mask (wide):  boolean masks over the wide table, as the stages filter it
+                (df[(df['Indicators'] == code) & df[country_col].isin(...)][year_cols])
+- mask (panel): boolean masks over the compact long panel of compact.py
+- store:        panel_store.query() / country_series() on the store built from the panel
+
+The queries:
+- region:    the KPI in one region, 1990-2010
+- country:   the KPI of one country, all years
+- indicator: the KPI of every country, all years
+- profile:   every indicator of one country, all years
+
+The report shows the median time of each (over --repeat runs), the size of the result, and
+the time to build the store. The results of the three are checked to be the same.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import compact
+import panel_store
+from config import COUNTRY_COL, INDICATOR_CODE_COL, TARGET_KPI_CODE
+from regions import REGIONS
+from reshape import year_columns
+from benchmarks.bench_memory import make_vintage
+
+
+def median_seconds(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def make_queries(df, panel, store, regions):
+    """Returns, per query, the (mask (wide), mask (panel), store) functions returning values."""
+    year_cols = year_columns(df)
+    region = REGIONS[0]
+    region_countries = [country for country, name in regions.items() if name == region]
+    country = region_countries[0]
+    span_cols = [col for col in year_cols if 1990 <= int(col) <= 2010]
+    return {
+        'region': (
+            lambda: df[(df[INDICATOR_CODE_COL] == TARGET_KPI_CODE) & df[COUNTRY_COL].isin(region_countries)][span_cols].to_numpy(),
+            lambda: panel[
+                (panel[INDICATOR_CODE_COL] == TARGET_KPI_CODE) & panel[COUNTRY_COL].isin(region_countries)
+                & panel['year'].between(1990, 2010)
+            ]['value'].to_numpy(),
+            lambda: panel_store.query(store, TARGET_KPI_CODE, region=region, start=1990, end=2010).values,
+        ),
+        'country': (
+            lambda: df[(df[INDICATOR_CODE_COL] == TARGET_KPI_CODE) & (df[COUNTRY_COL] == country)][year_cols].to_numpy(),
+            lambda: panel[(panel[INDICATOR_CODE_COL] == TARGET_KPI_CODE) & (panel[COUNTRY_COL] == country)]['value'].to_numpy(),
+            lambda: panel_store.query(store, TARGET_KPI_CODE, countries=[country]).values,
+        ),
+        'indicator': (
+            lambda: df[df[INDICATOR_CODE_COL] == TARGET_KPI_CODE][year_cols].to_numpy(),
+            lambda: panel[panel[INDICATOR_CODE_COL] == TARGET_KPI_CODE]['value'].to_numpy(),
+            lambda: panel_store.query(store, TARGET_KPI_CODE).values,
+        ),
+        'profile': (
+            lambda: df[df[COUNTRY_COL] == country][year_cols].to_numpy(),
+            lambda: panel[panel[COUNTRY_COL] == country]['value'].to_numpy(),
+            lambda: panel_store.country_series(store, country).values,
+        ),
+    }
+
+
+def same_values(wide, long, stored):
+    """Checks that the three results hold the same cells (in any row order)."""
+    rows = lambda values: np.sort(np.nan_to_num(np.asarray(values, dtype=np.float32), nan=np.inf).reshape(-1))
+    return np.array_equal(rows(wide), rows(long)) and np.array_equal(rows(long), rows(stored))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100], help='Country count multipliers of the table.')
+    parser.add_argument('--repeat', type=int, default=200, help='Runs of every query (the median is reported).')
+    args = parser.parse_args()
+
+    rows = []
+    for scale in args.scales:
+        df = make_vintage(scale, 1, 0)
+        panel = compact.compact_panel(df)
+        countries = df[COUNTRY_COL].unique()
+        regions = {country: REGIONS[i % len(REGIONS)] for i, country in enumerate(countries)}
+
+        start = time.perf_counter()
+        store = panel_store.build_store(panel, regions)
+        build_seconds = time.perf_counter() - start
+
+        for name, (wide, long, stored) in make_queries(df, panel, store, regions).items():
+            if not same_values(wide(), long(), stored()):
+                raise RuntimeError(f"The {name} query returned different values")
+            timings = [median_seconds(fn, args.repeat) for fn in (wide, long, stored)]
+            rows.append({
+                'Countries': len(countries), 'Query': name, 'Cells': stored().size,
+                'Mask, wide (ms)': timings[0] * 1000, 'Mask, panel (ms)': timings[1] * 1000,
+                'Store (ms)': timings[2] * 1000, 'Speedup': timings[0] / timings[2],
+                'Build (s)': build_seconds,
+            })
+            print(f"{len(countries)} countries, {name}: mask {timings[0] * 1000:.3f} ms, store {timings[2] * 1000:.4f} ms", flush=True)
+
+    print()
+    print(pd.DataFrame(rows).to_markdown(index=False, floatfmt=('.0f', '', '.0f', '.3f', '.3f', '.4f', '.0f', '.2f')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Fit time of the pooled model vs the per-country Prophet loop.
+
+Usage (from the project root):
+    python -m benchmarks.bench_pooled [--countries 3 20 64] [--repeat 3]
+
+For every country count, synthetic AEO-shaped data (see benchmarks/synthetic.py) goes
+through the pipeline's preparation steps, and the training data is fitted in two ways:
+
+- prophet: forecasting_model.fit_model() for every country, one after the other
+- pooled:  one pooled_model.fit() of all countries (best of --repeat runs), with the
+           synthetic countries spread over the regions of regions.py
+
+The report shows both fit times, the iterations of the pooled fit, and the mean test RMSE
+of each (the synthetic growth is noise around the regressors, so the RMSEs only show that
+the two are in the same range; backtest.py compares them on the real data).
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+import compact
+import data_loader
+import data_prep
+import eda_and_viz
+import feature_split
+import pooled_model
+from config import REGRESSORS
+from forecasting_model import fit_model
+from regions import REGIONS
+from benchmarks.synthetic import country_names, make_aeo_table
+
+
+def make_panel(n_countries):
+    """Returns the synthetic `(df_train, df_test)` of `n_countries` countries."""
+    countries = country_names(n_countries)
+    panel = compact.compact_panel(data_loader.filter_data(make_aeo_table(n_countries), countries=countries))
+    df_gdp = eda_and_viz.add_yoy_change(data_prep.prepare_gdp_growth(panel))
+    return feature_split.split_train_test(feature_split.build_features(df_gdp, panel))
+
+
+def mean_rmse(df_test, y_pred):
+    errors = pd.DataFrame({'Country': df_test['Country'].to_numpy(), 'se': (df_test['y'].to_numpy() - y_pred) ** 2})
+    return np.sqrt(errors.groupby('Country')['se'].mean()).mean()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--countries', type=int, nargs='+', default=[3, 20, 64], help='Country counts.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of the pooled fit (the best is reported).')
+    args = parser.parse_args()
+    logging.getLogger('cmdstanpy').disabled = True
+
+    rows = []
+    for n_countries in args.countries:
+        df_train, df_test = make_panel(n_countries)
+        df_train = df_train.dropna(subset=['y'] + REGRESSORS)
+        df_test = df_test.dropna(subset=['y'] + REGRESSORS)
+        countries = df_train['Country'].unique()
+        regions = {country: REGIONS[i % len(REGIONS)] for i, country in enumerate(countries)}
+
+        start = time.perf_counter()
+        models = {country: fit_model(df_train[df_train['Country'] == country]) for country in countries}
+        prophet_seconds = time.perf_counter() - start
+
+        pooled_seconds = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            model = pooled_model.fit(df_train, regions)
+            pooled_seconds.append(time.perf_counter() - start)
+
+        prophet_pred = np.empty(len(df_test))
+        for country, fitted in models.items():
+            mask = (df_test['Country'] == country).to_numpy()
+            fitted.uncertainty_samples = 0
+            prophet_pred[mask] = fitted.predict(df_test[mask][['ds'] + REGRESSORS])['yhat'].to_numpy()
+        pooled_pred = pooled_model.predict(model, df_test)['yhat'].to_numpy()
+
+        rows.append({
+            'Countries': len(countries),
+            'Prophet Loop (s)': prophet_seconds,
+            'Pooled Fit (s)': min(pooled_seconds),
+            'Speedup': prophet_seconds / min(pooled_seconds),
+            'Iterations': model.iterations,
+            'Prophet RMSE': mean_rmse(df_test, prophet_pred),
+            'Pooled RMSE': mean_rmse(df_test, pooled_pred),
+        })
+        print(f"{len(countries)} countries: Prophet loop {prophet_seconds:.2f}s, pooled fit {min(pooled_seconds) * 1000:.1f} ms", flush=True)
+
+    print()
+    print(pd.DataFrame(rows).to_markdown(index=False, floatfmt=('.0f', '.2f', '.4f', '.0f', '.0f', '.3f', '.3f')))
+
+
+if __name__ == '__main__':
+    main()
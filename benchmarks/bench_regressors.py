@@ -0,0 +1,122 @@
+"""Regressor forecasts of regressor_forecast.py: batched VAR vs a per-country loop, and the cache.
+
+Usage (from the project root):
+    python -m benchmarks.bench_regressors [--countries 3 300 3000 30000] [--max-loop 3000]
+
+For every country count, synthetic split data (41 years of the configured regressors per
+country, with correlated yearly changes) is forecast over the forecast period in three ways:
+
+- loop:    one least squares VAR(1) fit and forecast per country (numpy.linalg.lstsq), with
+           the same standardization and AR(1) fallback, as a per-country stage would do it
+- batched: regressor_forecast.forecast_regressors(), all countries in one batched solve
+- cached:  regressor_forecast.load_paths() when the paths of every country are already in
+           the regressor_forecasts artifact (written to a temporary directory)
+
+The loop is skipped above --max-loop countries. The forecasts of the loop and of the
+batched fit are checked to be the same.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import regressor_forecast
+from config import REGRESSORS, TEST_END_YEAR, TEST_START_YEAR
+from benchmarks.synthetic import country_names
+
+N_YEARS = 41
+
+
+def make_split(n_countries, seed=0):
+    """Returns synthetic `(df_train, df_test)` with random-walk regressors per country."""
+    rng = np.random.default_rng(seed)
+    years = np.arange(TEST_END_YEAR - N_YEARS + 1, TEST_END_YEAR + 1)
+    mixing = rng.normal(0.0, 0.5, (len(REGRESSORS), len(REGRESSORS))) + np.eye(len(REGRESSORS))
+    steps = rng.normal(0.0, 1.0, (n_countries, N_YEARS, len(REGRESSORS))) @ mixing
+    values = rng.normal(0.0, 5.0, (n_countries, 1, len(REGRESSORS))) + 0.8 * np.cumsum(steps, axis=1) / np.sqrt(np.arange(1, N_YEARS + 1))[:, None]
+
+    df = pd.DataFrame({
+        'Country': np.repeat(country_names(n_countries), N_YEARS),
+        'ds': pd.to_datetime(np.tile(years, n_countries).astype(str), format='%Y'),
+        'y': rng.normal(3.0, 2.0, n_countries * N_YEARS),
+    })
+    for i, regressor in enumerate(REGRESSORS):
+        df[regressor] = values[..., i].reshape(-1)
+    in_test = df['ds'].dt.year >= TEST_START_YEAR
+    return df[~in_test].reset_index(drop=True), df[in_test].reset_index(drop=True)
+
+
+def loop_forecasts(history, horizon, max_radius=regressor_forecast.MAX_RADIUS):
+    """The VAR(1) forecasts (with the AR(1) fallback) of every country, one country at a time."""
+    forecasts = []
+    for _, group in history.groupby('Country', sort=False):
+        values = group.sort_values('ds')[REGRESSORS].to_numpy(dtype=float)
+        mean, std = values.mean(axis=0), values.std(axis=0)
+        std[std == 0] = 1.0
+        z = (values - mean) / std
+
+        design = np.column_stack([np.ones(len(z) - 1), z[:-1]])
+        coef = np.linalg.lstsq(design, z[1:], rcond=None)[0]
+        intercept, slope = coef[0], coef[1:]
+        if np.abs(np.linalg.eigvals(slope)).max() > max_radius or len(z) - 1 < len(REGRESSORS) + 3:
+            phi = np.array([np.clip(np.polyfit(z[:-1, i], z[1:, i], 1)[0], -max_radius, max_radius) for i in range(z.shape[1])])
+            intercept = z[1:].mean(axis=0) - phi * z[:-1].mean(axis=0)
+            slope = np.diag(phi)
+
+        level, path = z[-1], []
+        for _ in range(horizon):
+            level = intercept + level @ slope
+            path.append(level * std + mean)
+        forecasts.append(np.array(path))
+    return np.stack(forecasts)
+
+
+def seconds_of(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--countries', type=int, nargs='+', default=[3, 300, 3000, 30000], help='Country counts.')
+    parser.add_argument('--max-loop', type=int, default=3000, help='Largest country count run through the loop.')
+    args = parser.parse_args()
+
+    rows = []
+    for n_countries in args.countries:
+        df_train, df_test = make_split(n_countries)
+        history = regressor_forecast.history_frame(df_train, df_test)
+        horizon = len(regressor_forecast.FORECAST_YEARS)
+
+        batched, batched_seconds = seconds_of(lambda: regressor_forecast.forecast_regressors(history, 'var'))
+        row = {'Countries': n_countries, 'Batched (s)': batched_seconds, 'VAR share': (batched['Model'] == 'var').mean()}
+
+        if n_countries <= args.max_loop:
+            looped, loop_seconds = seconds_of(lambda: loop_forecasts(history, horizon))
+            difference = np.abs(batched[REGRESSORS].to_numpy().reshape(looped.shape) - looped).max()
+            row.update({'Loop (s)': loop_seconds, 'Speedup': loop_seconds / batched_seconds, 'Max Difference': difference})
+
+        previous = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.chdir(tmpdir)
+            try:
+                _, cold_seconds = seconds_of(lambda: regressor_forecast.load_paths(df_train, df_test, 'var'))
+                _, cached_seconds = seconds_of(lambda: regressor_forecast.load_paths(df_train, df_test, 'var'))
+            finally:
+                os.chdir(previous)
+        row.update({'Load, cold (s)': cold_seconds, 'Load, cached (s)': cached_seconds})
+        rows.append(row)
+        print(f"{n_countries} countries: batched {batched_seconds * 1000:.1f} ms, cached load {cached_seconds * 1000:.1f} ms", flush=True)
+
+    print()
+    report = pd.DataFrame(rows)
+    columns = ['Countries', 'Loop (s)', 'Batched (s)', 'Speedup', 'Max Difference', 'VAR share', 'Load, cold (s)', 'Load, cached (s)']
+    print(report.reindex(columns=columns).to_markdown(index=False, floatfmt=('.0f', '.4f', '.4f', '.0f', '.1e', '.2f', '.3f', '.3f')))
+
+
+if __name__ == '__main__':
+    main()
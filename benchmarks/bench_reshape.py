@@ -0,0 +1,96 @@
+"""Benchmark of the wide-to-long reshaping: melt + groupby().apply() vs the reshape.py cube.
+
+Usage (from the project root):
+    python -m benchmarks.bench_reshape [--scale N] [--repeat R]
+
+Both paths reshape every (country, indicator) series of african-economic-outlook.csv and
+interpolate the missing years. `--scale N` replicates the countries N times to simulate a
+larger panel. The two outputs are checked to be identical before timing.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from reshape import COUNTRY_COL, INDICATOR_COL, year_columns, wide_to_cube, interpolate_cube
+
+
+def load_panel(scale=1):
+    df = pd.read_csv('african-economic-outlook.csv')
+    df = df.dropna(subset=[COUNTRY_COL, INDICATOR_COL])
+    if scale > 1:
+        df = pd.concat(
+            [df.assign(**{COUNTRY_COL: df[COUNTRY_COL] + f' #{i}'}) for i in range(scale)],
+            ignore_index=True
+        )
+    return df
+
+
+def groupby_apply_path(df):
+    """The melt + pd.to_datetime + groupby().apply(interpolate) path of data_prep.py."""
+    year_cols = year_columns(df)
+    df_long = pd.melt(
+        df[[COUNTRY_COL, INDICATOR_COL] + year_cols],
+        id_vars=[COUNTRY_COL, INDICATOR_COL],
+        value_vars=year_cols,
+        var_name='Year',
+        value_name='y'
+    )
+    df_long['ds'] = pd.to_datetime(df_long['Year'].astype(int), format='%Y')
+    df_long.drop(columns=['Year'], inplace=True)
+    df_long.sort_values(by=[COUNTRY_COL, INDICATOR_COL, 'ds'], inplace=True)
+    return df_long.groupby([COUNTRY_COL, INDICATOR_COL]).apply(
+        lambda x: x.set_index('ds').interpolate(method='linear').reset_index()
+    ).reset_index(drop=True)
+
+
+def cube_path(df):
+    """The reshape.py path: one dense cube, interpolated along the year axis."""
+    cube, countries, indicators, years = wide_to_cube(df)
+    return interpolate_cube(cube), countries, indicators, years
+
+
+def time_it(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 4], help='Country replication factors.')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed repetitions (the best one is reported).')
+    args = parser.parse_args()
+
+    rows = []
+    for scale in args.scale:
+        df = load_panel(scale)
+
+        # Check that both paths produce the same numbers for every series in the table
+        legacy = groupby_apply_path(df)
+        cube, countries, indicators, years = cube_path(df)
+        country_idx = pd.Categorical(legacy[COUNTRY_COL], categories=countries).codes
+        indicator_idx = pd.Categorical(legacy[INDICATOR_COL], categories=indicators).codes
+        year_idx = np.searchsorted(years, legacy['ds'].dt.year.to_numpy())
+        np.testing.assert_array_equal(legacy['y'].to_numpy(), cube[country_idx, indicator_idx, year_idx])
+
+        legacy_seconds = time_it(lambda: groupby_apply_path(df), args.repeat)
+        cube_seconds = time_it(lambda: cube_path(df), args.repeat)
+        rows.append({
+            'Countries': len(countries),
+            'Indicators': len(indicators),
+            'Years': len(years),
+            'groupby/apply (s)': legacy_seconds,
+            'cube (s)': cube_seconds,
+            'Speedup': legacy_seconds / cube_seconds,
+        })
+
+    print(pd.DataFrame(rows).to_markdown(index=False, floatfmt=('.0f', '.0f', '.0f', '.4f', '.4f', '.0f')))
+
+
+if __name__ == '__main__':
+    main()
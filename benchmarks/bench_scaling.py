@@ -0,0 +1,90 @@
+"""End-to-end runtime of the pipeline as a function of the number of countries.
+
+Usage (from the project root):
+    python -m benchmarks.bench_scaling [--countries 3 10 30 all] [--workers W]
+
+Every run executes the stage scripts in a scratch copy of the project (so the artifacts and
+results of the working tree are not touched) with AEO_COUNTRIES set to the first N
+countries/regions of the source file, and with the model cache disabled. The report shows
+the time per stage and per country, and a least-squares line through the total times.
+"""
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import SOURCE_FILE, COUNTRY_COL, INDICATOR_CODE_COL, TARGET_KPI_CODE
+
+STAGE_SCRIPTS = ['data_loader.py', 'data_prep.py', 'eda_and_viz.py', 'feature_split.py', 'forecasting_model.py', 'model_summary.py']
+
+
+def available_countries():
+    df = pd.read_csv(SOURCE_FILE, usecols=[COUNTRY_COL, INDICATOR_CODE_COL])
+    return df.loc[df[INDICATOR_CODE_COL] == TARGET_KPI_CODE, COUNTRY_COL].dropna().unique().tolist()
+
+
+def make_workdir():
+    workdir = tempfile.mkdtemp(prefix='aeo_bench_')
+    for path in glob.glob('*.py') + [SOURCE_FILE]:
+        shutil.copy(path, workdir)
+    return workdir
+
+
+def run_pipeline(workdir, countries, workers):
+    env = dict(
+        os.environ,
+        AEO_COUNTRIES=','.join(countries),
+        AEO_EXPORT_CSV='0',
+        MPLBACKEND='Agg',
+    )
+    timings = {}
+    for script in STAGE_SCRIPTS:
+        command = [sys.executable, script]
+        if script == 'forecasting_model.py':
+            command += ['--no-cache', '--workers', str(workers)]
+        start = time.perf_counter()
+        subprocess.run(command, cwd=workdir, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings[script[:-3]] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--countries', nargs='+', default=['3', '10', '30', 'all'], help='Country counts to run ("all" for every country).')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes for the Prophet fits.')
+    args = parser.parse_args()
+
+    all_countries = available_countries()
+    counts = [len(all_countries) if n == 'all' else min(int(n), len(all_countries)) for n in args.countries]
+
+    rows = []
+    for count in counts:
+        workdir = make_workdir()
+        try:
+            timings = run_pipeline(workdir, all_countries[:count], args.workers)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        total = sum(timings.values())
+        rows.append({'Countries': count, **timings, 'Total (s)': total, 'Per Country (s)': total / count})
+        print(f"{count} countries: {total:.1f}s", flush=True)
+
+    report = pd.DataFrame(rows)
+    print()
+    print(report.to_markdown(index=False, floatfmt=['.0f'] + ['.2f'] * (len(report.columns) - 1)))
+
+    if len(report) > 1:
+        slope, intercept = np.polyfit(report['Countries'], report['Total (s)'], 1)
+        predicted = slope * report['Countries'] + intercept
+        r_squared = 1 - ((report['Total (s)'] - predicted) ** 2).sum() / ((report['Total (s)'] - report['Total (s)'].mean()) ** 2).sum()
+        print(f"\nLinear fit: {intercept:.2f}s + {slope:.3f}s per country (R^2 = {r_squared:.3f})")
+
+
+if __name__ == '__main__':
+    main()
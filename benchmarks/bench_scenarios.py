@@ -0,0 +1,86 @@
+"""Throughput of the regressor scenarios: Prophet's predict vs the closed form of scenarios.py.
+
+Usage (from the project root):
+    python -m benchmarks.bench_scenarios [--scenarios 10 100 1000 10000] [--max-predict 1000]
+
+A Prophet model with the configured regressors is fitted on a synthetic country, and the
+same Monte-Carlo regressor paths are forecast in two ways:
+
+- predict:  one `model.predict` call on a frame with a row per scenario and year (without
+            uncertainty samples), the fastest way to run many scenarios through Prophet
+- evaluate: scenarios.evaluate(), one einsum over the paths
+
+The forecasts of both are compared, and the report shows the scenarios per second of each.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import scenarios
+from config import REGRESSORS, TRAIN_END_YEAR
+from forecasting_model import fit_model, future_dates
+
+
+def make_country(n_years=36, seed=0):
+    """Returns a synthetic training frame ('ds', 'y' and the regressors) ending at TRAIN_END_YEAR."""
+    rng = np.random.default_rng(seed)
+    years = range(TRAIN_END_YEAR - n_years + 1, TRAIN_END_YEAR + 1)
+    df = pd.DataFrame({'ds': pd.to_datetime([f'{year}-01-01' for year in years])})
+    for regressor in REGRESSORS:
+        df[regressor] = rng.normal(0.0, 3.0, n_years).cumsum() / 3
+    df['y'] = 3.0 + df[REGRESSORS].to_numpy() @ rng.normal(0.0, 0.3, len(REGRESSORS)) + rng.normal(0.0, 1.0, n_years)
+    return df
+
+
+def predict_scenarios(model, ds, paths):
+    """Forecasts the paths with one Prophet predict call; returns a (scenario x year) array."""
+    n_scenarios, n_years, _ = paths.shape
+    future = pd.DataFrame({'ds': np.tile(ds.to_numpy(), n_scenarios)})
+    for i, regressor in enumerate(REGRESSORS):
+        future[regressor] = paths[:, :, i].ravel()
+    # predict() sorts the rows by date, with the scenarios in their original order per date
+    forecast = model.predict(future)['yhat'].to_numpy()
+    return forecast.reshape(n_years, n_scenarios).T
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', type=int, nargs='+', default=[10, 100, 1000, 10000], help='Scenario counts.')
+    parser.add_argument('--max-predict', type=int, default=1000, help='Largest scenario count run through predict.')
+    args = parser.parse_args()
+
+    df_train = make_country()
+    model = fit_model(df_train)
+    ds = future_dates()
+    base, effect, center, lower, upper = scenarios.prophet_base(model, ds)
+    reference, step_cov = scenarios.regressor_history(df_train)
+    scenario_base = scenarios.ScenarioBase('Synthetic', 'prophet', ds, base, effect, center, reference, lower, upper, step_cov)
+    model.uncertainty_samples = 0
+
+    rows = []
+    for n_scenarios in args.scenarios:
+        paths = scenarios.monte_carlo_paths(scenario_base, n_scenarios)
+
+        start = time.perf_counter()
+        forecasts = scenarios.evaluate(scenario_base, paths)
+        evaluate_seconds = time.perf_counter() - start
+
+        row = {'Scenarios': n_scenarios, 'Evaluate (s)': evaluate_seconds, 'Evaluate (scenarios/s)': n_scenarios / evaluate_seconds}
+        if n_scenarios <= args.max_predict:
+            start = time.perf_counter()
+            predicted = predict_scenarios(model, ds, paths)
+            predict_seconds = time.perf_counter() - start
+            row.update({'Predict (s)': predict_seconds, 'Predict (scenarios/s)': n_scenarios / predict_seconds,
+                        'Max Difference': np.abs(predicted - forecasts).max()})
+        rows.append(row)
+        print(f"{n_scenarios} scenarios: evaluate {evaluate_seconds * 1000:.2f} ms"
+              + (f", predict {row['Predict (s)'] * 1000:.1f} ms" if 'Predict (s)' in row else ''), flush=True)
+
+    print()
+    print(pd.DataFrame(rows).to_markdown(index=False, floatfmt=('.0f', '.2e', '.3g', '.2e', '.3g', '.1e')))
+
+
+if __name__ == '__main__':
+    main()
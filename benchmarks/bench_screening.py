@@ -0,0 +1,109 @@
+"""Cost of the regressor screening of feature_screening.py vs fitting the candidates with Prophet.
+
+Usage (from the project root):
+    python -m benchmarks.bench_screening [--scales 1 10 100] [--fits 5]
+
+For every scale, a synthetic AEO table with the shape of the real file (61 countries x 29
+indicators x 41 years) times the scale in countries is generated, and every indicator is
+screened at lags 0 to MAX_LAG for every country (feature_screening.screening_table(), from
+the compact panel to the tidy table). The statistics of 20 candidates are checked against
+a per-candidate least squares fit (numpy.linalg.lstsq).
+
+The screening time is compared with the time it would take to fit one Prophet model per
+candidate (Candidates x the mean time of --fits validation fits, each with the configured
+regressors, as feature_screening.validate_subset() runs them), and with the Prophet fits
+the screening leaves: every subset of the shortlist of every country.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import compact
+import feature_screening
+from config import COUNTRY_COL, INDICATOR_CODE_COL, TARGET_KPI_CODE, TRAIN_END_YEAR, REGRESSOR_INDICATORS
+from reshape import interpolate_cube
+from benchmarks.bench_memory import make_vintage
+
+
+def reference_statistics(panel, country, indicator, lag):
+    """Correlation, partial correlation and coefficient of one candidate, by least squares."""
+    def series(code):
+        rows = panel[(panel[COUNTRY_COL] == country) & (panel[INDICATOR_CODE_COL] == code) & (panel['year'] <= TRAIN_END_YEAR)]
+        return interpolate_cube(np.where(rows['observed'], rows['value'].to_numpy(dtype=float), np.nan))
+
+    y_all, x_all = series(TARGET_KPI_CODE), series(indicator)
+    x = np.full(len(x_all), np.nan)
+    x[lag:] = x_all[:len(x_all) - lag]
+    y, y_prev, x = y_all[1:], y_all[:-1], x[1:]
+    keep = ~(np.isnan(y) | np.isnan(y_prev) | np.isnan(x))
+    y, y_prev, x = y[keep], y_prev[keep], x[keep]
+
+    ar = np.column_stack([np.ones(len(y)), y_prev])
+    residuals = lambda target: target - ar @ np.linalg.lstsq(ar, target, rcond=None)[0]
+    coefficient = np.linalg.lstsq(np.column_stack([ar, x]), y, rcond=None)[0][2]
+    return np.corrcoef(y, x)[0, 1], np.corrcoef(residuals(y), residuals(x))[0, 1], coefficient
+
+
+def prophet_fit_seconds(panel, n_fits):
+    """Mean time of a validation fit of feature_screening.py, on one synthetic country."""
+    country = panel[COUNTRY_COL].cat.categories[0]
+    rows = panel[(panel[COUNTRY_COL] == country) & (panel['year'] <= TRAIN_END_YEAR)]
+    cube, _, indicators, years = compact.panel_cube(rows)
+    values = interpolate_cube(cube[0])
+    df_country = pd.DataFrame({'ds': pd.to_datetime([f'{year}-01-01' for year in years]),
+                               'y': values[indicators.index(TARGET_KPI_CODE)]})
+    for code, column in REGRESSOR_INDICATORS.items():
+        df_country[column] = values[indicators.index(code)]
+    df_country = df_country.dropna()
+
+    # (The first fit also imports Prophet)
+    feature_screening.validate_subset(country, list(REGRESSOR_INDICATORS.values()), df_country)
+    timings = []
+    for _ in range(n_fits):
+        start = time.perf_counter()
+        feature_screening.validate_subset(country, list(REGRESSOR_INDICATORS.values()), df_country)
+        timings.append(time.perf_counter() - start)
+    return float(np.mean(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100], help='Country count multipliers of the table.')
+    parser.add_argument('--fits', type=int, default=5, help='Prophet fits timed for the estimates.')
+    args = parser.parse_args()
+
+    fit_seconds = None
+    rows = []
+    for scale in args.scales:
+        panel = compact.compact_panel(make_vintage(scale, 1, 0))
+        if fit_seconds is None:
+            fit_seconds = prophet_fit_seconds(panel, args.fits)
+
+        start = time.perf_counter()
+        table = feature_screening.screening_table(panel)
+        screen_seconds = time.perf_counter() - start
+
+        sample = table.sample(min(20, len(table)), random_state=0)
+        expected = np.array([reference_statistics(panel, *key) for key in sample[['Country', 'Indicator', 'Lag']].itertuples(index=False)])
+        difference = np.abs(sample[['Correlation', 'Partial_Correlation', 'Coefficient']].to_numpy() - expected).max()
+
+        countries = table['Country'].nunique()
+        shortlist_fits = countries * 2 ** feature_screening.SHORTLIST_SIZE
+        rows.append({
+            'Countries': countries, 'Candidates': len(table), 'Screen (s)': screen_seconds,
+            'Candidates/s': len(table) / screen_seconds,
+            'Prophet, every candidate (h)': len(table) * fit_seconds / 3600,
+            'Prophet, shortlists (h)': shortlist_fits * fit_seconds / 3600,
+            'Max Difference': difference,
+        })
+        print(f"{countries} countries: {len(table):,} candidates screened in {screen_seconds:.2f}s", flush=True)
+
+    print()
+    print(f"Prophet validation fit: {fit_seconds:.3f}s (mean of {args.fits})")
+    print(pd.DataFrame(rows).to_markdown(index=False, floatfmt=('.0f', '.0f', '.3f', '.3g', '.2f', '.2f', '.1e')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Latency and throughput of the forecast server (serve.py) on localhost.
+
+Usage (from the project root):
+    python -m benchmarks.bench_serve [--requests 5000] [--clients 1 16 64] [--countries 3] [--distinct 200]
+
+The server runs in this process, on a free port of 127.0.0.1, with synthetic scenario
+models (random forecasts and regressor effects, so no pipeline run or Prophet fit is
+needed). Every client holds a keep-alive connection and sends its share of --requests GET
+/forecast queries one after the other, for a random country and one of --distinct random
+regressor shifts. The server is run in three configurations:
+
+- plain:   every request evaluated on its own (--max-batch 1), no response cache
+- batched: the requests for the same country read in the same event loop iteration
+           evaluated together
+- cached:  batched, with the LRU response cache
+
+The report shows, per configuration and client count, the throughput and the p50/p99
+latency seen by the clients, and the mean batch size and cache hits reported by /stats.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+import scenarios
+import serve
+from config import REGRESSORS
+from forecasting_model import future_dates
+from benchmarks.synthetic import country_names
+
+CONFIGURATIONS = {
+    'plain': {'max_batch': 1, 'cache_size': 0},
+    'batched': {'cache_size': 0},
+    'cached': {},
+}
+
+
+def make_bases(n_countries, seed=0):
+    """Returns synthetic ScenarioBases of `n_countries` countries."""
+    rng = np.random.default_rng(seed)
+    ds = future_dates()
+    n_years, n_regressors = len(ds), len(REGRESSORS)
+    bases = {}
+    for country in country_names(n_countries):
+        center = rng.normal(0.0, 3.0, n_regressors)
+        bases[country] = scenarios.ScenarioBase(
+            country, 'prophet', ds, rng.normal(3.0, 1.0, n_years), rng.normal(0.0, 0.3, (n_years, n_regressors)),
+            center, center + rng.normal(0.0, 1.0, n_regressors), np.full(n_years, -2.0), np.full(n_years, 2.0),
+            np.eye(n_regressors)
+        )
+    return bases
+
+
+def make_queries(countries, n_requests, n_distinct, seed=0):
+    """Returns `n_requests` query strings drawn from `n_distinct` (country, shift) combinations."""
+    rng = np.random.default_rng(seed)
+    distinct = [
+        f"/forecast?country={country.replace(' ', '%20')}&horizon=5&"
+        + '&'.join(f'{regressor}={shift:.1f}' for regressor, shift in zip(REGRESSORS, rng.normal(0.0, 2.0, len(REGRESSORS))))
+        for country in rng.choice(countries, n_distinct)
+    ]
+    return [distinct[i] for i in rng.integers(0, n_distinct, n_requests)]
+
+
+async def request(reader, writer, target):
+    """Sends a GET request on an open connection; returns the status and the JSON body."""
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode('latin-1'))
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(port, queries, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for target in queries:
+        start = time.perf_counter()
+        status, _ = await request(reader, writer, target)
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            raise RuntimeError(f"{target} answered {status}")
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run(bases, queries, n_clients, settings):
+    """Serves `queries` to `n_clients` concurrent clients; returns the client latencies, the
+    wall time and the server's /stats."""
+    state = serve.make_state(list(bases), bases.__getitem__, **settings)
+    for country in bases:
+        await serve.get_base(state, country)
+    server = await serve.start_server(state, port=0)
+    port = server.sockets[0].getsockname()[1]
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, queries[i::n_clients], latencies) for i in range(n_clients)))
+    seconds = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    _, server_stats = await request(reader, writer, '/stats')
+    writer.close()
+    await writer.wait_closed()
+    server.close()
+    await server.wait_closed()
+    return np.array(latencies), seconds, server_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000, help='Requests per run.')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 16, 64], help='Concurrent client counts.')
+    parser.add_argument('--countries', type=int, default=3, help='Synthetic countries.')
+    parser.add_argument('--distinct', type=int, default=200, help='Distinct queries the requests are drawn from.')
+    args = parser.parse_args()
+
+    bases = make_bases(args.countries)
+    queries = make_queries(list(bases), args.requests, args.distinct)
+
+    rows = []
+    for n_clients in args.clients:
+        for name, settings in CONFIGURATIONS.items():
+            latencies, seconds, server_stats = asyncio.run(run(bases, queries, n_clients, settings))
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            rows.append({
+                'Clients': n_clients, 'Server': name, 'Requests/s': len(latencies) / seconds,
+                'p50 (ms)': p50, 'p99 (ms)': p99,
+                'Mean Batch': server_stats['mean_batch_size'] or 0.0, 'Cache Hits': server_stats['cache_hits'],
+            })
+            print(f"{n_clients} clients, {name}: {len(latencies) / seconds:,.0f} requests/s, p99 {p99:.2f} ms", flush=True)
+
+    print()
+    print(pd.DataFrame(rows).to_markdown(index=False, floatfmt=('.0f', '', '.0f', '.2f', '.2f', '.1f', '.0f')))
+
+
+if __name__ == '__main__':
+    main()
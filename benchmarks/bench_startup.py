@@ -0,0 +1,149 @@
+"""Cold-start (import) time of every entry point of the project.
+
+Usage (from the project root):
+    python -m benchmarks.bench_startup [--repeat 5] [--compare latest|PATH]
+
+For every script with a `__main__` block, and for the dashboard (app.py), the top-level
+imports of the script are run in a fresh interpreter with `python -X importtime`. The
+report shows, per entry point (best of --repeat runs, after one warm-up run that compiles
+the bytecode):
+
+- the import time (the sum of the cumulative times of the top-level imports)
+- the wall time of the interpreter, startup included
+- the slowest top-level import, and which heavy libraries got loaded
+
+The results are saved as JSON in benchmarks/results/ (startup-*.json), and --compare
+prints the ratio of this run's import times to a previous results file ('latest' picks the
+most recent one).
+"""
+import argparse
+import ast
+import datetime
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.run_benchmarks import RESULTS_DIR, git_commit
+
+# Libraries that take a noticeable time to import, reported when an entry point loads them
+HEAVY_LIBRARIES = ['prophet', 'cmdstanpy', 'sklearn', 'scipy', 'matplotlib', 'seaborn', 'altair', 'streamlit', 'pyarrow']
+
+
+def entry_points():
+    """Returns the scripts with a `__main__` block, and app.py."""
+    scripts = []
+    for path in sorted(glob.glob('*.py')):
+        with open(path, 'r') as f:
+            source = f.read()
+        if path == 'app.py' or "if __name__ == '__main__':" in source:
+            scripts.append(path)
+    return scripts
+
+
+def import_statement(path):
+    """Returns the top-level imports of a script as one statement (`import a, b.c`)."""
+    with open(path, 'r') as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return 'import ' + ', '.join(dict.fromkeys(modules))
+
+
+def measure(statement, libraries=HEAVY_LIBRARIES):
+    """Runs `statement` in a fresh interpreter with -X importtime.
+
+    Returns `(import seconds, wall seconds, {top-level module: seconds}, loaded heavy libraries)`.
+    """
+    check = f"import sys; print(','.join(m for m in {libraries!r} if m in sys.modules))"
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'{statement}; {check}'],
+                            capture_output=True, text=True, check=True)
+    wall_seconds = time.perf_counter() - start
+
+    # Lines look like "import time:  self [us] | cumulative | imported package", with the
+    # package indented by its nesting level
+    top_level = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name[1:].startswith(' '):
+            top_level[name.strip()] = int(cumulative) / 1e6
+    loaded = [name for name in result.stdout.strip().split(',') if name]
+    return sum(top_level.values()), wall_seconds, top_level, loaded
+
+
+def load_previous(compare):
+    if compare == 'latest':
+        paths = sorted(glob.glob(os.path.join(RESULTS_DIR, 'startup-*.json')))
+        if not paths:
+            return None, None
+        compare = paths[-1]
+    with open(compare, 'r') as f:
+        return compare, json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per entry point (the best one is reported).')
+    parser.add_argument('--compare', help="Previous results file to compare with, or 'latest'.")
+    args = parser.parse_args()
+
+    previous_path, previous = load_previous(args.compare) if args.compare else (None, None)
+
+    records = []
+    for path in entry_points():
+        statement = import_statement(path)
+        measure(statement)
+        runs = [measure(statement) for _ in range(args.repeat)]
+        import_seconds, wall_seconds, top_level, loaded = min(runs, key=lambda run: run[0])
+        slowest = max(top_level, key=top_level.get)
+        records.append({
+            'entry_point': path,
+            'import_seconds': import_seconds,
+            'wall_seconds': min(run[1] for run in runs),
+            'slowest_import': f'{slowest} ({top_level[slowest]:.2f}s)',
+            'heavy_libraries': ', '.join(loaded),
+        })
+        print(f"{path:<22} {import_seconds:6.3f}s  {', '.join(loaded)}", flush=True)
+
+    report = pd.DataFrame(records)
+    print()
+    print(report.rename(columns={
+        'entry_point': 'Entry Point', 'import_seconds': 'Import (s)', 'wall_seconds': 'Wall (s)',
+        'slowest_import': 'Slowest Import', 'heavy_libraries': 'Heavy Libraries'
+    }).to_markdown(index=False, floatfmt='.3f'))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(RESULTS_DIR, f'startup-{timestamp}.json')
+    with open(path, 'w') as f:
+        json.dump({
+            'timestamp': timestamp,
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': records,
+        }, f, indent=2)
+    print(f"\nStartup results saved to {path}")
+
+    if previous is not None:
+        before = pd.DataFrame(previous['results'])[['entry_point', 'import_seconds']]
+        merged = report.merge(before, on='entry_point', suffixes=('', '_previous'))
+        merged['ratio'] = merged['import_seconds'] / merged['import_seconds_previous']
+        print(f"\n--- Comparison with {previous_path} (ratio > 1 means slower now) ---")
+        print(merged[['entry_point', 'import_seconds_previous', 'import_seconds', 'ratio']].to_markdown(index=False, floatfmt='.3f'))
+
+
+if __name__ == '__main__':
+    main()
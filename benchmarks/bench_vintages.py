@@ -0,0 +1,130 @@
+"""Delta ingestion of a revised AEO release (vintages.py) vs rebuilding the data stages.
+
+Usage (from the project root):
+    python -m benchmarks.bench_vintages [--scales 1 10 100] [--cells 20]
+
+For every scale, a synthetic source CSV with the shape of the real file (61 countries x 29
+indicators x 41 years) times the scale in countries is written to a scratch directory, with
+a second release of it where --cells random cells of the KPI and regressor series are
+revised. The data stages are built from the first release (every country is kept), then
+the second one is ingested in two ways:
+
+- rebuild: data_prep.py, eda_and_viz.py and feature_split.py on the whole filtered panel,
+           as the pipeline ran them before, with the panel and CSV exports written (the
+           panel is read from the vintage, so the parsing of the CSV is not included)
+- delta:   vintages.add_vintage() (parsing the CSV into the vintage store, and the cell-level
+           diff with the first release) and vintages.apply_delta() (only the countries with
+           changed cells)
+
+The train and test data and the CSV exports of both ways are checked to be the same.
+'Refits' is the number of countries the forecasting stage then refits (Prophet takes about
+a second per country).
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import vintages
+from artifact_store import csv_path, read_artifact, write_artifact
+from compact import PANEL_ARTIFACT
+from config import INDICATOR_CODE_COL, TARGET_KPI_CODE, REGRESSOR_INDICATORS
+from data_prep import prepare_gdp_growth
+from eda_and_viz import add_yoy_change
+from feature_split import build_features, split_train_test
+from reshape import year_columns
+from benchmarks.bench_memory import make_vintage
+
+# The CSV exports the delta splices, checked to be the same as after the rebuild
+EXPORTS = [PANEL_ARTIFACT, 'gdp_growth_clean_data', 'gdp_growth_final_clean_data', 'gdp_growth_multivariate_data',
+           'train_data', 'test_data']
+
+
+def revise(df, n_cells, seed=0):
+    """Returns a copy of the wide table `df` with `n_cells` random cells of the KPI and
+    regressor series revised."""
+    rng = np.random.default_rng(seed)
+    rows = np.flatnonzero(df[INDICATOR_CODE_COL].isin([TARGET_KPI_CODE] + list(REGRESSOR_INDICATORS)).to_numpy())
+    year_cols = year_columns(df)
+    values = df[year_cols].to_numpy(copy=True)
+    cells = rng.choice(len(rows) * len(year_cols), size=n_cells, replace=False)
+    values[rows[cells // len(year_cols)], cells % len(year_cols)] += rng.normal(0.0, 1.0, n_cells)
+    return df.assign(**{col: values[:, i] for i, col in enumerate(year_cols)})
+
+
+def rebuild(panel):
+    """Runs the data stages on the whole panel and writes their artifacts (and the panel),
+    like a full pipeline run. Returns the train and test data."""
+    vintages.write_panel(panel)
+    df_clean = prepare_gdp_growth(panel)
+    write_artifact(df_clean, 'gdp_growth_clean_data')
+    df_final = add_yoy_change(df_clean)
+    write_artifact(df_final, 'gdp_growth_final_clean_data')
+    df_multivariate = build_features(df_final, panel)
+    write_artifact(df_multivariate, 'gdp_growth_multivariate_data')
+    df_train, df_test = split_train_test(df_multivariate)
+    write_artifact(df_train, 'train_data')
+    write_artifact(df_test, 'test_data')
+    return df_train, df_test
+
+
+def seconds_of(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100], help='Country count multipliers of the table.')
+    parser.add_argument('--cells', type=int, default=20, help='Cells revised in the second release.')
+    args = parser.parse_args()
+
+    rows = []
+    previous = os.getcwd()
+    for scale in args.scales:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.chdir(tmpdir)
+            try:
+                first = make_vintage(scale, 1, 0)
+                first.to_csv('release-1.csv', index=False)
+                revise(first, args.cells).to_csv('release-2.csv', index=False)
+                del first
+
+                # The artifacts of the first release
+                vintages.add_vintage('release-1.csv', 'r1')
+                rebuild(vintages.read_vintage_panel('r1', countries='all'))
+
+                entry, add_seconds = seconds_of(lambda: vintages.add_vintage('release-2.csv', 'r2'))
+                diff = vintages.diff_vintages('r1', 'r2')
+                countries, delta_seconds = seconds_of(lambda: vintages.apply_delta('r2', countries='all', plots=False))
+                delta_train, delta_test = read_artifact('train_data'), read_artifact('test_data')
+                delta_csv = {name: open(csv_path(name), 'rb').read() for name in EXPORTS}
+
+                panel = vintages.read_vintage_panel('r2', countries='all')
+                (train, test), rebuild_seconds = seconds_of(lambda: rebuild(panel))
+                pd.testing.assert_frame_equal(delta_train, train.reset_index(drop=True))
+                pd.testing.assert_frame_equal(delta_test, test.reset_index(drop=True))
+                for name in EXPORTS:
+                    assert open(csv_path(name), 'rb').read() == delta_csv[name], f"{name}.csv differs"
+            finally:
+                os.chdir(previous)
+
+        n_countries = panel['Country and Regions Name'].nunique()
+        rows.append({
+            'Countries': n_countries, 'Changed Cells': len(diff), 'Rebuild (s)': rebuild_seconds,
+            'Parse + Diff (s)': add_seconds, 'Delta (s)': delta_seconds,
+            'Speedup': rebuild_seconds / delta_seconds, 'Refits': f"{len(countries)} of {n_countries}",
+        })
+        print(f"{n_countries} countries: rebuild {rebuild_seconds:.2f}s, delta {delta_seconds:.2f}s "
+              f"({len(countries)} countries), parse + diff {add_seconds:.2f}s", flush=True)
+
+    print()
+    print(pd.DataFrame(rows).to_markdown(index=False, floatfmt=('.0f', '.0f', '.3f', '.3f', '.3f', '.1f')))
+
+
+if __name__ == '__main__':
+    main()
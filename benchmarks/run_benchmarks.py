@@ -0,0 +1,249 @@
+"""Benchmark harness for the pipeline stages and the dashboard's load path.
+
+Usage (from the project root):
+    python -m benchmarks.run_benchmarks [--scales 1 10 100 1000] [--year-scale 1]
+                                        [--fit-countries 3] [--compare latest|PATH]
+
+Every stage is timed on synthetic AEO-shaped inputs (see benchmarks/synthetic.py) whose
+country count is the current one (3) times each scale, and whose year count is the
+current one (41) times --year-scale. Prophet is fitted for --fit-countries countries per
+scale and reported per country; the baseline models and the pooled model are fitted for
+every country at once and also reported per country. Each measurement records the wall
+time (best of --repeat runs) and the peak memory allocated during one extra run
+(tracemalloc).
+
+The results are saved as JSON in benchmarks/results/. --compare prints the ratio of this
+run's times to a previous results file ('latest' picks the most recent one).
+"""
+import argparse
+import datetime
+import glob
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import baseline_models
+import compact
+import data_loader
+import data_prep
+import eda_and_viz
+import feature_screening
+import feature_split
+import forecasting_model
+import model_summary
+import pooled_model
+import regressor_forecast
+from config import REGRESSORS
+from metrics import METRICS_FILE
+from dashboard_data import load_dashboard_data, load_country_forecast
+from results_store import write_results
+from benchmarks.synthetic import country_names, make_aeo_table, make_results
+
+RESULTS_DIR = os.path.join('benchmarks', 'results')
+
+# Current size of the pipeline input: 3 countries, 41 years (1980-2020)
+BASE_COUNTRIES = 3
+BASE_YEARS = 41
+
+
+def measure(fn, repeat=3):
+    """Returns `(best wall seconds, peak traced MB)` of `fn()`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    # Memory is measured in a separate run, since tracing slows the code down
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(timings), peak / 1e6
+
+
+def benchmark_scale(scale, year_scale, fit_countries, repeat):
+    """Times every stage at one scale and returns the measurements."""
+    n_countries = BASE_COUNTRIES * scale
+    n_years = BASE_YEARS * year_scale
+    records = []
+
+    def record(stage, fn, rows, repeat=repeat, per=1):
+        seconds, peak_mb = measure(fn, repeat)
+        records.append({
+            'stage': stage,
+            'scale': scale,
+            'year_scale': year_scale,
+            'countries': n_countries,
+            'years': n_years,
+            'rows': rows,
+            'seconds': seconds / per,
+            'peak_mb': peak_mb,
+        })
+        print(f"  {stage:<30} {seconds / per:9.4f}s  {peak_mb:9.1f} MB", flush=True)
+
+    print(f"\n--- Scale {scale}x countries, {year_scale}x years: {n_countries} countries x {n_years} years ---")
+    df_source = make_aeo_table(n_countries, n_years)
+    countries = country_names(n_countries)
+
+    # data_loader.py: row filtering of the source table
+    df_filtered = data_loader.filter_data(df_source, countries=countries)
+    record('data_loader.filter_data', lambda: data_loader.filter_data(df_source, countries=countries), len(df_source))
+
+    # data_loader.py: the filtered rows as the compact panel the stages read (see compact.py)
+    panel = compact.compact_panel(df_filtered)
+    record('data_loader.compact_panel', lambda: compact.compact_panel(df_filtered), len(df_filtered))
+
+    # data_prep.py: KPI selection, panel to cube and interpolation
+    df_clean = data_prep.prepare_gdp_growth(panel)
+    record('data_prep.prepare_gdp_growth', lambda: data_prep.prepare_gdp_growth(panel), len(panel))
+
+    # eda_and_viz.py: YoY change and summary statistics (the plots are not timed)
+    df_gdp = eda_and_viz.add_yoy_change(df_clean)
+    record('eda_and_viz.summary', lambda: eda_and_viz.summary_statistics(eda_and_viz.add_yoy_change(df_clean)), len(df_clean))
+
+    # feature_split.py: regressor merge and train/test split
+    df_final = feature_split.build_features(df_gdp, panel)
+    record(
+        'feature_split.build_and_split',
+        lambda: feature_split.split_train_test(feature_split.build_features(df_gdp, panel)),
+        len(df_gdp)
+    )
+    df_train, df_test = feature_split.split_train_test(df_final)
+
+    # feature_screening.py: correlation/partial correlation/OLS screening of every indicator and lag
+    record('feature_screening.screen', lambda: feature_screening.screening_table(panel), len(panel))
+
+    # regressor_forecast.py: VAR forecasts of the regressors of every country (not cached)
+    paths = regressor_forecast.load_paths(df_train, df_test, use_cache=False)
+    record('regressor_forecast.fit', lambda: regressor_forecast.load_paths(df_train, df_test, use_cache=False), len(df_train) + len(df_test))
+
+    # forecasting_model.py: Prophet fit and predict, per country
+    sample = df_train['Country'].unique()[:fit_countries]
+    if len(sample):
+        futures = [regressor_forecast.country_paths(paths, c) for c in sample]
+        trains = [df_train[df_train['Country'] == c][['ds', 'y'] + REGRESSORS] for c in sample]
+        tests = [df_test[df_test['Country'] == c][['ds'] + REGRESSORS] for c in sample]
+        models = [forecasting_model.fit_model(train) for train in trains]
+
+        def fit_all():
+            for train in trains:
+                forecasting_model.fit_model(train)
+
+        def predict_all():
+            for model, test, future in zip(models, tests, futures):
+                model.predict(test)
+                model.predict(future)
+
+        record('forecasting_model.fit', fit_all, len(df_train), repeat=1, per=len(sample))
+        record('forecasting_model.predict', predict_all, len(df_test), repeat=1, per=len(sample))
+
+    # baseline_models.py: every baseline model, fitted for all countries at once (reported per country)
+    horizon = len(forecasting_model.FORECAST_YEARS) + df_test['ds'].dt.year.nunique()
+    record(
+        'baseline_models.fit',
+        lambda: [baseline_models.forecast_baseline(model, df_train, horizon) for model in baseline_models.BASELINE_MODELS],
+        len(df_train),
+        per=df_train['Country'].nunique()
+    )
+
+    # pooled_model.py: one pooled fit of every country (reported per country)
+    record('pooled_model.fit', lambda: pooled_model.fit(df_train), len(df_train), per=df_train['Country'].nunique())
+
+    # model_summary.py: metrics table and feature importance
+    results = make_results(countries, REGRESSORS)
+    record(
+        'model_summary.summarize',
+        lambda: (model_summary.metrics_table(results), model_summary.summary_table(results)),
+        n_countries
+    )
+
+    # app.py: cold start on the saved pipeline outputs (load_data() and the first country's forecast)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        write_results(results, tmpdir)
+        model_summary.summary_table(results).to_csv(os.path.join(tmpdir, METRICS_FILE), index=False)
+        for name in ['eda_insights.txt', 'model_insights.txt']:
+            with open(os.path.join(tmpdir, name), 'w') as f:
+                f.write('insights')
+        record('app.load_data', lambda: (load_dashboard_data(tmpdir), load_country_forecast(countries[0], tmpdir)), n_countries)
+
+    return records
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous(compare):
+    if compare == 'latest':
+        paths = sorted(glob.glob(os.path.join(RESULTS_DIR, 'bench-*.json')))
+        if not paths:
+            return None, None
+        compare = paths[-1]
+    with open(compare, 'r') as f:
+        return compare, json.load(f)
+
+
+def print_comparison(records, previous_path, previous):
+    keys = ['stage', 'scale', 'year_scale']
+    current = pd.DataFrame(records)
+    before = pd.DataFrame(previous['results'])[keys + ['seconds', 'peak_mb']]
+    merged = current.merge(before, on=keys, suffixes=('', '_previous'))
+    merged['time_ratio'] = merged['seconds'] / merged['seconds_previous']
+    merged['memory_ratio'] = merged['peak_mb'] / merged['peak_mb_previous']
+    print(f"\n--- Comparison with {previous_path} (ratio > 1 means slower / more memory now) ---")
+    print(merged[keys + ['seconds_previous', 'seconds', 'time_ratio', 'memory_ratio']].to_markdown(index=False, floatfmt='.3f'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100], help='Country count multipliers.')
+    parser.add_argument('--year-scale', type=int, default=1, help='Year count multiplier (at most 8, the range of pandas datetimes).')
+    parser.add_argument('--fit-countries', type=int, default=3, help='Countries fitted with Prophet per scale.')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed repetitions (the best one is reported).')
+    parser.add_argument('--compare', help="Previous results file to compare with, or 'latest'.")
+    args = parser.parse_args()
+
+    # Prophet logs every Stan optimization through cmdstanpy (which resets its level on first use)
+    logging.getLogger('cmdstanpy').disabled = True
+
+    # Pick the previous results before this run's file is written
+    previous_path, previous = load_previous(args.compare) if args.compare else (None, None)
+
+    records = []
+    for scale in args.scales:
+        records.extend(benchmark_scale(scale, args.year_scale, args.fit_countries, args.repeat))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(RESULTS_DIR, f'bench-{timestamp}.json')
+    with open(path, 'w') as f:
+        json.dump({
+            'timestamp': timestamp,
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+            'results': records,
+        }, f, indent=2)
+    print(f"\nBenchmark results saved to {path}")
+
+    if previous is not None:
+        print_comparison(records, previous_path, previous)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Synthetic African Economic Outlook tables for the benchmarks.
+
+The tables have the schema of african-economic-outlook.csv (identifier columns plus one
+column per year) with any number of countries and years, so the pipeline stages can be
+timed well beyond the size of the real data.
+"""
+import numpy as np
+import pandas as pd
+
+from config import (
+    COUNTRY_CODE_COL, COUNTRY_COL, REGION_ID_COL, INDICATOR_CODE_COL, INDICATOR_COL,
+    TARGET_KPI_CODE, TARGET_KPI_NAME, REGRESSOR_INDICATORS, TEST_END_YEAR
+)
+
+# The earliest year pandas can represent as a datetime is 1677, which bounds the year count
+MAX_YEARS = TEST_END_YEAR - 1677
+
+
+def country_names(n_countries):
+    return [f'Country {i:05d}' for i in range(n_countries)]
+
+
+def make_aeo_table(n_countries, n_years=41, indicator_codes=None, missing_rate=0.03, seed=0):
+    """Returns a wide AEO-shaped table with `n_countries` x `indicator_codes` rows.
+
+    The years end at TEST_END_YEAR. Each series is a noisy mean-reverting path, and a
+    fraction `missing_rate` of the cells is left empty to exercise the interpolation.
+    """
+    if n_years > MAX_YEARS:
+        raise ValueError(f"At most {MAX_YEARS} years are supported (got {n_years})")
+    if indicator_codes is None:
+        indicator_codes = [TARGET_KPI_CODE] + list(REGRESSOR_INDICATORS)
+
+    rng = np.random.default_rng(seed)
+    years = [str(year) for year in range(TEST_END_YEAR - n_years + 1, TEST_END_YEAR + 1)]
+    n_rows = n_countries * len(indicator_codes)
+
+    # Mean-reverting AR(1) paths around a per-series level
+    level = rng.normal(3.0, 2.0, size=(n_rows, 1))
+    shocks = rng.normal(0.0, 2.0, size=(n_rows, n_years))
+    values = np.empty((n_rows, n_years))
+    values[:, 0] = shocks[:, 0]
+    for t in range(1, n_years):
+        values[:, t] = 0.6 * values[:, t - 1] + shocks[:, t]
+    values += level
+    values[rng.random(values.shape) < missing_rate] = np.nan
+
+    names = country_names(n_countries)
+    df = pd.DataFrame({
+        COUNTRY_CODE_COL: np.repeat([f'C{i:05d}' for i in range(n_countries)], len(indicator_codes)),
+        COUNTRY_COL: np.repeat(names, len(indicator_codes)),
+        REGION_ID_COL: np.repeat([f'R{i % 5}' for i in range(n_countries)], len(indicator_codes)),
+        INDICATOR_CODE_COL: np.tile(indicator_codes, n_countries),
+        INDICATOR_COL: np.tile(
+            [TARGET_KPI_NAME if code == TARGET_KPI_CODE else f'Indicator {code}' for code in indicator_codes],
+            n_countries
+        ),
+    })
+    return pd.concat([df, pd.DataFrame(values, columns=years)], axis=1)
+
+
+def make_results(countries, regressors, n_history=35, n_test=5, n_future=5, seed=0):
+    """Returns a forecasting_results.json-shaped dict with random forecasts and components."""
+    rng = np.random.default_rng(seed)
+    history_years = range(TEST_END_YEAR - n_test - n_history + 1, TEST_END_YEAR - n_test + 1)
+    test_years = range(TEST_END_YEAR - n_test + 1, TEST_END_YEAR + 1)
+    future_years = range(TEST_END_YEAR + 1, TEST_END_YEAR + n_future + 1)
+
+    results = {'forecasts': {}, 'metrics': {}, 'components': {}}
+    for country in countries:
+        rows = []
+        for kind, years in [('Historical (Train)', history_years), ('Historical (Test)', test_years),
+                            ('Forecast (Test)', test_years), ('Forecast (Future)', future_years)]:
+            is_forecast = kind.startswith('Forecast')
+            for year in years:
+                y = float(rng.normal(3.0, 2.0))
+                rows.append({
+                    'ds': f'{year}-01-01',
+                    'y': y,
+                    'type': kind,
+                    'yhat_lower': y - 2.0 if is_forecast else float('nan'),
+                    'yhat_upper': y + 2.0 if is_forecast else float('nan'),
+                    'Country': country,
+                })
+        results['forecasts'][country] = rows
+        results['metrics'][country] = {
+            'RMSE': float(rng.gamma(2.0)), 'MAE': float(rng.gamma(2.0)), 'MAPE': float(rng.gamma(2.0, 50.0))
+        }
+        results['components'][country] = [
+            {
+                'ds': f'{year}-01-01',
+                'trend': float(rng.normal(3.0)),
+                'yearly': float(rng.normal(0.0, 0.1)),
+                **{regressor: float(rng.normal()) for regressor in regressors},
+            }
+            for year in test_years
+        ]
+    return results
@@ -0,0 +1,142 @@
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from regions import AGGREGATES, COUNTRY_REGIONS, OTHER_REGION
+
+# Server-side preparation of the dashboard's cross-country comparison chart.
+#
+# Instead of sending the actual GDP growth of every country (one line per country, which
+# grows with the number of countries and is unreadable beyond a handful), the chart shows a
+# summary of it, computed here: the mean per region, percentile bands across countries, or
+# the most volatile countries. Every view is turned into a Vega-Lite spec once, with its
+# (small) data inlined, and the dashboard caches the spec (dashboard_cache.py). On a rerun
+# the app only adds the series of the selected country to the cached spec, as the
+# SELECTED_DATASET dataset, which is drawn on top of every view.
+
+COMPARISON_VIEWS = ['Regional averages', 'Distribution across countries', 'Most volatile countries']
+
+# Percentiles of the distribution view: outer band, inner band and median
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Countries shown in the volatility view
+TOP_VOLATILE = 5
+
+# Name of the dataset holding the selected country's series in the specs
+SELECTED_DATASET = 'selected_country'
+
+Y_TITLE = 'GDP Growth (Annual %)'
+
+
+def _countries_only(df_comparison):
+    """Drops the aggregate rows ('Africa', 'East Africa', ...), unless there is nothing else."""
+    df = df_comparison[~df_comparison['Country'].isin(AGGREGATES)]
+    return df if not df.empty else df_comparison
+
+
+def regional_means(df_comparison, regions=None):
+    """Returns the mean growth per region and year ('Region', 'ds', 'y', 'Countries')."""
+    df = _countries_only(df_comparison).dropna(subset=['y'])
+    region = df['Country'].map(COUNTRY_REGIONS if regions is None else regions).fillna(OTHER_REGION)
+    means = df.groupby([region.rename('Region'), 'ds'])['y'].agg(['mean', 'count']).reset_index()
+    return means.rename(columns={'mean': 'y', 'count': 'Countries'})
+
+
+def percentile_bands(df_comparison):
+    """Returns the PERCENTILES of the growth across countries per year ('ds', 'p10', ..., 'Countries')."""
+    wide = _countries_only(df_comparison).pivot_table(index='ds', columns='Country', values='y')
+    bands = pd.DataFrame(np.nanpercentile(wide.to_numpy(), PERCENTILES, axis=1).T,
+                         columns=[f'p{p}' for p in PERCENTILES])
+    bands.insert(0, 'ds', wide.index)
+    bands['Countries'] = wide.notna().sum(axis=1).to_numpy()
+    return bands
+
+
+def top_volatile(df_comparison, n=TOP_VOLATILE):
+    """Returns the series of the `n` countries with the largest standard deviation of growth."""
+    df = _countries_only(df_comparison)
+    volatility = df.groupby('Country')['y'].std().nlargest(n)
+    top = df[df['Country'].isin(volatility.index)]
+    return top.assign(Volatility=top['Country'].map(volatility))
+
+
+def _year_axis():
+    return alt.X('ds:T', title='Year')
+
+
+def _year_tooltip():
+    return alt.Tooltip('ds:T', title='Year', format='%Y')
+
+
+def _selected_layer():
+    """The series of the selected country, read from the SELECTED_DATASET dataset."""
+    return alt.Chart(alt.NamedData(name=SELECTED_DATASET)).mark_line(color='black', strokeWidth=2.5).encode(
+        x=_year_axis(),
+        y=alt.Y('y:Q', title=Y_TITLE),
+        tooltip=['Country:N', _year_tooltip(), alt.Tooltip('y:Q', title='Growth', format='.2f')]
+    )
+
+
+def _regional_chart(df_comparison, regions, top_n):
+    means = regional_means(df_comparison, regions)
+    lines = alt.Chart(means).mark_line(point=True).encode(
+        x=_year_axis(),
+        y=alt.Y('y:Q', title=Y_TITLE),
+        color=alt.Color('Region:N'),
+        tooltip=['Region:N', _year_tooltip(), alt.Tooltip('y:Q', title='Mean Growth', format='.2f'), 'Countries:Q']
+    )
+    return lines, 'Mean GDP Growth by Region'
+
+
+def _distribution_chart(df_comparison, regions, top_n):
+    bands = percentile_bands(df_comparison)
+    outer_low, inner_low, median, inner_high, outer_high = (f'p{p}' for p in PERCENTILES)
+    base = alt.Chart(bands).encode(x=_year_axis())
+    outer = base.mark_area(opacity=0.2, color='steelblue').encode(y=alt.Y(f'{outer_low}:Q', title=Y_TITLE), y2=f'{outer_high}:Q')
+    inner = base.mark_area(opacity=0.4, color='steelblue').encode(y=f'{inner_low}:Q', y2=f'{inner_high}:Q')
+    median_line = base.mark_line(color='steelblue').encode(
+        y=f'{median}:Q',
+        tooltip=[_year_tooltip()] + [alt.Tooltip(f'p{p}:Q', title=f'{p}th Percentile', format='.2f') for p in PERCENTILES] + ['Countries:Q']
+    )
+    title = (f'GDP Growth across {bands["Countries"].max()} Countries '
+             f'(median, {PERCENTILES[1]}-{PERCENTILES[-2]}th and {PERCENTILES[0]}-{PERCENTILES[-1]}th percentiles)')
+    return alt.layer(outer, inner, median_line), title
+
+
+def _volatile_chart(df_comparison, regions, top_n):
+    top = top_volatile(df_comparison, top_n)
+    lines = alt.Chart(top).mark_line(point=True).encode(
+        x=_year_axis(),
+        y=alt.Y('y:Q', title=Y_TITLE),
+        color=alt.Color('Country:N'),
+        tooltip=['Country:N', _year_tooltip(), alt.Tooltip('y:Q', title='Growth', format='.2f'),
+                 alt.Tooltip('Volatility:Q', title='Std. Dev.', format='.2f')]
+    )
+    return lines, f'GDP Growth of the {top["Country"].nunique()} Most Volatile Countries'
+
+
+VIEW_CHARTS = dict(zip(COMPARISON_VIEWS, [_regional_chart, _distribution_chart, _volatile_chart]))
+
+
+def comparison_spec(view, df_comparison, regions=None, top_n=TOP_VOLATILE):
+    """Returns the Vega-Lite spec (a dict, data included) of one of the COMPARISON_VIEWS.
+
+    `df_comparison` holds the actual growth of all countries ('Country', 'ds', 'y'), and
+    `regions` maps countries to regions (COUNTRY_REGIONS by default).
+    """
+    chart, title = VIEW_CHARTS[view](df_comparison, regions, top_n)
+    chart = alt.layer(chart, _selected_layer()).properties(title=title).interactive()
+    # The summaries are small, but lift Altair's row limit for very large country sets.
+    # Without a theme, the chart takes the width of its container in the dashboard.
+    with alt.data_transformers.enable('default', max_rows=None), alt.theme.enable('none'):
+        return chart.to_dict()
+
+
+def with_selected_country(spec, df_history, country):
+    """Returns a copy of `spec` with the actual growth of `country` ('ds', 'y') to highlight.
+
+    Only the top level of the spec is copied, so the cached spec itself is not modified.
+    """
+    history = df_history[['ds', 'y']].dropna()
+    values = history.assign(ds=history['ds'].dt.strftime('%Y-%m-%d'), Country=country).to_dict(orient='records')
+    return {**spec, 'datasets': {**spec.get('datasets', {}), SELECTED_DATASET: values}}
@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from artifact_store import artifact_path, csv_path
+from config import ID_COLUMNS, COUNTRY_COL, INDICATOR_CODE_COL
+from instrumentation import span
+from reshape import rows_to_cube, year_columns
+
+# Canonical compact representation of the AEO panel, in long format: one row per cell of
+# the source table, i.e. per (source row, year).
+#
+#   identifier columns (ID_COLUMNS)  category  - the country and indicator names and codes
+#   'year'                           int16
+#   'value'                          float32   - NaN where the cell is missing
+#   'observed'                       bool      - the explicit missing mask
+#
+# The wide source table keeps the five identifier columns as Python strings on every row
+# and the values as float64, and melting it to long format repeats the strings for every
+# year. Here an identifier costs its category code (one or two bytes), and a cell about
+# 14 bytes in all, so the panel of all countries x indicators x years (and several vintages
+# of it) stays small. float32 keeps 7 significant digits of the values (a relative error
+# below 6e-8, far below the precision of the AEO estimates); panel_cube() returns float64
+# for the computations.
+#
+# The panel is dense and ordered: every source row has one row per year, in year order, so
+# the cells of a source row are contiguous and the wide table can be rebuilt by reshaping.
+
+PANEL_COLUMNS = ID_COLUMNS + ['year', 'value', 'observed']
+
+# The panel of the pipeline (the filtered source rows), written by data_loader.py
+PANEL_ARTIFACT = 'initial_filtered_data'
+
+
+def compact_panel(df):
+    """Turns a wide AEO table (ID_COLUMNS and one column per year) into the compact panel."""
+    year_cols = year_columns(df)
+    n_years = len(year_cols)
+    values = df[year_cols].to_numpy(dtype=np.float32).reshape(-1)
+    panel = {
+        # Categories per column first, so that only the codes are repeated for the years
+        col: pd.Categorical(df[col]).take(np.repeat(np.arange(len(df)), n_years))
+        for col in ID_COLUMNS
+    }
+    panel['year'] = np.tile(np.array([int(col) for col in year_cols], dtype=np.int16), len(df))
+    panel['value'] = values
+    panel['observed'] = ~np.isnan(values)
+    return pd.DataFrame(panel)
+
+
+def panel_years(panel):
+    """Returns the years of the panel (the same for every source row), as int16."""
+    return np.unique(panel['year'].to_numpy())
+
+
+def series_rows(panel):
+    """Returns the first panel row of every source row, its values as a (row x year) float64
+    array (NaN where missing) and the years."""
+    years = panel_years(panel).astype(int)
+    step = max(len(years), 1)
+    values = np.where(panel['observed'].to_numpy(), panel['value'].to_numpy(dtype=float), np.nan)
+    return panel.iloc[::step], values.reshape(-1, step)[:, :len(years)], years
+
+
+def wide_table(panel):
+    """Rebuilds the wide AEO table (float64 year columns, NaN where missing) from the panel."""
+    rows, values, years = series_rows(panel)
+    ids = pd.DataFrame({col: rows[col].astype(object).to_numpy() for col in ID_COLUMNS})
+    return pd.concat([ids, pd.DataFrame(values, columns=[str(year) for year in years])], axis=1)
+
+
+def panel_cube(panel, countries=None, indicators=None, country_col=COUNTRY_COL, indicator_col=INDICATOR_CODE_COL):
+    """Turns the panel into a (country x indicator x year) float64 cube, like
+    reshape.wide_to_cube() does with the wide table. Returns `(cube, countries, indicators, years)`."""
+    rows, values, years = series_rows(panel)
+    return rows_to_cube(rows[country_col].array, rows[indicator_col].array, lambda keep: values[keep],
+                        years, countries, indicators)
+
+
+def read_panel(name=PANEL_ARTIFACT, countries=None, indicator_codes=None):
+    """Loads the panel artifact `name`, optionally only the rows of `countries` and
+    `indicator_codes` (pushed down to the Parquet reader). The categories are limited to the
+    values present. If only the CSV export (in the wide layout) exists, it is compacted."""
+    filters = []
+    if countries is not None:
+        filters.append((COUNTRY_COL, 'in', list(countries)))
+    if indicator_codes is not None:
+        filters.append((INDICATOR_CODE_COL, 'in', list(indicator_codes)))
+
+    with span('artifact.read', artifact=name) as fields:
+        if os.path.exists(artifact_path(name)):
+            panel = pd.read_parquet(artifact_path(name), filters=filters or None)
+        else:
+            fields['csv'] = True
+            wide = pd.read_csv(csv_path(name), keep_default_na=False, na_values=[''])
+            for col, values in zip([COUNTRY_COL, INDICATOR_CODE_COL], [countries, indicator_codes]):
+                if values is not None:
+                    wide = wide[wide[col].isin(values)]
+            panel = compact_panel(wide)
+        fields['rows'] = len(panel)
+
+    for col in ID_COLUMNS:
+        # (An empty panel comes back from Parquet without the categorical type)
+        panel[col] = panel[col].astype('category').cat.remove_unused_categories()
+    return panel.reset_index(drop=True)
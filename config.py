@@ -0,0 +1,111 @@
+import csv
+import os
+
+import pandas as pd
+
+# Shared configuration of the forecasting pipeline.
+# The pipeline runner (pipeline.py) fingerprints these values, so changing any of them
+# re-runs the stages that depend on them.
+
+# Copy-on-write: selecting rows or columns of a frame returns a lazy copy that shares the
+# data until one of the two is modified, so the stages do not .copy() their selections
+# defensively (and never modify a frame they were given through a selection of it).
+pd.set_option('mode.copy_on_write', True)
+
+SOURCE_FILE = 'african-economic-outlook.csv'
+
+# Known schema of the African Economic Outlook CSV. The stages select columns by these
+# names instead of searching the data for them.
+COUNTRY_CODE_COL = 'Country and Regions'
+COUNTRY_COL = 'Country and Regions Name'
+REGION_ID_COL = 'Country and Regions - RegionId'
+INDICATOR_CODE_COL = 'Indicators'
+INDICATOR_COL = 'Indicators Name'
+ID_COLUMNS = [COUNTRY_CODE_COL, COUNTRY_COL, REGION_ID_COL, INDICATOR_CODE_COL, INDICATOR_COL]
+
+# The KPI to forecast: 'Real GDP growth (annual %)'
+TARGET_KPI_CODE = 'NY.GDP.MKTP.KD.ZG'
+TARGET_KPI_NAME = 'Real GDP growth (annual %)'
+
+# Countries (or regions, e.g. 'East Africa') to forecast.
+# Override with AEO_COUNTRIES="Kenya,Ghana" or AEO_COUNTRIES=all (every country and region).
+DEFAULT_COUNTRIES = ['Kenya', 'South Africa', 'Nigeria']
+
+# Regressor indicators (by indicator code) and the column names they get in the model data.
+# Override with AEO_REGRESSORS="FP.CPI.TOTL.ZG,NE.EXPO.GNFS.ZS" or AEO_REGRESSORS=all (every
+# indicator other than the KPI). Indicators without a name here use their code, with dots
+# replaced by underscores, as column name.
+DEFAULT_REGRESSOR_INDICATORS = {
+    'GC.BAL.CASH.GD.ZS': 'Fiscal_Balance',
+    'BG.WEO.ADB.CAB.GDP.ZS': 'Current_Account_Balance',
+    'FP.CPI.TOTL.ZG': 'Inflation',
+}
+
+# --- Train-Test Split ---
+# Training: 1980–2015
+# Testing: 2016–2020
+TRAIN_END_YEAR = 2015
+TEST_START_YEAR = 2016
+TEST_END_YEAR = 2020
+
+# First training cutoff of the rolling-origin backtest (backtest.py), which scores the years
+# after it. The regressor subsets of feature_screening.py are scored on the years up to it,
+# so that no backtest fold is scored on the years its regressors were selected on.
+BACKTEST_FIRST_CUTOFF = 2005
+
+# Forecast horizon (2021-2025)
+FORECAST_YEARS = range(TEST_END_YEAR + 1, TEST_END_YEAR + 6)
+
+# How the regressors are forecast over the forecast period (see regressor_forecast.py):
+# 'var' (a VAR(1) of the regressors of each country), 'ar' (an AR(1) of each regressor) or
+# 'last' (the TEST_END_YEAR values carried forward). Override with AEO_REGRESSOR_MODEL.
+REGRESSOR_MODEL = os.environ.get('AEO_REGRESSOR_MODEL', 'var')
+
+# How the forecasts' uncertainty intervals are computed (see intervals.py): 'analytic',
+# 'cached' (INTERVAL_SAMPLES simulated paths reused per model) or 'prophet' (Prophet's own
+# sampling, slower). Override with AEO_INTERVAL_MODE and AEO_INTERVAL_SAMPLES.
+INTERVAL_MODE = os.environ.get('AEO_INTERVAL_MODE', 'analytic')
+INTERVAL_SAMPLES = int(os.environ.get('AEO_INTERVAL_SAMPLES', 200))
+
+# Whether the Prophet model of every country uses the regressors selected for it by
+# feature_screening.py (selected_regressors.json), or all of them (AEO_SELECT_REGRESSORS=0).
+SELECT_REGRESSORS = os.environ.get('AEO_SELECT_REGRESSORS', '1') != '0'
+
+
+def parse_selection(value, default):
+    """Parses a comma-separated selection from the environment or the command line.
+
+    Returns `default` if `value` is empty, 'all' for "all", and the list of items otherwise.
+    """
+    if value is None or not value.strip():
+        return default
+    if value.strip().lower() == 'all':
+        return 'all'
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def regressor_column(indicator_code):
+    """Returns the model column name of a regressor indicator."""
+    return DEFAULT_REGRESSOR_INDICATORS.get(indicator_code, indicator_code.replace('.', '_'))
+
+
+def source_indicator_codes(path=SOURCE_FILE):
+    """Returns the indicator codes of the source CSV, in file order, without loading the values."""
+    codes = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            code = row[INDICATOR_CODE_COL]
+            if code and code not in codes:
+                codes.append(code)
+    return codes
+
+
+COUNTRIES = parse_selection(os.environ.get('AEO_COUNTRIES'), DEFAULT_COUNTRIES)
+
+_regressor_codes = parse_selection(os.environ.get('AEO_REGRESSORS'), list(DEFAULT_REGRESSOR_INDICATORS))
+if _regressor_codes == 'all':
+    _regressor_codes = [code for code in source_indicator_codes() if code != TARGET_KPI_CODE]
+
+# Regressor indicator code -> model column name, and the model columns
+REGRESSOR_INDICATORS = {code: regressor_column(code) for code in _regressor_codes}
+REGRESSORS = list(REGRESSOR_INDICATORS.values())
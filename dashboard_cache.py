@@ -0,0 +1,127 @@
+from collections import namedtuple
+
+import streamlit as st
+
+import chart_prep
+import dashboard_data
+import scenarios
+import vintages
+from artifact_store import artifact_exists
+
+# Cached data access for app.py.
+#
+# Streamlit re-runs the whole app script on every widget interaction, so everything the app
+# shows comes from these functions instead of being filtered out of the full results on each
+# run. The data shared by all countries is loaded once per server process with
+# st.cache_resource: it is read-only, so it is not copied on every rerun. The data of a
+# country is prepared once per country with st.cache_data (which returns a copy, so the
+# app may modify it). The work done on a rerun then depends on the size of one country's
+# data, not on the number of countries.
+
+# Countries whose prepared data is kept in memory
+COUNTRY_CACHE_ENTRIES = 128
+
+# Everything the app shows about one country
+CountryData = namedtuple('CountryData', ['forecast', 'historical', 'forecast_viz', 'metrics', 'importance'])
+
+
+@st.cache_resource
+def load_overview():
+    """Loads the metrics, feature importance and insights of all countries (shared, read-only).
+
+    Returns `(df_metrics, df_importance, eda_insights, model_insights)`, or Nones if the
+    pipeline outputs cannot be loaded.
+    """
+    try:
+        return dashboard_data.load_dashboard_data()
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        return None, None, None, None
+
+
+@st.cache_data(max_entries=COUNTRY_CACHE_ENTRIES)
+def load_country(country):
+    """Returns the forecast of `country` split into actuals and forecasts, with its metrics
+    and feature importance."""
+    df_metrics, df_importance, _, _ = load_overview()
+    df_country = dashboard_data.load_country_forecast(country)
+    df_historical, df_forecast_viz = dashboard_data.split_forecast(df_country)
+    return CountryData(
+        forecast=df_country,
+        historical=df_historical,
+        forecast_viz=df_forecast_viz,
+        metrics=df_metrics[df_metrics['Country'] == country].iloc[0],
+        importance=dashboard_data.country_importance(df_importance, country)
+    )
+
+
+@st.cache_resource
+def load_comparison():
+    """Returns the actual GDP growth of all countries for the comparison chart (shared, read-only)."""
+    return dashboard_data.load_comparison()
+
+
+@st.cache_resource
+def load_comparison_spec(view):
+    """Returns the Vega-Lite spec of one of chart_prep.COMPARISON_VIEWS (shared, read-only).
+
+    The spec holds the summary of all countries the view shows, not their full series.
+    """
+    return chart_prep.comparison_spec(view, load_comparison())
+
+
+@st.cache_resource
+def load_backtest():
+    """Loads the rolling-origin backtest folds (None if backtest.py has not been run)."""
+    return dashboard_data.load_backtest_results()
+
+
+@st.cache_data(max_entries=COUNTRY_CACHE_ENTRIES)
+def load_country_backtest(country):
+    """Returns the mean backtest errors of `country` per model, and its cutoff years.
+
+    Returns `(summary, first cutoff, last cutoff)`, or None if the country was not backtested.
+    """
+    df_backtest = load_backtest()
+    if df_backtest is None:
+        return None
+    df_country_folds = df_backtest[df_backtest['Country'] == country]
+    if df_country_folds.empty:
+        return None
+    if 'model' not in df_country_folds.columns:
+        df_country_folds = df_country_folds.assign(model='prophet')
+    columns = [column for column in ['RMSE', 'MAE', 'sMAPE', 'MASE'] if column in df_country_folds.columns]
+    summary = df_country_folds.groupby('model')[columns].mean().sort_values('RMSE')
+    return summary, df_country_folds['cutoff'].min(), df_country_folds['cutoff'].max()
+
+
+@st.cache_resource
+def load_vintage_forecasts():
+    """Returns the forecasts recorded for every vintage of the source and the vintage ids
+    (shared, read-only), or None if there are none."""
+    return dashboard_data.load_vintage_forecasts()
+
+
+@st.cache_data(max_entries=COUNTRY_CACHE_ENTRIES)
+def load_country_vintages(country):
+    """Returns the future forecasts of `country` at every vintage (see
+    vintages.country_forecasts()), or None if no vintage has recorded forecasts."""
+    recorded = load_vintage_forecasts()
+    if recorded is None:
+        return None
+    return vintages.country_forecasts(*recorded, country)
+
+
+@st.cache_data(max_entries=COUNTRY_CACHE_ENTRIES)
+def country_csv(country):
+    """Returns the forecast of `country` as CSV bytes for the download button."""
+    return load_country(country).forecast.to_csv(index=False).encode('utf-8')
+
+
+@st.cache_resource(max_entries=COUNTRY_CACHE_ENTRIES)
+def load_scenario_base(country):
+    """Prepares the regressor scenarios of `country` (see scenarios.py), or returns None if
+    the split data of the pipeline is not available. Loads (or fits) the country's model."""
+    if not (artifact_exists('train_data') and artifact_exists('test_data')):
+        return None
+    return scenarios.load_scenario_base(country)
@@ -0,0 +1,79 @@
+import os
+import pandas as pd
+import metrics
+import results_store
+import vintages
+
+# Data loading for the Streamlit dashboard (app.py). Kept free of Streamlit so that it can
+# be imported and timed on its own (see benchmarks/run_benchmarks.py). The cached versions
+# used by the app are in dashboard_cache.py.
+
+# Display names of the features in the feature importance chart
+FEATURE_LABELS = {
+    'Fiscal_Balance': 'Fiscal Balance',
+    'Current_Account_Balance': 'Current Account Balance',
+    'Inflation': 'Inflation',
+    'Trend': 'Prophet Trend',
+    'Seasonality': 'Prophet Seasonality'
+}
+
+
+def load_dashboard_data(base_dir='.'):
+    """Loads the data the dashboard needs on start from the pipeline outputs in `base_dir`.
+
+    Returns `(df_metrics, df_importance, eda_insights, model_insights)`. Only the results index
+    is read (one row per country); the forecasts of a country are loaded when it is selected,
+    with load_country_forecast().
+    """
+    # Load model metrics (and the model of each country) from the results index
+    df_metrics = results_store.read_index(base_dir)
+    df_metrics = df_metrics.drop(columns=['content_hash', *results_store.PARTS], errors='ignore')
+
+    # Load feature importance (the 'Importance' rows of the metrics table)
+    df_importance = metrics.importance_table(pd.read_csv(os.path.join(base_dir, metrics.METRICS_FILE)))
+
+    # Load insights
+    with open(os.path.join(base_dir, 'eda_insights.txt'), 'r') as f:
+        eda_insights = f.read()
+    with open(os.path.join(base_dir, 'model_insights.txt'), 'r') as f:
+        model_insights = f.read()
+
+    return df_metrics, df_importance, eda_insights, model_insights
+
+
+def load_country_forecast(country, base_dir='.'):
+    """Loads the history, test forecast and future forecast of one country ('ds' as datetime)."""
+    return results_store.read_country(country, 'forecasts', base_dir)
+
+
+def split_forecast(df_country):
+    """Splits the forecast frame of a country into its actual values and its forecasts."""
+    is_history = df_country['type'].isin(results_store.HISTORY_TYPES)
+    return df_country[is_history].reset_index(drop=True), df_country[~is_history].reset_index(drop=True)
+
+
+def country_importance(df_importance, country):
+    """Returns the feature importance of one country, with display names for the features."""
+    df_country_importance = df_importance[df_importance['Country'] == country]
+    return df_country_importance.assign(Feature=df_country_importance['Feature'].replace(FEATURE_LABELS))
+
+
+def load_comparison(base_dir='.'):
+    """Loads the actual GDP growth of all countries ('Country', 'ds', 'y') for the comparison chart."""
+    return results_store.read_comparison(base_dir)
+
+
+def load_backtest_results(base_dir='.'):
+    """Loads the per-fold results of backtest.py, or returns None if it has not been run."""
+    path = os.path.join(base_dir, 'backtest_results.csv')
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path)
+
+
+def load_vintage_forecasts():
+    """Loads the future forecasts recorded for every vintage of the source (see vintages.py).
+
+    Returns `(forecasts, vintage ids)`, or None if no vintage has recorded forecasts.
+    """
+    return vintages.load_forecasts()
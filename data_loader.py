@@ -1,50 +1,156 @@
 import pandas as pd
+import argparse
 import os
+import time
+from artifact_store import write_artifact_chunks
+from compact import PANEL_ARTIFACT, compact_panel, read_panel
+from instrumentation import emit, span
+from config import (
+    SOURCE_FILE, ID_COLUMNS, COUNTRY_COL, INDICATOR_CODE_COL,
+    TARGET_KPI_CODE, COUNTRIES, REGRESSOR_INDICATORS
+)
 
-# Define the path to the uploaded file
-file_path = 'african-economic-outlook.csv'
-
-# Check if the file exists
-if not os.path.exists(file_path):
-    print(f"Error: File not found at {file_path}")
-else:
-    # 1. Load the provided African Economic Outlook CSV dataset.
-    df = pd.read_csv(file_path)
-
-    # Display initial information
-    print("--- Initial DataFrame Info ---")
-    print(df.info())
-    print("\n--- First 5 Rows ---")
-    print(df.head())
-
-    # Define the target countries
-    target_countries = ['Kenya', 'South Africa', 'Nigeria']
-
-    # 2. Filter the data for the countries: Kenya, South Africa, Nigeria.
-    # Assuming the country column is named 'Country' or similar. We'll check the columns.
-    
-    # Identify the country column (assuming it's the one with the country names)
-    country_col = None
-    for col in df.columns:
-        # Simple heuristic: check if any of the target countries are in the first few non-null values
-        if df[col].astype(str).str.contains('|'.join(target_countries)).any():
-            country_col = col
+# Rows of the source CSV parsed at a time by the streaming reader. Peak memory depends on
+# this, not on the size of the file.
+CHUNK_SIZE = 5000
+
+
+def source_year_columns(file_path=SOURCE_FILE, years=None):
+    """Returns the year columns in the header of the source CSV, optionally only `years`."""
+    header = pd.read_csv(file_path, nrows=0).columns
+    year_cols = [col for col in header if col.isdigit() and len(col) == 4]
+    if years is not None:
+        years = {int(year) for year in years}
+        year_cols = [col for col in year_cols if int(col) in years]
+    return year_cols
+
+
+def load_source(file_path=SOURCE_FILE):
+    """Loads the identifier and year columns of the African Economic Outlook CSV."""
+    # The schema is known, so read only the identifier columns and the year columns.
+    year_cols = source_year_columns(file_path)
+
+    # Only empty cells are missing values: the default NA strings would turn Namibia's
+    # RegionId ('NA') into NaN.
+    with span('data_loader.read_csv', path=file_path) as fields:
+        df = pd.read_csv(
+            file_path,
+            usecols=ID_COLUMNS + year_cols,
+            keep_default_na=False,
+            na_values=['']
+        )
+        fields['rows'] = len(df)
+
+    # The trailing 'Source:'/'Download URL:' rows of the file have no indicator
+    return df[df[INDICATOR_CODE_COL].notna()]
+
+
+def filter_data(df, countries=COUNTRIES, indicator_codes=None):
+    """Keeps the rows of the target countries and indicators (the KPI and the regressors).
+
+    `countries` is a list of country/region names or 'all', and so is `indicator_codes`
+    (a list of indicator codes).
+    """
+    if indicator_codes is None:
+        indicator_codes = [TARGET_KPI_CODE] + list(REGRESSOR_INDICATORS)
+
+    mask = pd.Series(True, index=df.index)
+    if indicator_codes != 'all':
+        mask &= df[INDICATOR_CODE_COL].isin(indicator_codes)
+    if countries != 'all':
+        mask &= df[COUNTRY_COL].isin(countries)
+    return df[mask]
+
+
+def stream_source(file_path=SOURCE_FILE, countries=COUNTRIES, indicator_codes=None, years=None, chunksize=CHUNK_SIZE):
+    """Reads the source CSV in chunks of `chunksize` rows and yields the filtered chunks.
+
+    Each chunk keeps only the identifier columns and the year columns (all of them, or only
+    `years`), and only the rows of the target countries and indicators, so the whole file
+    is never in memory at once.
+    """
+    year_cols = source_year_columns(file_path, years)
+    reader = pd.read_csv(
+        file_path,
+        usecols=ID_COLUMNS + year_cols,
+        # Fixed types, so that every chunk has the same schema whatever its values
+        dtype={**{col: str for col in ID_COLUMNS}, **{col: float for col in year_cols}},
+        keep_default_na=False,
+        na_values=[''],
+        chunksize=chunksize
+    )
+    # The parsing is interleaved with the consumer of the chunks, so its time is summed over
+    # the chunks and recorded once the file has been read
+    parse_seconds, n_chunks, n_rows = 0.0, 0, 0
+    chunks = iter(reader)
+    while True:
+        start_time = time.perf_counter()
+        chunk = next(chunks, None)
+        parse_seconds += time.perf_counter() - start_time
+        if chunk is None:
             break
-    
-    if country_col:
-        print(f"\n--- Identified Country Column: {country_col} ---")
-        df_filtered = df[df[country_col].isin(target_countries)].copy()
-        
-        print("\n--- Filtered DataFrame Shape ---")
-        print(df_filtered.shape)
-        print("\n--- Filtered DataFrame Countries ---")
-        print(df_filtered[country_col].unique())
-        print("\n--- Filtered DataFrame Columns ---")
-        print(df_filtered.columns.tolist())
-        
-        # Save the filtered data to an intermediate file for the next step
-        df_filtered.to_csv('initial_filtered_data.csv', index=False)
-        print("\nInitial filtered data saved to initial_filtered_data.csv")
-    else:
-        print("\nCould not automatically identify the country column. Please inspect the head of the DataFrame.")
-        
\ No newline at end of file
+        n_chunks += 1
+        n_rows += len(chunk)
+        chunk = chunk[chunk[INDICATOR_CODE_COL].notna()]
+        yield filter_data(chunk, countries=countries, indicator_codes=indicator_codes)[ID_COLUMNS + year_cols]
+    emit('span', 'data_loader.read_csv', seconds=parse_seconds, path=file_path, chunks=n_chunks, rows=n_rows)
+
+
+def ingest(file_path=SOURCE_FILE, name=PANEL_ARTIFACT, countries=COUNTRIES, indicator_codes=None,
+           years=None, chunksize=CHUNK_SIZE, export_csv=None):
+    """Streams the filtered rows of the source CSV into the artifact `name`, as the compact
+    panel (see compact.py); the CSV export keeps the wide layout of the source. Returns the
+    number of source rows."""
+    chunks = stream_source(file_path, countries, indicator_codes, years, chunksize)
+    with span('data_loader.ingest', artifact=name) as fields:
+        fields['rows'] = write_artifact_chunks(chunks, name, export_csv=export_csv, transform=compact_panel)
+    return fields['rows']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f'Filter the AEO source CSV into the {PANEL_ARTIFACT} artifact.')
+    parser.add_argument('--source', default=SOURCE_FILE, help=f'Source CSV (default: {SOURCE_FILE}).')
+    parser.add_argument(
+        '--artifact', default=PANEL_ARTIFACT,
+        help=f'Artifact to write, e.g. one per AEO edition to keep several side by side (default: {PANEL_ARTIFACT}).'
+    )
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help=f'Rows parsed at a time (default: {CHUNK_SIZE}).')
+    args = parser.parse_args()
+
+    # Define the path to the uploaded file
+    file_path = args.source
+
+    # Check if the file exists
+    if not os.path.exists(file_path):
+        print(f"Error: File not found at {file_path}")
+        return
+
+    # 1. Stream the provided African Economic Outlook CSV dataset, and
+    # 2. filter the data for the target countries and indicators while reading it.
+    # Countries and regressors come from config.py (AEO_COUNTRIES / AEO_REGRESSORS, or "all").
+    year_cols = source_year_columns(file_path)
+    print("--- Source Data ---")
+    print(f"{len(year_cols)} years ({year_cols[0]}-{year_cols[-1]}), read in chunks of {args.chunksize} rows")
+
+    n_rows = ingest(file_path, args.artifact, chunksize=args.chunksize)
+
+    # The filtered panel is small, so it can be summarized from the artifact
+    panel = read_panel(args.artifact)
+    if COUNTRIES != 'all':
+        missing = sorted(set(COUNTRIES) - set(panel[COUNTRY_COL].cat.categories))
+        if missing:
+            print(f"\nWarning: countries not found in {file_path}: {missing}")
+
+    print("\n--- Filtered Panel Shape (one row per series and year) ---")
+    print(panel.shape)
+    print(f"{panel.memory_usage(deep=True).sum() / 1e6:.2f} MB, {panel['observed'].mean():.0%} of the values observed")
+    print("\n--- Filtered Panel Countries ---")
+    print(panel[COUNTRY_COL].unique().tolist())
+    print("\n--- Filtered Panel Indicators ---")
+    print(panel[INDICATOR_CODE_COL].unique().tolist())
+
+    print(f"\n{n_rows} filtered rows saved to the {args.artifact} artifact")
+
+
+if __name__ == '__main__':
+    main()
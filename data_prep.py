@@ -1,71 +1,65 @@
-import pandas as pd
+from artifact_store import write_artifact
+from compact import panel_cube, read_panel
+from config import TARGET_KPI_CODE, TARGET_KPI_NAME, INDICATOR_CODE_COL, INDICATOR_COL
+from instrumentation import span
+from reshape import interpolate_cube, cube_to_long
 
-# Load the initial filtered data
-df = pd.read_csv('initial_filtered_data.csv')
+# The target KPI is defined in config.py: 'Real GDP growth (annual %)' (NY.GDP.MKTP.KD.ZG)
 
-# Define the target KPI based on the instructions and the inspection of unique values
-# The correct KPI is 'Real GDP growth (annual %)'
-TARGET_KPI_NAME = 'Real GDP growth (annual %)'
 
-# 1. Select the KPI: Real GDP growth (annual %).
-gdp_growth_df = df[
-    (df['Indicators Name'] == TARGET_KPI_NAME) | 
-    (df['Indicators'] == TARGET_KPI_NAME)
-].copy()
+def prepare_gdp_growth(panel):
+    """Selects the GDP growth KPI from the AEO panel (see compact.py) and returns it as a clean long frame.
 
-if gdp_growth_df.empty:
-    print(f"Error: Could not find the KPI '{TARGET_KPI_NAME}' in the dataset even after correction.")
-    exit()
+    The result has 'ds', 'Country' and 'y' columns, sorted by country and year, with missing
+    years linearly interpolated. Raises ValueError if the KPI is not in `panel`.
+    """
+    # 1. Select the KPI: Real GDP growth (annual %).
+    is_kpi = (panel[INDICATOR_COL] == TARGET_KPI_NAME) | (panel[INDICATOR_CODE_COL] == TARGET_KPI_CODE)
+    if not is_kpi.any():
+        raise ValueError(f"Could not find the KPI '{TARGET_KPI_NAME}' in the dataset.")
 
-# Drop unnecessary columns and keep only country, indicator name, and year columns
-id_vars = ['Country and Regions Name', 'Indicators Name']
-# Dynamically find year columns (assuming they are all 4-digit strings)
-year_cols = [col for col in df.columns if col.isdigit() and len(col) == 4]
-gdp_growth_df = gdp_growth_df[id_vars + year_cols]
+    # Turn the panel into a (country x indicator x year) cube. Countries are sorted, so the
+    # series come out in chronological order per country. (The KPI may have matched on its
+    # name or on its code, so its rows are labelled with the code.)
+    gdp_growth_panel = panel[is_kpi].assign(**{INDICATOR_CODE_COL: TARGET_KPI_CODE})
+    cube, countries, _, years = panel_cube(gdp_growth_panel, indicators=[TARGET_KPI_CODE])
 
-# Rename the country column for simplicity
-gdp_growth_df.rename(columns={'Country and Regions Name': 'Country'}, inplace=True)
+    # 2./3. Handle missing values appropriately: forward-fill or interpolate missing years.
+    # We will use linear interpolation for a smoother time series, done for all countries at once
+    # along the year axis.
+    with span('data_prep.interpolate', series=len(countries), years=len(years)):
+        gdp_cube = interpolate_cube(cube[:, 0, :])
 
-# Pivot the data from wide to long format
-df_long = pd.melt(
-    gdp_growth_df, 
-    id_vars=['Country', 'Indicators Name'], 
-    value_vars=year_cols, 
-    var_name='Year', 
-    value_name='GDP_Growth'
-)
+    # Back to long format with the 'ds'/'y' columns Prophet expects, sorted by country and year
+    return cube_to_long(gdp_cube, countries, years, value_name='y')
 
-# Convert 'Year' to integer and then to datetime for proper time-series handling
-df_long['Year'] = df_long['Year'].astype(int)
-df_long['ds'] = pd.to_datetime(df_long['Year'], format='%Y')
 
-# Drop the 'Indicators Name' column as it's now redundant
-df_long.drop(columns=['Indicators Name', 'Year'], inplace=True)
+def main():
+    # Load the initial filtered data
+    panel = read_panel()
 
-# Rename 'GDP_Growth' to 'y' for Prophet compatibility
-df_long.rename(columns={'GDP_Growth': 'y'}, inplace=True)
+    try:
+        df_clean = prepare_gdp_growth(panel)
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit()
 
-# 2. Ensure the dataset is sorted chronologically per country.
-df_long.sort_values(by=['Country', 'ds'], inplace=True)
+    # Check for any remaining NaNs
+    print("--- Missing values check after interpolation ---")
+    print(df_clean.isnull().sum())
 
-# 3. Handle missing values appropriately: forward-fill or interpolate missing years.
-# We will use linear interpolation for a smoother time series.
-df_clean = df_long.groupby('Country').apply(
-    lambda x: x.set_index('ds').interpolate(method='linear').reset_index()
-).reset_index(drop=True)
+    # Final check of the cleaned data structure
+    print("\n--- Cleaned and Prepared Data Head ---")
+    print(df_clean.head())
+    print("\n--- Cleaned and Prepared Data Tail ---")
+    print(df_clean.tail())
+    print("\n--- Unique Years (ds) ---")
+    print(df_clean['ds'].dt.year.unique())
 
-# Check for any remaining NaNs
-print("--- Missing values check after interpolation ---")
-print(df_clean.isnull().sum())
+    # Save the cleaned data for the next phase (EDA and Modeling)
+    write_artifact(df_clean, 'gdp_growth_clean_data')
+    print("\nCleaned and prepared GDP growth data saved to the gdp_growth_clean_data artifact")
 
-# Final check of the cleaned data structure
-print("\n--- Cleaned and Prepared Data Head ---")
-print(df_clean.head())
-print("\n--- Cleaned and Prepared Data Tail ---")
-print(df_clean.tail())
-print("\n--- Unique Years (ds) ---")
-print(df_clean['ds'].dt.year.unique())
 
-# Save the cleaned data for the next phase (EDA and Modeling)
-df_clean.to_csv('gdp_growth_clean_data.csv', index=False)
-print("\nCleaned and prepared GDP growth data saved to gdp_growth_clean_data.csv")
+if __name__ == '__main__':
+    main()
@@ -1,53 +1,7 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
-
-# Load the cleaned data
-df = pd.read_csv('gdp_growth_clean_data.csv')
-
-# Convert 'ds' back to datetime
-df['ds'] = pd.to_datetime(df['ds'])
-
-# Drop the remaining NaNs (first year for each country)
-df.dropna(subset=['y'], inplace=True)
-
-# 1. Generate summary statistics
-print("--- Summary Statistics (GDP Growth) ---")
-summary_stats = df.groupby('Country')['y'].agg(['mean', 'std', 'min', 'max']).reset_index()
-print(summary_stats.to_markdown(index=False))
-
-# Calculate year-over-year change (YoY) for each country
-df['YoY_Change'] = df.groupby('Country')['y'].diff()
-yoy_stats = df.groupby('Country')['YoY_Change'].agg(['mean', 'std', 'min', 'max']).reset_index()
-print("\n--- Year-over-Year Change Statistics ---")
-print(yoy_stats.to_markdown(index=False))
-
-# 2. Visualize GDP growth over time for each country (line charts).
-plt.figure(figsize=(14, 7))
-sns.lineplot(data=df, x='ds', y='y', hue='Country', marker='o')
-plt.title('Historical GDP Growth (Annual %) for Kenya, Nigeria, and South Africa (1981-2020)')
-plt.xlabel('Year')
-plt.ylabel('GDP Growth (%)')
-plt.grid(True, linestyle='--', alpha=0.6)
-plt.legend(title='Country')
-plt.tight_layout()
-plt.savefig('historical_gdp_growth.png')
-print("\nHistorical GDP growth chart saved to historical_gdp_growth.png")
-
-# 3. Identify any outliers or anomalies.
-# Use a box plot to visualize distribution and potential outliers
-plt.figure(figsize=(10, 6))
-sns.boxplot(data=df, x='Country', y='y')
-plt.title('Box Plot of GDP Growth by Country')
-plt.ylabel('GDP Growth (%)')
-plt.grid(axis='y', linestyle='--', alpha=0.6)
-plt.tight_layout()
-plt.savefig('gdp_growth_boxplot.png')
-print("Box plot saved to gdp_growth_boxplot.png")
-
-# 4. Provide textual insights summarizing trends and differences between countries.
-insights = """
+from artifact_store import read_artifact, write_artifact
+
+# Textual insights summarizing trends and differences between countries
+INSIGHTS = """
 --- Textual Insights from EDA ---
 
 **Summary Statistics:**
@@ -71,13 +25,93 @@ insights = """
 **Conclusion for Modeling:**
 The distinct volatility and trend characteristics for each country suggest that a separate model for each country is the correct approach, as planned. The high volatility in Nigeria's series might make forecasting more challenging.
 """
-print(insights)
 
-# Save the insights to a file
-with open('eda_insights.txt', 'w') as f:
-    f.write(insights)
-print("EDA insights saved to eda_insights.txt")
 
-# Save the final cleaned data (after dropping 1980 NaNs)
-df.to_csv('gdp_growth_final_clean_data.csv', index=False)
-print("Final cleaned data saved to gdp_growth_final_clean_data.csv")
+def add_yoy_change(df):
+    """Drops the years without GDP growth and adds the year-over-year change per country."""
+    # Drop the remaining NaNs (first year for each country)
+    # and calculate the year-over-year change (YoY) for each country
+    return df.dropna(subset=['y']).assign(YoY_Change=lambda d: d.groupby('Country')['y'].diff())
+
+
+def summary_statistics(df):
+    """Returns the summary statistics of the GDP growth and of its year-over-year change."""
+    summary_stats = df.groupby('Country')['y'].agg(['mean', 'std', 'min', 'max']).reset_index()
+    yoy_stats = df.groupby('Country')['YoY_Change'].agg(['mean', 'std', 'min', 'max']).reset_index()
+    return summary_stats, yoy_stats
+
+
+def _pyplot():
+    """Returns `(pyplot, seaborn)`. They take seconds to import, so only the plots load them
+    (the statistics and add_yoy_change() are also used without plots, e.g. by the benchmarks)."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
+
+def plot_history(df, path='historical_gdp_growth.png'):
+    """Saves a line chart of the GDP growth over time for each country."""
+    plt, sns = _pyplot()
+    plt.figure(figsize=(14, 7))
+    sns.lineplot(data=df, x='ds', y='y', hue='Country', marker='o')
+    countries = df['Country'].unique()
+    country_label = ', '.join(countries[:-1]) + f', and {countries[-1]}' if 2 < len(countries) <= 5 else f'{len(countries)} Countries'
+    plt.title(f"Historical GDP Growth (Annual %) for {country_label} ({df['ds'].dt.year.min()}-{df['ds'].dt.year.max()})")
+    plt.xlabel('Year')
+    plt.ylabel('GDP Growth (%)')
+    plt.grid(True, linestyle='--', alpha=0.6)
+    plt.legend(title='Country')
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def plot_boxplot(df, path='gdp_growth_boxplot.png'):
+    """Saves a box plot of the GDP growth distribution by country."""
+    plt, sns = _pyplot()
+    plt.figure(figsize=(10, 6))
+    sns.boxplot(data=df, x='Country', y='y')
+    plt.title('Box Plot of GDP Growth by Country')
+    plt.ylabel('GDP Growth (%)')
+    plt.grid(axis='y', linestyle='--', alpha=0.6)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def main():
+    # Load the cleaned data ('ds' is stored as datetime)
+    df = read_artifact('gdp_growth_clean_data')
+    df = add_yoy_change(df)
+
+    # 1. Generate summary statistics
+    summary_stats, yoy_stats = summary_statistics(df)
+    print("--- Summary Statistics (GDP Growth) ---")
+    print(summary_stats.to_markdown(index=False))
+    print("\n--- Year-over-Year Change Statistics ---")
+    print(yoy_stats.to_markdown(index=False))
+
+    # 2. Visualize GDP growth over time for each country (line charts).
+    plot_history(df)
+    print("\nHistorical GDP growth chart saved to historical_gdp_growth.png")
+
+    # 3. Identify any outliers or anomalies.
+    # Use a box plot to visualize distribution and potential outliers
+    plot_boxplot(df)
+    print("Box plot saved to gdp_growth_boxplot.png")
+
+    # 4. Provide textual insights summarizing trends and differences between countries.
+    print(INSIGHTS)
+
+    # Save the insights to a file
+    with open('eda_insights.txt', 'w') as f:
+        f.write(INSIGHTS)
+    print("EDA insights saved to eda_insights.txt")
+
+    # Save the final cleaned data (after dropping 1980 NaNs)
+    write_artifact(df, 'gdp_growth_final_clean_data')
+    print("Final cleaned data saved to the gdp_growth_final_clean_data artifact")
+
+
+if __name__ == '__main__':
+    main()
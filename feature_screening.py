@@ -0,0 +1,298 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from artifact_store import read_artifact
+from compact import compact_panel, panel_cube
+from config import (SOURCE_FILE, TARGET_KPI_CODE, TRAIN_END_YEAR, BACKTEST_FIRST_CUTOFF, REGRESSOR_INDICATORS,
+                    REGRESSORS, SELECT_REGRESSORS, regressor_column)
+from fingerprint import combine_hashes, group_hashes
+from instrumentation import span
+from reshape import interpolate_cube
+
+# Selection of the Prophet regressors of every country.
+#
+# Fitting Prophet on every combination of the AEO indicators (and their lags) for every
+# country would take hours, so the candidates are screened first with cheap statistics
+# computed for all countries, indicators and lags at once, on the (country x indicator x
+# lag x year) arrays of the training years:
+#
+#   Correlation          corr(growth_t, x_{t-lag})
+#   Partial_Correlation  corr(growth_t, x_{t-lag} | growth_{t-1}): what the indicator adds
+#                        to the persistence of growth (its first partial autocorrelation)
+#   Coefficient          coefficient of x_{t-lag} in the OLS regression
+#                        growth_t ~ 1 + growth_{t-1} + x_{t-lag}
+#
+# All three come from the masked sums of products of the series (the normal equations of
+# every regression are solved in closed form, in one batch), over the years where growth,
+# its previous value and the lagged indicator are all known.
+#
+# Only the SHORTLIST_SIZE candidates with the largest partial correlation that the model
+# data has a column for (the lag-0 values of the configured regressors; AEO_REGRESSORS=all
+# makes every indicator one) are then fitted with Prophet: every subset of the shortlist
+# is fitted on the years before the VALIDATION_YEARS up to VALIDATION_END_YEAR and scored
+# on those, in a process pool. The validation years end at the first backtest cutoff, so
+# the backtest (backtest.py), which picks each country's model, does not score the Prophet
+# models on the years their regressors were chosen on. The subset with the lowest validation RMSE (the smallest on ties) is the
+# country's regressor set, written to SELECTION_FILE for forecasting_model.py. The lagged
+# and the unconfigured indicators are reported in SCREENING_FILE as suggestions.
+#
+# Every selection is stored with a key (a hash of the country's training rows up to
+# VALIDATION_END_YEAR, shortlist, validation years and Prophet configuration), and the next run reuses the selections whose key did not change:
+# after a small revision of the source (see vintages.py), only the countries whose data
+# changed are fitted again.
+
+SCREENING_FILE = 'feature_screening.csv'
+SELECTION_FILE = 'selected_regressors.json'
+
+# Lags of the indicators screened (0 = the same year)
+MAX_LAG = int(os.environ.get('AEO_SCREEN_MAX_LAG', 2))
+# Candidates of every country fitted with Prophet (every subset of them: 2 ** size fits).
+# The shortlist holds all 3 default regressors, so every subset of them is fitted; the
+# screening prunes the candidates with a wider set of regressors (e.g. AEO_REGRESSORS=all).
+SHORTLIST_SIZE = int(os.environ.get('AEO_SCREEN_SHORTLIST', 4))
+# Years held out to score the Prophet fits, and the last of them: the first backtest cutoff
+VALIDATION_YEARS = 5
+VALIDATION_END_YEAR = BACKTEST_FIRST_CUTOFF
+# Years a candidate needs to be screened
+MIN_OBSERVATIONS = 15
+# Indicators derived from the KPI, which are not candidates: per capita growth is real GDP
+# growth less population growth (a correlation of about 0.99)
+KPI_DERIVED_INDICATORS = ['NY.GDP.PCAP.KD.ZG']
+
+
+def lagged(cube, max_lag=MAX_LAG):
+    """Returns the (... x lag x year) array of the series of `cube` (... x year) shifted by
+    0 to `max_lag` years, NaN where the lagged year is before the first year."""
+    n_years = cube.shape[-1]
+    shifted = np.full(cube.shape[:-1] + (max_lag + 1, n_years), np.nan)
+    for lag in range(max_lag + 1):
+        shifted[..., lag, lag:] = cube[..., :n_years - lag]
+    return shifted
+
+
+def screen(target, candidates, max_lag=MAX_LAG, min_observations=MIN_OBSERVATIONS):
+    """Screens the candidate series against the target series of every country.
+
+    `target` is (country x year) and `candidates` (country x indicator x year), over the same
+    years. Returns `(observations, correlation, partial_correlation, coefficient)`, each
+    (country x indicator x lag); the statistics are NaN with fewer than `min_observations`
+    usable years or a constant series.
+    """
+    x = lagged(candidates, max_lag)[..., 1:]
+    y = target[:, None, None, 1:]
+    y_prev = target[:, None, None, :-1]
+    mask = ~(np.isnan(x) | np.isnan(y) | np.isnan(y_prev))
+
+    x, y, y_prev = (np.where(mask, series, 0.0) for series in (x, y, y_prev))
+    n = mask.sum(axis=-1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        safe_n = np.maximum(n, 1)
+        means = {name: series.sum(axis=-1) / safe_n for name, series in (('x', x), ('y', y), ('p', y_prev))}
+
+        def centered(a, b, name_a, name_b):
+            return (a * b).sum(axis=-1) - safe_n * means[name_a] * means[name_b]
+
+        sxx, syy, spp = centered(x, x, 'x', 'x'), centered(y, y, 'y', 'y'), centered(y_prev, y_prev, 'p', 'p')
+        sxy, sxp, syp = centered(x, y, 'x', 'y'), centered(x, y_prev, 'x', 'p'), centered(y, y_prev, 'y', 'p')
+
+        r_xy = sxy / np.sqrt(sxx * syy)
+        r_xp = sxp / np.sqrt(sxx * spp)
+        r_yp = syp / np.sqrt(syy * spp)
+        partial = (r_xy - r_yp * r_xp) / np.sqrt((1 - r_yp ** 2) * (1 - r_xp ** 2))
+        coefficient = (spp * sxy - sxp * syp) / (spp * sxx - sxp ** 2)
+
+    invalid = (n < min_observations) | ~np.isfinite(partial)
+    return (n, *(np.where(invalid, np.nan, stat) for stat in (r_xy, partial, coefficient)))
+
+
+def screening_table(panel, last_year=TRAIN_END_YEAR, max_lag=MAX_LAG, configured=REGRESSOR_INDICATORS):
+    """Screens every indicator of the panel, at every lag, for every country. Returns the
+    tidy table of the screened candidates, by country and decreasing |partial correlation|."""
+    cube, countries, indicators, years = panel_cube(panel)
+    cube = interpolate_cube(cube[..., years <= last_year])
+    target = cube[:, indicators.index(TARGET_KPI_CODE)]
+    candidates = [i for i, code in enumerate(indicators) if code != TARGET_KPI_CODE and code not in KPI_DERIVED_INDICATORS]
+
+    observations, correlation, partial, coefficient = screen(target, cube[:, candidates], max_lag)
+    shape = observations.shape
+    country, indicator, lag = (index.reshape(-1) for index in np.indices(shape))
+    codes = np.array(indicators, dtype=object)[candidates][indicator]
+    table = pd.DataFrame({
+        'Country': np.array(countries, dtype=object)[country],
+        'Indicator': codes,
+        'Column': [regressor_column(code) for code in codes],
+        'Lag': lag,
+        'Observations': observations.reshape(-1),
+        'Correlation': correlation.reshape(-1),
+        'Partial_Correlation': partial.reshape(-1),
+        'Coefficient': coefficient.reshape(-1),
+        'Configured': np.isin(codes, list(configured)),
+    }).dropna(subset=['Partial_Correlation'])
+    table = table.assign(strength=table['Partial_Correlation'].abs())
+    return table.sort_values(['Country', 'strength'], ascending=[True, False], kind='stable').drop(columns='strength').reset_index(drop=True)
+
+
+def shortlist(table, columns=REGRESSORS, size=SHORTLIST_SIZE):
+    """Returns, per country, the `size` model columns (the lag-0 candidates among `columns`)
+    with the largest |partial correlation|, in decreasing order."""
+    usable = table[(table['Lag'] == 0) & table['Column'].isin(columns)]
+    return {country: list(group['Column']) for country, group in usable.groupby('Country', sort=False).head(size).groupby('Country', sort=False)}
+
+
+def validate_subset(country, regressors, df_country, validation_years=VALIDATION_YEARS, validation_end_year=VALIDATION_END_YEAR):
+    """Fits Prophet with `regressors` on the training data of one country before the
+    `validation_years` up to `validation_end_year` and returns `(country, regressors, RMSE
+    on those years)`.
+
+    The unit of work of the Prophet pool, so it only depends on its arguments."""
+    import logging
+    from forecasting_model import fit_model
+
+    logging.getLogger('cmdstanpy').disabled = True
+    regressors = list(regressors)
+    years = df_country['ds'].dt.year
+    last_fit_year = validation_end_year - validation_years
+    df_fit = df_country[years <= last_fit_year]
+    df_valid = df_country[(years > last_fit_year) & (years <= validation_end_year)]
+
+    model = fit_model(df_fit, regressors)
+    model.uncertainty_samples = 0
+    y_pred = model.predict(df_valid[['ds'] + regressors])['yhat'].to_numpy()
+    return country, tuple(regressors), float(np.sqrt(np.mean((df_valid['y'].to_numpy() - y_pred) ** 2)))
+
+
+def select_regressors(df_train, candidates, workers=1, validation_years=VALIDATION_YEARS, previous=None,
+                      validation_end_year=VALIDATION_END_YEAR):
+    """Fits every subset of the candidates of every country of `df_train` (in a process pool
+    with `workers > 1`) and returns the selection of every country. Only the years up to
+    `validation_end_year` are used.
+
+    The countries whose entry in `previous` (a former selection) has the same key are not
+    fitted again: their entry is reused.
+    """
+    from forecasting_model import model_config
+
+    previous = previous or {}
+    df_train = df_train[df_train['ds'].dt.year <= validation_end_year]
+    train_hashes = group_hashes(df_train, 'Country')
+    selection, tasks = {}, []
+    for country, df_country in df_train.groupby('Country', sort=False):
+        if country not in candidates or df_country['ds'].dt.year.nunique() <= validation_years + 2:
+            continue
+        shortlisted = candidates[country]
+        key = combine_hashes({'train': train_hashes[country], 'shortlist': shortlisted, 'validation_years': validation_years,
+                              'validation_end_year': validation_end_year, 'model': model_config(REGRESSORS)})
+        if previous.get(country, {}).get('key') == key:
+            selection[country] = previous[country]
+            continue
+        selection[country] = {'regressors': [], 'validation_rmse': None, 'shortlist': shortlisted, 'subsets': [], 'key': key}
+        for size in range(len(shortlisted) + 1):
+            for subset in itertools.combinations(shortlisted, size):
+                tasks.append((country, subset, df_country.sort_values('ds'), validation_years, validation_end_year))
+
+    with span('feature_screening.prophet', fits=len(tasks), workers=workers):
+        if workers > 1 and tasks:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                scores = list(executor.map(validate_subset, *zip(*tasks)))
+        else:
+            scores = [validate_subset(*task) for task in tasks]
+
+    fitted = {country for country, _, _ in scores}
+    for country, subset, rmse in scores:
+        selection[country]['subsets'].append({'regressors': list(subset), 'rmse': rmse})
+    for country in fitted:
+        entry = selection[country]
+        best = min(entry['subsets'], key=lambda subset: (subset['rmse'], len(subset['regressors'])))
+        entry['regressors'], entry['validation_rmse'] = best['regressors'], best['rmse']
+    return selection
+
+
+def load_selection(path=SELECTION_FILE, regressors=REGRESSORS):
+    """Returns the selected regressors of every country (in the order of `regressors`), or
+    an empty dict if there is no selection or AEO_SELECT_REGRESSORS=0."""
+    if not SELECT_REGRESSORS or not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        selection = json.load(f)
+    return {
+        country: [regressor for regressor in regressors if regressor in entry['regressors']]
+        for country, entry in selection.items()
+    }
+
+
+def country_regressors(country, selection=None):
+    """Returns the regressors of the Prophet model of `country`: its selected regressors, or
+    all of them if it has no selection."""
+    if selection is None:
+        selection = load_selection()
+    return selection.get(country, REGRESSORS)
+
+
+def main():
+    import data_loader
+
+    parser = argparse.ArgumentParser(description='Screen the AEO indicators and select the Prophet regressors of every country.')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=int(os.environ.get('FORECAST_WORKERS', 1)),
+        help='Number of worker processes of the Prophet fits (default: 1, or $FORECAST_WORKERS).'
+    )
+    parser.add_argument('--source', default=SOURCE_FILE, help=f'Source CSV (default: {SOURCE_FILE}).')
+    args = parser.parse_args()
+
+    # Screen every indicator of every country and region of the source
+    start_time = time.perf_counter()
+    with span('feature_screening.screen') as fields:
+        table = screening_table(compact_panel(data_loader.load_source(args.source)))
+        fields['candidates'] = len(table)
+    screen_seconds = time.perf_counter() - start_time
+    table.to_csv(SCREENING_FILE, index=False)
+    print(f"Screened {len(table)} (country, indicator, lag) candidates in {screen_seconds:.2f}s; saved to {SCREENING_FILE}")
+
+    # Fit the shortlists of the forecast countries with Prophet
+    df_train = read_artifact('train_data')
+    countries = df_train['Country'].unique()
+    previous = {}
+    if os.path.exists(SELECTION_FILE):
+        with open(SELECTION_FILE, 'r') as f:
+            previous = json.load(f)
+    if not SELECT_REGRESSORS:
+        # Every country uses all the regressors, so no subset is fitted (the last selection
+        # is kept for when the selection is switched on again)
+        if not os.path.exists(SELECTION_FILE):
+            with open(SELECTION_FILE, 'w') as f:
+                json.dump({}, f)
+        print("Regressor selection is off (AEO_SELECT_REGRESSORS=0): every country uses all the regressors")
+        return
+    candidates = shortlist(table[table['Country'].isin(countries)])
+    start_time = time.perf_counter()
+    selection = select_regressors(df_train, candidates, workers=args.workers, previous=previous)
+    reused = [country for country, entry in selection.items() if previous.get(country) is entry]
+    n_fits = sum(len(entry['subsets']) for country, entry in selection.items() if country not in reused)
+    print(f"{n_fits} Prophet fits in {time.perf_counter() - start_time:.2f}s with {args.workers} worker(s)"
+          f" ({len(reused)} of {len(selection)} countries unchanged)")
+
+    with open(SELECTION_FILE, 'w') as f:
+        json.dump(selection, f, indent=4)
+
+    report = table[table['Country'].isin(countries)].groupby('Country', sort=False).head(5)
+    print("\nStrongest candidates (any lag or indicator):")
+    print(report.to_markdown(index=False, floatfmt='.3f'))
+    print("\nSelected regressors:")
+    for country, entry in selection.items():
+        regressors = ', '.join(entry['regressors']) or '(none)'
+        print(f"- {country}: {regressors} (validation RMSE {entry['validation_rmse']:.3f})")
+    print(f"\nSelection saved to {SELECTION_FILE}")
+
+
+if __name__ == '__main__':
+    main()
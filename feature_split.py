@@ -1,108 +1,105 @@
+import numpy as np
 import pandas as pd
-
-# Load the final cleaned GDP growth data
-df_gdp = pd.read_csv('gdp_growth_final_clean_data.csv')
-df_gdp['ds'] = pd.to_datetime(df_gdp['ds'])
-
-# Load the initial filtered data to check for other indicators (potential regressors)
-df_all_indicators = pd.read_csv('initial_filtered_data.csv')
-
-# Identify potential regressors: other indicators that are not GDP growth
-gdp_kpi_name = 'Real GDP growth (annual %)'
-regressor_indicators = df_all_indicators[
-    df_all_indicators['Indicators Name'] != gdp_kpi_name
-]['Indicators Name'].unique()
-
-print("--- Potential Regressor Indicators ---")
-print(regressor_indicators)
-
-# For simplicity and to follow the core instruction of using Prophet, we will select a few key indicators
-# that are likely to influence GDP growth, if they are present and complete.
-# Let's select 'Inflation, consumer prices (annual %)' and 'Current account balance (As % of GDP)'
-# as common macroeconomic features.
-
-selected_regressors = [
-    'Inflation, consumer prices (annual %)',
-    'Current account balance (As % of GDP)',
-    'Central government, Fiscal Balance (% of GDP)'
-]
-
-# Prepare the regressor data
-df_regressors = df_all_indicators[
-    df_all_indicators['Indicators Name'].isin(selected_regressors)
-].copy()
-
-# Pivot the regressor data to long format
-id_vars = ['Country and Regions Name', 'Indicators Name']
-year_cols = [col for col in df_all_indicators.columns if col.isdigit() and len(col) == 4]
-df_regressors = df_regressors[id_vars + year_cols]
-df_regressors.rename(columns={'Country and Regions Name': 'Country'}, inplace=True)
-
-df_regressors_long = pd.melt(
-    df_regressors, 
-    id_vars=['Country', 'Indicators Name'], 
-    value_vars=year_cols, 
-    var_name='Year', 
-    value_name='Value'
+from artifact_store import read_artifact, write_artifact
+from compact import panel_cube, read_panel
+from config import (
+    TRAIN_END_YEAR, TEST_START_YEAR, TEST_END_YEAR,
+    INDICATOR_CODE_COL, INDICATOR_COL, REGRESSOR_INDICATORS
 )
-
-df_regressors_long['ds'] = pd.to_datetime(df_regressors_long['Year'].astype(int), format='%Y')
-df_regressors_long.drop(columns=['Year'], inplace=True)
-
-# Pivot the regressor data so each indicator is a column
-df_regressors_pivot = df_regressors_long.pivot_table(
-    index=['Country', 'ds'], 
-    columns='Indicators Name', 
-    values='Value'
-).reset_index()
-
-# Clean up column names
-df_regressors_pivot.columns.name = None
-df_regressors_pivot.rename(columns={
-    'Inflation, consumer prices (annual %)': 'Inflation',
-    'Current account balance (As % of GDP)': 'Current_Account_Balance',
-    'Central government, Fiscal Balance (% of GDP)': 'Fiscal_Balance'
-}, inplace=True)
-
-# Merge GDP data with regressors
-df_merged = pd.merge(df_gdp, df_regressors_pivot, on=['Country', 'ds'], how='left')
-
-# Handle missing values in regressors: linear interpolation within each country
-df_final = df_merged.groupby('Country').apply(
-    lambda x: x.set_index('ds').interpolate(method='linear').reset_index()
-).reset_index(drop=True)
-
-# Drop any remaining NaNs (e.g., at the start of the series)
-df_final.dropna(inplace=True)
-
-print("\n--- Final DataFrame with Regressors Head (Multivariate Model Ready) ---")
-print(df_final.head())
-print("\n--- Final DataFrame with Regressors Info ---")
-print(df_final.info())
-
-# Save the final multivariate dataset
-df_final.to_csv('gdp_growth_multivariate_data.csv', index=False)
-print("\nMultivariate data saved to gdp_growth_multivariate_data.csv")
-
-# --- Train-Test Split ---
-# Training: 1980–2015
-# Testing: 2016–2020
-
-TRAIN_END_YEAR = 2015
-TEST_START_YEAR = 2016
-TEST_END_YEAR = 2020
-
-df_train = df_final[df_final['ds'].dt.year <= TRAIN_END_YEAR].copy()
-df_test = df_final[
-    (df_final['ds'].dt.year >= TEST_START_YEAR) & 
-    (df_final['ds'].dt.year <= TEST_END_YEAR)
-].copy()
-
-print(f"\n--- Train-Test Split Summary ---")
-print(f"Training set size: {len(df_train)} rows (Years up to {TRAIN_END_YEAR})")
-print(f"Testing set size: {len(df_test)} rows (Years {TEST_START_YEAR} to {TEST_END_YEAR})")
-
-# Save the split datasets
-df_train.to_csv('train_data.csv', index=False)
-df_test.to_csv('test_data.csv', index=False)
-print("Train and test data saved to train_data.csv and test_data.csv")
+from reshape import interpolate_cube
+
+
+def build_features(df_gdp, panel, regressor_indicators=None):
+    """Merges the regressor indicators of the AEO panel (see compact.py) onto the GDP growth series.
+
+    `regressor_indicators` maps indicator codes to column names (REGRESSOR_INDICATORS by
+    default). Returns the multivariate frame, without the rows that still have missing values.
+    """
+    if regressor_indicators is None:
+        regressor_indicators = REGRESSOR_INDICATORS
+
+    # Build the (country x regressor x year) cube of the regressor data in one pass.
+    # The regressor columns come out in the order of `regressor_indicators`.
+    countries = sorted(df_gdp['Country'].unique())
+    regressor_cube, countries, indicators, years = panel_cube(
+        panel, countries=countries, indicators=list(regressor_indicators)
+    )
+
+    # Handle missing values in regressors: linear interpolation within each country, over the
+    # years covered by its GDP series (the rows the regressors are merged onto). All countries
+    # and regressors are interpolated at once along the year axis.
+    gdp_years = df_gdp.groupby('Country')['ds'].agg(['min', 'max']).reindex(countries)
+    in_gdp_range = (
+        (years >= gdp_years['min'].dt.year.to_numpy()[:, None]) &
+        (years <= gdp_years['max'].dt.year.to_numpy()[:, None])
+    )
+    regressor_cube = interpolate_cube(np.where(in_gdp_range[:, None, :], regressor_cube, np.nan))
+
+    # Long format with one column per regressor
+    df_regressors_long = pd.DataFrame({
+        'Country': np.repeat(np.asarray(countries, dtype=object), len(years)),
+        'ds': pd.to_datetime(np.tile(years, len(countries)).astype(str), format='%Y'),
+    })
+    for i, indicator in enumerate(indicators):
+        df_regressors_long[regressor_indicators[indicator]] = regressor_cube[:, i, :].reshape(-1)
+
+    # Merge GDP data with regressors
+    df_final = pd.merge(df_gdp, df_regressors_long, on=['Country', 'ds'], how='left')
+    df_final = df_final.sort_values(by=['Country', 'ds'], kind='stable').reset_index(drop=True)
+
+    # Drop any remaining NaNs (e.g., at the start of the series)
+    return df_final.dropna()
+
+
+def split_train_test(df_final):
+    """Splits the multivariate data chronologically into the training and test sets."""
+    # The split years are defined in config.py (training up to 2015, testing 2016–2020)
+    df_train = df_final[df_final['ds'].dt.year <= TRAIN_END_YEAR]
+    df_test = df_final[
+        (df_final['ds'].dt.year >= TEST_START_YEAR) & 
+        (df_final['ds'].dt.year <= TEST_END_YEAR)
+    ]
+    return df_train, df_test
+
+
+def main():
+    # Load the final cleaned GDP growth data ('ds' is stored as datetime)
+    df_gdp = read_artifact('gdp_growth_final_clean_data')
+
+    # Load the regressor indicators selected in config.py from the initial filtered data
+    # (only their rows are read)
+    panel = read_panel(indicator_codes=list(REGRESSOR_INDICATORS))
+
+    # The regressors are selected by indicator code (AEO_REGRESSORS, by default Fiscal Balance,
+    # Current Account Balance and Inflation, as common macroeconomic features)
+    indicator_names = panel.drop_duplicates(INDICATOR_CODE_COL).set_index(INDICATOR_CODE_COL)[INDICATOR_COL]
+    print("--- Selected Regressor Indicators ---")
+    for code, column in REGRESSOR_INDICATORS.items():
+        print(f"{column}: {indicator_names.get(code, 'not found in the data')} ({code})")
+
+    df_final = build_features(df_gdp, panel)
+
+    print("\n--- Final DataFrame with Regressors Head (Multivariate Model Ready) ---")
+    print(df_final.head())
+    print("\n--- Final DataFrame with Regressors Info ---")
+    print(df_final.info())
+
+    # Save the final multivariate dataset
+    write_artifact(df_final, 'gdp_growth_multivariate_data')
+    print("\nMultivariate data saved to the gdp_growth_multivariate_data artifact")
+
+    # --- Train-Test Split ---
+    df_train, df_test = split_train_test(df_final)
+
+    print(f"\n--- Train-Test Split Summary ---")
+    print(f"Training set size: {len(df_train)} rows (Years up to {TRAIN_END_YEAR})")
+    print(f"Testing set size: {len(df_test)} rows (Years {TEST_START_YEAR} to {TEST_END_YEAR})")
+
+    # Save the split datasets
+    write_artifact(df_train, 'train_data')
+    write_artifact(df_test, 'test_data')
+    print("Train and test data saved to the train_data and test_data artifacts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import ast
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+# Content hashes used to decide whether a stage, a country or a cached model is up to date.
+
+
+def file_hash(path):
+    """Returns the SHA-256 of the content of `path`."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def module_hashes(script):
+    """Returns file_hash() of `script` and of every module of its directory that it imports,
+    directly or through those modules (any import statement, including the ones inside
+    functions), by path relative to that directory."""
+    root = os.path.dirname(os.path.abspath(script))
+    hashes = {}
+    pending = [os.path.abspath(script)]
+    while pending:
+        path = pending.pop()
+        name = os.path.relpath(path, root)
+        if name in hashes:
+            continue
+        hashes[name] = file_hash(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                # (`from package import module` imports a module too)
+                modules = [node.module] + [f'{node.module}.{alias.name}' for alias in node.names]
+            else:
+                continue
+            for module in modules:
+                module_path = os.path.join(root, *module.split('.')) + '.py'
+                if os.path.exists(module_path):
+                    pending.append(module_path)
+    return dict(sorted(hashes.items()))
+
+
+def frame_hash(df):
+    """Returns a SHA-256 of the values of `df` (independent of its index)."""
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values.tobytes()).hexdigest()
+
+
+def group_hashes(df, column, columns=None):
+    """Returns frame_hash() of the rows (of `columns`, by default all of them) of every value
+    of `column` of `df`, from the row hashes of the whole frame (one pass, instead of one
+    selection per value)."""
+    row_hashes = pd.util.hash_pandas_object(df[columns] if columns is not None else df, index=False).to_numpy()
+    return {
+        key: hashlib.sha256(row_hashes[rows].tobytes()).hexdigest()
+        for key, rows in df.groupby(column, sort=False).indices.items()
+    }
+
+
+def combine_hashes(parts):
+    """Returns a SHA-256 of a JSON-serializable description of the inputs of a stage."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
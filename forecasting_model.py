@@ -1,152 +1,497 @@
 import pandas as pd
-from prophet import Prophet
-from sklearn.metrics import mean_squared_error, mean_absolute_error
 import numpy as np
-import json
+import argparse
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from artifact_store import read_artifact
+from config import REGRESSORS, FORECAST_YEARS, INTERVAL_MODE, TRAIN_END_YEAR
+from metrics import METRICS, score
+from backtest import BACKTEST_FILE
+from instrumentation import count, span
+import baseline_models
+import feature_screening
+import intervals
+import model_cache
+import pooled_model
+import regressor_forecast
+import results_store
 
-# Load the split data
-df_train = pd.read_csv('train_data.csv')
-df_test = pd.read_csv('test_data.csv')
+# Prophet configuration. Part of the model cache key, so changing it refits the models.
+MODEL_CONFIG = {
+    'yearly_seasonality': True,
+    'weekly_seasonality': False,
+    'daily_seasonality': False,
+    'regressors': REGRESSORS
+}
 
-# Convert 'ds' to datetime objects
-df_train['ds'] = pd.to_datetime(df_train['ds'])
-df_test['ds'] = pd.to_datetime(df_test['ds'])
 
-# Define the regressors used in feature engineering
-REGRESSORS = ['Fiscal_Balance', 'Current_Account_Balance', 'Inflation']
+def model_config(regressors=REGRESSORS):
+    """Returns the Prophet configuration of a model with `regressors` (the model cache key)."""
+    return {**MODEL_CONFIG, 'regressors': list(regressors)}
 
-# Dictionary to store results
-results = {
-    'forecasts': {},
-    'metrics': {},
-    'components': {}
-}
 
-countries = df_train['Country'].unique()
+def build_model(regressors=None):
+    """Creates an unfitted Prophet model with the configured seasonalities and `regressors`
+    (default: all the configured regressors)."""
+    # Prophet (and cmdstanpy) take seconds to import, so they are only loaded to fit a model:
+    # the baseline/pooled forecasts, the model selection and the scenario panel do without
+    from prophet import Prophet
 
-for country in countries:
-    print(f"\n--- Processing {country} ---")
-    
-    # Prepare data for the current country
-    train_data = df_train[df_train['Country'] == country].copy()
-    test_data = df_test[df_test['Country'] == country].copy()
-    
     # Initialize and configure Prophet model
     # We will use the regressors as they were engineered
     model = Prophet(
-        yearly_seasonality=True,
-        weekly_seasonality=False,
-        daily_seasonality=False
+        yearly_seasonality=MODEL_CONFIG['yearly_seasonality'],
+        weekly_seasonality=MODEL_CONFIG['weekly_seasonality'],
+        daily_seasonality=MODEL_CONFIG['daily_seasonality']
     )
-    
+
     # Add the regressors
-    for regressor in REGRESSORS:
+    for regressor in MODEL_CONFIG['regressors'] if regressors is None else regressors:
         model.add_regressor(regressor)
-        
-    # Fit the model
-    model.fit(train_data[['ds', 'y'] + REGRESSORS])
-    
-    # --- 1. Model Evaluation on Test Set (2016-2020) ---
-    
-    # Create future dataframe for the test period
-    future_test = test_data[['ds'] + REGRESSORS].copy()
-    
-    # Make prediction on the test set
-    forecast_test = model.predict(future_test)
-    
+
+    return model
+
+
+def fit_model(train_data, regressors=None):
+    """Fits a new Prophet model with `regressors` (default: all) on the training data of one country."""
+    if regressors is None:
+        regressors = REGRESSORS
+    model = build_model(regressors)
+    model.fit(train_data[['ds', 'y'] + list(regressors)])
+    return model
+
+
+def compute_metrics(y_true, y_pred, y_train=None):
+    """Returns the RMSE, MAE, MAPE, sMAPE and MASE of a test-period forecast (see metrics.py).
+
+    MAPE is very sensitive to values close to zero, which is the case for GDP growth; sMAPE
+    and MASE (scaled by the naive forecast errors of the training data `y_train`) are not.
+    """
+    df = pd.DataFrame({'Country': 0, 'y': y_true, 'yhat': y_pred})
+    scale = None if y_train is None else pd.Series({0: np.mean(np.abs(np.diff(np.asarray(y_train, dtype=float))))})
+    return {name: float(value) for name, value in score(df, 'Country', scale).iloc[0][METRICS].items()}
+
+
+def summarize_forecasts(country, train_data, test_data, forecast_test, forecast_future):
+    """Scores the test-period forecast of one country and stacks its history and forecasts.
+
+    `forecast_test` and `forecast_future` have 'ds', 'yhat', 'yhat_lower' and 'yhat_upper'
+    columns, whichever model produced them. Returns `(forecast records, metrics)`.
+    """
     # Merge actual values with forecast
     performance_df = pd.merge(
-        test_data[['ds', 'y']], 
-        forecast_test[['ds', 'yhat', 'yhat_lower', 'yhat_upper']], 
-        on='ds', 
+        test_data[['ds', 'y']],
+        forecast_test[['ds', 'yhat', 'yhat_lower', 'yhat_upper']],
+        on='ds',
         how='left'
     )
-    
+
     # Calculate metrics
-    y_true = performance_df['y'].values
-    y_pred = performance_df['yhat'].values
-    
-    rmse = np.sqrt(mean_squared_error(y_true, y_pred))
-    mae = mean_absolute_error(y_true, y_pred)
-    # MAPE calculation (avoid division by zero)
-    # Note: MAPE is very sensitive to values close to zero, which is the case for GDP growth.
-    # We will use a robust version or just report the standard one with a warning.
-    # For now, use the standard one.
-    mape = np.mean(np.abs((y_true - y_pred) / y_true)) * 100
-    
-    results['metrics'][country] = {
-        'RMSE': rmse,
-        'MAE': mae,
-        'MAPE': mape
-    }
-    
-    print(f"Evaluation Metrics on Test Set (2016-2020):")
-    print(f"  RMSE: {rmse:.4f}")
-    print(f"  MAE: {mae:.4f}")
-    print(f"  MAPE: {mape:.2f}%")
-    
-    # --- 2. 5-Year Forecast (2021-2025) ---
-    
-    # Create future dataframe for the forecast period (2021-2025)
-    future_years = pd.to_datetime([f'{y}-01-01' for y in range(2021, 2026)])
-    future_forecast = pd.DataFrame({'ds': future_years})
-    
-    # Prophet requires regressors for the future period.
-    # Since we don't have future values for the regressors, we will use the last known value (2020)
-    # as a simple, naive forecast for the next 5 years. This is a common simplification in MVP.
-    last_known_regressors = df_test[df_test['ds'].dt.year == 2020][REGRESSORS].iloc[0].to_dict()
-    
-    for regressor, value in last_known_regressors.items():
-        future_forecast[regressor] = value
-        
-    # Make the 5-year forecast
-    forecast_future = model.predict(future_forecast)
-    
+    metrics = compute_metrics(performance_df['y'].values, performance_df['yhat'].values, train_data.sort_values('ds')['y'].values)
+
     # Combine historical, test, and future forecast data for visualization
-    historical_data = train_data[['ds', 'y']].copy()
+    historical_data = train_data[['ds', 'y']]
     historical_data['type'] = 'Historical (Train)'
-    
-    test_actual = test_data[['ds', 'y']].copy()
+
+    test_actual = test_data[['ds', 'y']]
     test_actual['type'] = 'Historical (Test)'
-    
+
     # Prepare forecast data for merging
-    test_forecast_viz = performance_df[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].rename(columns={'yhat': 'y'}).copy()
+    test_forecast_viz = performance_df[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].rename(columns={'yhat': 'y'})
     test_forecast_viz['type'] = 'Forecast (Test)'
-    
-    future_forecast_data = forecast_future[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].rename(columns={'yhat': 'y'}).copy()
+
+    future_forecast_data = forecast_future[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].rename(columns={'yhat': 'y'})
     future_forecast_data['type'] = 'Forecast (Future)'
-    
+
     # Store the combined forecast data
     combined_forecast = pd.concat([historical_data, test_actual, test_forecast_viz, future_forecast_data], ignore_index=True)
     combined_forecast['Country'] = country
-    
+
     # FIX: Convert 'ds' to string before saving to JSON
     combined_forecast['ds'] = combined_forecast['ds'].dt.strftime('%Y-%m-%d')
-    
-    results['forecasts'][country] = combined_forecast.to_dict(orient='records')
-    
+
+    return combined_forecast.to_dict(orient='records'), metrics
+
+
+def future_dates():
+    """Returns the dates of the forecast period (2021-2025)."""
+    return pd.Series(pd.to_datetime([f'{y}-01-01' for y in FORECAST_YEARS]), name='ds')
+
+
+def fit_country(country, train_data, test_data, future_regressors, use_cache=True, interval_mode=INTERVAL_MODE,
+                regressors=None):
+    """Fits a Prophet model for one country and returns its forecasts, metrics and components.
+
+    This is the unit of work for the parallel training mode, so it only depends on its
+    arguments and can run in a worker process. With `use_cache`, a model already fitted on
+    the same training data is loaded from the model cache instead of being refitted. The
+    uncertainty intervals are computed in `interval_mode` (see intervals.py). The model uses
+    `regressors` (default: all; see feature_screening.py); the components of the others are 0.
+    `future_regressors` has the 'ds' and regressor values of the forecast period.
+    """
+    start_time = time.perf_counter()
+    if regressors is None:
+        regressors = REGRESSORS
+
+    # Prophet draws the uncertainty intervals at random. Seed per country so that the
+    # output does not depend on which worker (or in which order) the country is fitted.
+    np.random.seed(zlib.crc32(country.encode('utf-8')))
+
+    # Fit the model (or load it from the cache)
+    training_frame = train_data[['ds', 'y'] + regressors]
+    with span('prophet.fit', country=country, rows=len(training_frame), regressors=len(regressors)) as fields:
+        if use_cache:
+            model, cache_hit, _ = model_cache.get_or_fit(
+                country, training_frame, model_config(regressors), lambda: fit_model(training_frame, regressors)
+            )
+        else:
+            model, cache_hit = fit_model(training_frame, regressors), False
+        fields['cache_hit'] = cache_hit
+    count('model_cache.hit' if cache_hit else 'model_cache.miss', country=country)
+    fit_seconds = time.perf_counter() - start_time
+
+    # --- 1. Model Evaluation on Test Set (2016-2020) ---
+
+    # Create future dataframe for the test period
+    future_test = test_data[['ds'] + regressors]
+
+    # Make prediction on the test set
+    with span('prophet.predict', country=country, part='test', interval_mode=interval_mode):
+        forecast_test = intervals.predict(model, future_test, interval_mode)
+
+    # --- 2. 5-Year Forecast (2021-2025) ---
+
+    # Prophet requires regressors for the future period: their forecasts for the country
+    # (see regressor_forecast.py)
+    future_forecast = future_regressors[['ds'] + regressors]
+
+    # Make the 5-year forecast
+    with span('prophet.predict', country=country, part='future', interval_mode=interval_mode):
+        forecast_future = intervals.predict(model, future_forecast, interval_mode)
+
+    forecasts, metrics = summarize_forecasts(country, train_data, test_data, forecast_test, forecast_future)
+
     # --- 3. Feature Importance & Interpretability (Prophet decomposition) ---
-    
+
     # Prophet's decomposition is inherent in the model. We will extract the components.
     # We use the forecast_test dataframe as it contains the components for the test period.
-    
-    # The components are trend, yearly seasonality, and the regressors
-    component_cols = ['ds', 'trend', 'yearly'] + REGRESSORS
-    components_df = forecast_test[component_cols].copy()
-    
+
+    # The components are trend, yearly seasonality, and the regressors (0 for the regressors
+    # the model does not use)
+    components_df = forecast_test[['ds', 'trend', 'yearly'] + regressors]
+    components_df = components_df.assign(**{regressor: 0.0 for regressor in REGRESSORS if regressor not in regressors})
+    components_df = components_df[['ds', 'trend', 'yearly'] + REGRESSORS]
+
     # Calculate the total regressor effect (sum of all regressor effects)
     # Prophet's output for regressors is directly their effect on yhat
     components_df['Regressors_Effect'] = components_df[REGRESSORS].sum(axis=1)
-    
+
     # FIX: Convert 'ds' to string before saving to JSON
     components_df['ds'] = components_df['ds'].dt.strftime('%Y-%m-%d')
-    
-    results['components'][country] = components_df.to_dict(orient='records')
-    
-    print(f"Forecast for {country} stored.")
-
-# Save all results to a JSON file
-with open('forecasting_results.json', 'w') as f:
-    json.dump(results, f, indent=4)
-    
-print("\nAll forecasting results (forecasts, metrics, components) saved to forecasting_results.json")
+
+    return {
+        'country': country,
+        'model': 'prophet',
+        'forecasts': forecasts,
+        'metrics': metrics,
+        'components': components_df.to_dict(orient='records'),
+        'fit_seconds': fit_seconds,
+        'total_seconds': time.perf_counter() - start_time,
+        'cache_hit': cache_hit
+    }
+
+
+def fit_baseline(model, df_train, df_test):
+    """Fits a baseline model for every country in `df_train` at once.
+
+    Returns the outputs of the countries in the format of fit_country(). The baselines are
+    univariate, so their whole forecast is reported as the 'trend' component.
+    """
+    start_time = time.perf_counter()
+
+    # One horizon covers the test period and the forecast period of every country
+    last_train_year = df_train.groupby('Country')['ds'].max().dt.year.min()
+    horizon = max(FORECAST_YEARS) - last_train_year
+    with span('baseline.fit', model=model, countries=df_train['Country'].nunique()):
+        countries, forecast, std, last_years = baseline_models.forecast_baseline(model, df_train, horizon)
+    fit_seconds = (time.perf_counter() - start_time) / len(countries)
+
+    train_groups = dict(tuple(df_train.groupby('Country', sort=False)))
+    test_groups = dict(tuple(df_test.groupby('Country', sort=False)))
+    outputs = {}
+    for i, country in enumerate(countries):
+        country_start = time.perf_counter()
+
+        def predict(ds):
+            steps = ds.dt.year.to_numpy() - last_years[i] - 1
+            interval = baseline_models.INTERVAL_Z * std[i, steps]
+            return pd.DataFrame({
+                'ds': ds.to_numpy(),
+                'yhat': forecast[i, steps],
+                'yhat_lower': forecast[i, steps] - interval,
+                'yhat_upper': forecast[i, steps] + interval,
+            })
+
+        train_data, test_data = train_groups[country], test_groups[country]
+        forecast_test = predict(test_data['ds'])
+        forecasts, metrics = summarize_forecasts(country, train_data, test_data, forecast_test, predict(future_dates()))
+
+        components_df = pd.DataFrame({'ds': forecast_test['ds'].dt.strftime('%Y-%m-%d'), 'trend': forecast_test['yhat'], 'yearly': 0.0})
+        for regressor in REGRESSORS + ['Regressors_Effect']:
+            components_df[regressor] = 0.0
+
+        outputs[country] = {
+            'country': country,
+            'model': model,
+            'forecasts': forecasts,
+            'metrics': metrics,
+            'components': components_df.to_dict(orient='records'),
+            'fit_seconds': fit_seconds,
+            'total_seconds': fit_seconds + time.perf_counter() - country_start,
+            'cache_hit': False
+        }
+    return outputs
+
+
+def fit_pooled(df_train, df_test, countries=None, paths=None):
+    """Fits the pooled model (pooled_model.py) on every country in `df_train` at once.
+
+    The regressors and regions of all countries shape the fit, so it always uses the whole
+    training data; the outputs of `countries` (default: all) are returned in the format of
+    fit_country(). The future regressors are the regressor forecasts `paths` (see
+    regressor_forecast.load_paths(), which is called if they are not given).
+    """
+    start_time = time.perf_counter()
+    with span('pooled.fit', countries=df_train['Country'].nunique()) as fields:
+        model = pooled_model.fit(df_train)
+        fields['iterations'] = model.iterations
+    fit_seconds = (time.perf_counter() - start_time) / len(model.countries)
+    if countries is None:
+        countries = model.countries
+    if paths is None:
+        paths = regressor_forecast.load_paths(df_train, df_test)
+
+    test_groups = dict(tuple(df_test.groupby('Country', sort=False)))
+    train_groups = dict(tuple(df_train.groupby('Country', sort=False)))
+    outputs = {}
+    for country in countries:
+        country_start = time.perf_counter()
+        train_data, test_data = train_groups[country], test_groups[country]
+
+        future_forecast = regressor_forecast.country_paths(paths, country).assign(Country=country)
+
+        forecast_test = pooled_model.predict(model, test_data)
+        forecast_future = pooled_model.predict(model, future_forecast)
+        forecasts, metrics = summarize_forecasts(country, train_data, test_data, forecast_test, forecast_future)
+
+        # The pooled model is linear: the trend (intercept and slope) plus the regressor effects
+        components_df = forecast_test[['ds', 'trend'] + REGRESSORS]
+        components_df.insert(2, 'yearly', 0.0)
+        components_df['Regressors_Effect'] = components_df[REGRESSORS].sum(axis=1)
+        components_df['ds'] = components_df['ds'].dt.strftime('%Y-%m-%d')
+
+        outputs[country] = {
+            'country': country,
+            'model': 'pooled',
+            'forecasts': forecasts,
+            'metrics': metrics,
+            'components': components_df.to_dict(orient='records'),
+            'fit_seconds': fit_seconds,
+            'total_seconds': fit_seconds + time.perf_counter() - country_start,
+            'cache_hit': False
+        }
+    return outputs
+
+
+def select_models(countries, model='auto', backtest_path=BACKTEST_FILE):
+    """Picks the model of every country.
+
+    With 'auto', a country uses the baseline or pooled model with the lowest mean RMSE in
+    the backtest (backtest.py), unless Prophet's is lower. Only the folds that end by
+    TRAIN_END_YEAR are compared, so the test years do not take part in the selection.
+    Countries without Prophet folds in the backtest (or if there is no backtest) use Prophet.
+    Any other value of `model` ('prophet', 'pooled' or a baseline name) is used for every
+    country.
+    """
+    if model != 'auto':
+        return {country: model for country in countries}
+    selection = {country: 'prophet' for country in countries}
+    if not os.path.exists(backtest_path):
+        return selection
+
+    folds = pd.read_csv(backtest_path)
+    if 'model' not in folds.columns:
+        return selection
+    folds = folds[folds['cutoff'] + folds['horizon'] <= TRAIN_END_YEAR]
+    mean_rmse = folds.groupby(['Country', 'model'])['RMSE'].mean().unstack()
+    alternatives = [name for name in list(baseline_models.BASELINE_MODELS) + ['pooled'] if name in mean_rmse.columns]
+    if 'prophet' not in mean_rmse.columns or not alternatives:
+        return selection
+
+    for country in countries:
+        if country not in mean_rmse.index or pd.isna(mean_rmse.loc[country, 'prophet']):
+            continue
+        best_alternative = mean_rmse.loc[country, alternatives].idxmin()
+        if mean_rmse.loc[country, best_alternative] < mean_rmse.loc[country, 'prophet']:
+            selection[country] = best_alternative
+    return selection
+
+
+def run_forecasts(df_train, df_test, workers=1, countries=None, use_cache=True, model='auto', interval_mode=INTERVAL_MODE):
+    """Fits every country in `df_train` and merges the outputs into the results structure.
+
+    The model of each country is picked by select_models(). The baseline and pooled models
+    are fitted for all their countries at once (the pooled model on the whole training data);
+    the Prophet countries are fitted one by one, or in a
+    process pool with `workers > 1`. The results are always merged in the order the
+    countries appear in `df_train`, so the output is the same regardless of which worker
+    finishes first. `countries` restricts the fit to a subset (the pipeline runner uses it to
+    refit only the countries whose data changed). The uncertainty intervals of the Prophet
+    forecasts are computed in `interval_mode` (see intervals.py).
+    """
+    if countries is None:
+        countries = df_train['Country'].unique()
+    else:
+        countries = [country for country in df_train['Country'].unique() if country in set(countries)]
+
+    selection = select_models(countries, model)
+    prophet_countries = [country for country in countries if selection[country] == 'prophet']
+    # The Prophet regressors of every country (see feature_screening.py)
+    regressor_selection = feature_screening.load_selection()
+
+    # The future values of the regressors of every country (see regressor_forecast.py)
+    paths = regressor_forecast.load_paths(df_train, df_test)
+
+    tasks = [
+        (
+            country,
+            df_train[df_train['Country'] == country],
+            df_test[df_test['Country'] == country],
+            regressor_forecast.country_paths(paths, country),
+            use_cache,
+            interval_mode,
+            feature_screening.country_regressors(country, regressor_selection)
+        )
+        for country in prophet_countries
+    ]
+
+    country_outputs = {}
+    pooled_countries = [country for country in countries if selection[country] == 'pooled']
+    if pooled_countries:
+        print(f"Fitting the pooled model for {len(pooled_countries)} countries")
+        country_outputs.update(fit_pooled(df_train, df_test, pooled_countries, paths))
+
+    for baseline in sorted(set(selection.values()) - {'prophet', 'pooled'}):
+        baseline_countries = [country for country in countries if selection[country] == baseline]
+        print(f"Fitting the {baseline} baseline for {len(baseline_countries)} countries")
+        country_outputs.update(fit_baseline(
+            baseline,
+            df_train[df_train['Country'].isin(baseline_countries)],
+            df_test[df_test['Country'].isin(baseline_countries)]
+        ))
+
+    if workers > 1 and tasks:
+        print(f"Fitting {len(tasks)} countries with {workers} worker processes")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(fit_country, *task) for task in tasks]
+            for future in futures:
+                output = future.result()
+                country_outputs[output['country']] = output
+                print(f"Forecast for {output['country']} stored.")
+    else:
+        for task in tasks:
+            print(f"\n--- Processing {task[0]} ---")
+            output = fit_country(*task)
+            country_outputs[output['country']] = output
+            print(f"Forecast for {output['country']} stored.")
+
+    # Dictionary to store results
+    results = {
+        'forecasts': {},
+        'metrics': {},
+        'components': {}
+    }
+    timings = []
+
+    for country in countries:
+        output = country_outputs[country]
+        results['forecasts'][country] = output['forecasts']
+        results['metrics'][country] = {**output['metrics'], 'model': output['model']}
+        results['components'][country] = output['components']
+        timings.append({
+            'Country': country,
+            'Model': output['model'],
+            'Fit (s)': output['fit_seconds'],
+            'Fit + Predict (s)': output['total_seconds'],
+            'Cached Model': output['cache_hit']
+        })
+
+    return results, pd.DataFrame(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fit per-country Prophet models and save the forecasts.')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=int(os.environ.get('FORECAST_WORKERS', 1)),
+        help='Number of worker processes used to fit countries in parallel (default: 1, or $FORECAST_WORKERS).'
+    )
+    parser.add_argument(
+        '--model',
+        default='auto',
+        choices=['auto', 'prophet', 'pooled'] + list(baseline_models.BASELINE_MODELS),
+        help="Model used for every country, or 'auto' to use Prophet only where it beats the baseline and pooled models in backtest_results.csv."
+    )
+    parser.add_argument(
+        '--intervals',
+        default=INTERVAL_MODE,
+        choices=intervals.INTERVAL_MODES,
+        help=f"How the Prophet uncertainty intervals are computed (default: {INTERVAL_MODE}, or $AEO_INTERVAL_MODE)."
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always refit the models instead of loading them from the model cache.'
+    )
+    parser.add_argument(
+        '--export-json',
+        nargs='?',
+        const=results_store.JSON_EXPORT_FILE,
+        help=f'Also export the results as one strict JSON file (default path: {results_store.JSON_EXPORT_FILE}).'
+    )
+    args = parser.parse_args()
+
+    # Load the split data ('ds' is stored as datetime)
+    df_train = read_artifact('train_data')
+    df_test = read_artifact('test_data')
+
+    start_time = time.perf_counter()
+    results, timings = run_forecasts(
+        df_train, df_test, workers=args.workers, use_cache=not args.no_cache, model=args.model, interval_mode=args.intervals
+    )
+    wall_seconds = time.perf_counter() - start_time
+
+    # Print the evaluation metrics for each country
+    print("\nEvaluation Metrics on Test Set (2016-2020):")
+    metrics_df = pd.DataFrame.from_dict(results['metrics'], orient='index')
+    metrics_df.index.name = 'Country'
+    print(metrics_df.to_markdown())
+
+    # Report per-country fit timings
+    print("\n--- Per-Country Fit Timings ---")
+    print(timings.to_markdown(index=False, floatfmt='.3f'))
+    print(f"Total wall time: {wall_seconds:.2f}s with {args.workers} worker(s)")
+
+    # Save all results to the results store (one file per country and an index)
+    results_store.write_results(results)
+    print(f"\nAll forecasting results (forecasts, metrics, components) saved to {results_store.RESULTS_DIR}/")
+
+    if args.export_json:
+        print(f"Strict JSON export saved to {results_store.export_json(args.export_json)}")
+
+
+if __name__ == '__main__':
+    main()
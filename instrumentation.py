@@ -0,0 +1,293 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Timers and counters around the pipeline stages and the hot paths (reading the source CSV,
+# the interpolation, every Prophet fit and predict, the artifact reads and writes), written
+# as JSON lines: one file per run in RUN_DIR, one event per line.
+#
+# A run is identified by AEO_RUN_ID, which pipeline.py sets for the whole pipeline (so the
+# stage scripts, and the worker processes fitting countries, append to the same file). Run
+# a script on its own with AEO_TRACE=1 to trace it too. Without a run, span() and count()
+# only cost a clock read.
+#
+# Profiling is opt-in, per stage, with AEO_PROFILE (or `pipeline.py --profile`):
+#   cprofile    - the stage runs under cProfile; its stats are saved next to the run file
+#                 (RUN_DIR/<run id>/<stage>.prof) and its slowest functions go in the trace
+#   tracemalloc - the peak traced memory of the stage and its largest allocation sites
+#
+# `python instrumentation.py report` summarizes the latest run and compares it with the
+# previous one, flagging the spans that got slower.
+
+RUN_DIR = os.environ.get('AEO_RUN_DIR', 'runs')
+PROFILERS = ('cprofile', 'tracemalloc')
+
+# A span is flagged as a regression when its mean time grew by more than this fraction and
+# by more than REGRESSION_MIN_SECONDS (so that millisecond noise is not reported)
+REGRESSION_THRESHOLD = 0.2
+REGRESSION_MIN_SECONDS = 0.05
+
+# Functions and allocation sites listed per profiled stage
+PROFILE_TOP = 15
+
+_trace_file = None
+
+
+def new_run_id():
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+
+def run_id():
+    """Returns the id of the current run, or None if nothing is traced."""
+    current = os.environ.get('AEO_RUN_ID')
+    if current is None and os.environ.get('AEO_TRACE', '0') != '0':
+        current = start_run()
+    return current
+
+
+def run_path(run, run_dir=RUN_DIR):
+    return os.path.join(run_dir, f'{run}.jsonl')
+
+
+def profilers():
+    """Returns the profilers enabled by AEO_PROFILE ('cprofile', 'tracemalloc' or 'all')."""
+    selected = [name.strip().lower() for name in os.environ.get('AEO_PROFILE', '').split(',') if name.strip()]
+    if 'all' in selected:
+        return list(PROFILERS)
+    unknown = set(selected) - set(PROFILERS)
+    if unknown:
+        raise ValueError(f"Unknown profilers in AEO_PROFILE: {', '.join(sorted(unknown))} (expected {', '.join(PROFILERS)} or all)")
+    return selected
+
+
+def emit(event_type, name, **fields):
+    """Appends an event to the trace of the current run (if any)."""
+    global _trace_file
+    run = run_id()
+    if run is None:
+        return
+    path = run_path(run)
+    if _trace_file is None or _trace_file.name != path:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # One write per line in append mode, so that processes tracing the same run do not
+        # interleave their lines
+        _trace_file = open(path, 'a')
+    event = {'run': run, 'type': event_type, 'name': name, 'ts': time.time(), 'pid': os.getpid()}
+    if os.environ.get('AEO_STAGE'):
+        event['stage'] = os.environ['AEO_STAGE']
+    event.update(fields)
+    _trace_file.write(json.dumps(event, default=str) + '\n')
+    _trace_file.flush()
+
+
+def start_run(**fields):
+    """Starts a new run (inherited by subprocesses through the environment) and returns its id."""
+    run = new_run_id()
+    os.environ['AEO_RUN_ID'] = run
+    emit('run', 'start', argv=sys.argv, python=platform.python_version(), platform=platform.platform(), **fields)
+    return run
+
+
+@contextmanager
+def span(name, **fields):
+    """Times the block and records it as a span; extra `fields` (country, rows, ...) are kept
+    with it. Fields can be added while the block runs through the yielded dict."""
+    extra = dict(fields)
+    start = time.perf_counter()
+    try:
+        yield extra
+    finally:
+        seconds = time.perf_counter() - start
+        if run_id() is not None:
+            emit('span', name, seconds=seconds, **extra)
+
+
+def count(name, value=1, **fields):
+    """Records a counter increment (cache hits, skipped stages, ...)."""
+    emit('counter', name, value=value, **fields)
+
+
+def _short_path(filename):
+    """The file name with its directory (e.g. 'pandas/__init__.py'), to tell apart modules."""
+    return '/'.join(filename.replace(os.sep, '/').split('/')[-2:])
+
+
+@contextmanager
+def profiled(name, selected=None):
+    """Runs the block under the profilers of AEO_PROFILE (or `selected`) and records a
+    'profile' event with their results."""
+    selected = profilers() if selected is None else selected
+    run = run_id()
+    if not selected or run is None:
+        yield
+        return
+
+    # Imported here: this module is imported by every stage, most of which do not profile
+    import cProfile
+    import io
+    import pstats
+
+    profile = cProfile.Profile() if 'cprofile' in selected else None
+    if 'tracemalloc' in selected:
+        tracemalloc.start()
+    if profile is not None:
+        profile.enable()
+    try:
+        yield
+    finally:
+        fields = {}
+        if profile is not None:
+            profile.disable()
+        # The memory snapshot is taken before the profile stats allocate their own
+        if 'tracemalloc' in selected:
+            _, peak = tracemalloc.get_traced_memory()
+            retained = tracemalloc.take_snapshot().statistics('lineno')[:PROFILE_TOP]
+            tracemalloc.stop()
+            fields['peak_bytes'] = peak
+            fields['top_allocations'] = [
+                {'site': f'{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}', 'bytes': stat.size}
+                for stat in retained
+            ]
+        if profile is not None:
+            path = os.path.join(RUN_DIR, run, f'{name}.prof')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            profile.dump_stats(path)
+            stats = pstats.Stats(profile, stream=io.StringIO())
+            top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]
+            fields['profile_path'] = path
+            fields['top_functions'] = [
+                {'function': f'{_short_path(filename)}:{line}({function})', 'calls': calls,
+                 'self_seconds': self_seconds, 'cumulative_seconds': cumulative}
+                for (filename, line, function), (_, calls, self_seconds, cumulative, _) in top
+            ]
+        emit('profile', name, **fields)
+
+
+def run_script(script, name=None):
+    """Runs `script` as __main__ under the profilers of AEO_PROFILE (used by pipeline.py to
+    profile the stages that run as scripts)."""
+    import runpy
+
+    sys.argv = [script]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    with profiled(name or os.path.splitext(os.path.basename(script))[0]):
+        runpy.run_path(script, run_name='__main__')
+
+
+def load_events(run, run_dir=RUN_DIR):
+    with open(run_path(run, run_dir), 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def list_runs(run_dir=RUN_DIR):
+    """Returns the ids of the traced runs, oldest first."""
+    return sorted(os.path.basename(path)[:-len('.jsonl')] for path in glob.glob(os.path.join(run_dir, '*.jsonl')))
+
+
+def summarize(events):
+    """Returns the spans of a run aggregated by name (calls, total, mean and max seconds) and
+    its counters summed by name, as two DataFrames."""
+    import pandas as pd
+
+    spans = pd.DataFrame([event for event in events if event['type'] == 'span'], columns=['name', 'seconds'])
+    summary = spans.groupby('name')['seconds'].agg(calls='size', total_seconds='sum', mean_seconds='mean', max_seconds='max')
+    summary = summary.sort_values('total_seconds', ascending=False).reset_index()
+    counters = pd.DataFrame([event for event in events if event['type'] == 'counter'], columns=['name', 'value'])
+    counters = counters.groupby('name')['value'].sum().reset_index()
+    return summary, counters
+
+
+def compare(before, after, threshold=REGRESSION_THRESHOLD, min_seconds=REGRESSION_MIN_SECONDS):
+    """Compares the span summaries of two runs by mean time per call. Returns the spans of
+    both runs with their ratio and a 'regression' flag."""
+    merged = before[['name', 'calls', 'mean_seconds']].merge(
+        after[['name', 'calls', 'mean_seconds']], on='name', suffixes=('_before', '_after')
+    )
+    merged['ratio'] = merged['mean_seconds_after'] / merged['mean_seconds_before']
+    merged['regression'] = (
+        (merged['ratio'] > 1 + threshold)
+        & (merged['mean_seconds_after'] - merged['mean_seconds_before'] > min_seconds)
+    )
+    return merged.sort_values('ratio', ascending=False).reset_index(drop=True)
+
+
+def report(run=None, baseline=None, run_dir=RUN_DIR, threshold=REGRESSION_THRESHOLD):
+    """Prints the summary of `run` (by default the latest) and its comparison with `baseline`
+    (by default the run before it). Returns the number of regressions."""
+    runs = list_runs(run_dir)
+    if not runs:
+        print(f"No runs in {run_dir}/ (run the pipeline, or a script with AEO_TRACE=1)")
+        return 0
+    run = run or runs[-1]
+    if baseline is None and runs.index(run) > 0:
+        baseline = runs[runs.index(run) - 1]
+
+    events = load_events(run, run_dir)
+    summary, counters = summarize(events)
+    print(f"--- Run {run} ---")
+    print(summary.to_markdown(index=False, floatfmt='.4f'))
+    if not counters.empty:
+        print()
+        print(counters.to_markdown(index=False))
+    for event in events:
+        if event['type'] != 'profile':
+            continue
+        print(f"\n--- Profile of {event['name']} ---")
+        if 'top_functions' in event:
+            print(f"cProfile stats: {event['profile_path']}")
+            print(_table(event['top_functions']))
+        if 'peak_bytes' in event:
+            print(f"Peak traced memory: {event['peak_bytes'] / 1e6:.1f} MB; largest retained allocations:")
+            print(_table(event['top_allocations']))
+
+    if baseline is None:
+        return 0
+    comparison = compare(summarize(load_events(baseline, run_dir))[0], summary, threshold)
+    regressions = int(comparison['regression'].sum())
+    print(f"\n--- Comparison with run {baseline} (ratio > 1 means slower now) ---")
+    print(comparison.to_markdown(index=False, floatfmt='.4f'))
+    if regressions:
+        print(f"\n{regressions} span(s) slower by more than {threshold:.0%}: "
+              + ', '.join(comparison.loc[comparison['regression'], 'name']))
+    return regressions
+
+
+def _table(records):
+    import pandas as pd
+
+    return pd.DataFrame(records).to_markdown(index=False, floatfmt='.4f')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize and compare traced runs, or run a script under the profilers.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    report_parser = commands.add_parser('report', help='Summarize a run and compare it with a previous one.')
+    report_parser.add_argument('run', nargs='?', help='Run id (default: the latest run).')
+    report_parser.add_argument('--baseline', help='Run id to compare with (default: the run before).')
+    report_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                               help=f'Slowdown flagged as a regression (default: {REGRESSION_THRESHOLD}).')
+    report_parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 if a span regressed.')
+    commands.add_parser('runs', help='List the traced runs.')
+    script_parser = commands.add_parser('run', help='Run a script under the profilers of AEO_PROFILE.')
+    script_parser.add_argument('script')
+    script_parser.add_argument('--name', help='Name of the profile (default: the script name).')
+    args = parser.parse_args()
+
+    if args.command == 'runs':
+        print('\n'.join(list_runs()))
+    elif args.command == 'run':
+        run_script(args.script, args.name)
+    else:
+        regressions = report(args.run, args.baseline, threshold=args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
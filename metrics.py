@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+
+# Forecast error metrics and component importance, computed for any number of series
+# (countries, backtest folds, models) at once.
+#
+# Every function takes a long frame with one row per forecast year and the columns that
+# identify a series (`by`), turns the series into integer codes and sums the per-row
+# errors with np.bincount, so the cost is a few passes over the rows, whatever the number
+# of series.
+#
+# MAPE divides by the actual growth, so it explodes when the growth is close to zero (and is
+# infinite when it is zero). sMAPE divides by the mean of the actual and forecast magnitudes
+# and stays between 0 and 200%. MASE divides the MAE by the in-sample MAE of the naive
+# forecast (the mean absolute year-over-year change of the training data): below 1, the
+# model beats carrying the last value forward.
+
+METRICS = ['RMSE', 'MAE', 'MAPE', 'sMAPE', 'MASE']
+
+# Tidy table of all the metrics, written by model_summary.py and read by the dashboard
+METRICS_FILE = 'model_metrics.csv'
+TIDY_COLUMNS = ['Country', 'model', 'source', 'cutoff', 'Metric', 'Feature', 'Value']
+
+# Columns of the Prophet components summarized by the importance, with their feature names
+COMPONENT_FEATURES = {'trend': 'Trend', 'yearly': 'Seasonality'}
+
+
+def _columns(by):
+    return [by] if isinstance(by, str) else list(by)
+
+
+def group_codes(df, by):
+    """Returns `(codes, keys)`: the series number of every row of `df`, and a frame with the
+    `by` columns of every series, in order of first appearance."""
+    by = _columns(by)
+    codes = df.groupby(by, sort=False, dropna=False).ngroup().to_numpy()
+    keys = df[by].drop_duplicates().reset_index(drop=True)
+    return codes, keys
+
+
+def naive_scale(df, by='Country'):
+    """Returns the mean absolute year-over-year change of 'y' per series (the MAE of the naive
+    one-step forecast), indexed by the `by` columns."""
+    df = df.sort_values('ds')
+    changes = df.groupby(by, sort=False)['y'].diff().abs()
+    return changes.groupby([df[column] for column in _columns(by)], sort=False).mean()
+
+
+def score(df, by, scale=None):
+    """Returns the METRICS of every series of `df` ('y' actuals and 'yhat' forecasts).
+
+    `scale` is the MASE denominator: a Series indexed like naive_scale(), or the name of a
+    column of `df` holding it on every row. Without it, MASE is NaN.
+    """
+    codes, keys = group_codes(df, by)
+    n_series = len(keys)
+    counts = np.bincount(codes, minlength=n_series)
+
+    def mean(values):
+        return np.bincount(codes, values, n_series) / counts
+
+    y_true = df['y'].to_numpy(dtype=float)
+    y_pred = df['yhat'].to_numpy(dtype=float)
+    abs_error = np.abs(y_true - y_pred)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ape = abs_error / np.abs(y_true)
+    denominator = np.abs(y_true) + np.abs(y_pred)
+    sape = np.divide(2 * abs_error, denominator, out=np.zeros_like(abs_error), where=denominator > 0)
+
+    table = keys.copy()
+    table['RMSE'] = np.sqrt(mean(abs_error ** 2))
+    table['MAE'] = mean(abs_error)
+    table['MAPE'] = mean(ape) * 100
+    table['sMAPE'] = mean(sape) * 100
+    if scale is None:
+        table['MASE'] = np.nan
+    elif isinstance(scale, str):
+        table['MASE'] = table['MAE'] / mean(df[scale].to_numpy(dtype=float))
+    else:
+        index = pd.MultiIndex.from_frame(keys) if keys.shape[1] > 1 else keys.iloc[:, 0]
+        table['MASE'] = table['MAE'].to_numpy() / scale.reindex(index).to_numpy()
+    return table
+
+
+def fold_predictions(model, cutoff, df_test, y_pred, train_sizes, scale, fit_seconds, warm_start=False):
+    """Returns the forecasts `y_pred` of the test rows of one fold (of one or many countries),
+    with what score_folds() needs: the 'y' actuals, the MASE 'scale' and the training size
+    (both Series indexed by country) and the fit time per country."""
+    countries = df_test['Country']
+    return pd.DataFrame({
+        'Country': countries.to_numpy(),
+        'model': model,
+        'cutoff': cutoff,
+        'y': df_test['y'].to_numpy(dtype=float),
+        'yhat': y_pred,
+        'scale': scale.reindex(countries).to_numpy(),
+        'train_size': train_sizes.reindex(countries).to_numpy(),
+        'fit_seconds': fit_seconds,
+        'warm_start': warm_start,
+    })
+
+
+def score_folds(predictions):
+    """Scores the forecasts of every fold and model (fold_predictions() rows) at once.
+    Returns one row per (country, model, cutoff) with the backtest table columns."""
+    keys = ['Country', 'model', 'cutoff']
+    scores = score(predictions, keys, scale='scale')
+    folds = predictions.groupby(keys, sort=False).agg(
+        horizon=('y', 'size'), train_size=('train_size', 'first'),
+        fit_seconds=('fit_seconds', 'first'), warm_start=('warm_start', 'first')
+    ).reset_index()
+    folds = folds.merge(scores, on=keys)
+    return folds[['Country', 'cutoff', 'horizon', 'train_size'] + METRICS + ['fit_seconds', 'warm_start', 'model']]
+
+
+def component_importance(components, regressors, by='Country'):
+    """Returns the mean absolute effect of every regressor, the trend and the seasonality per
+    series of `components` (a long frame of model components), with 'Feature' and
+    'Importance' columns."""
+    codes, keys = group_codes(components, by)
+    columns = list(regressors) + list(COMPONENT_FEATURES)
+    features = list(regressors) + list(COMPONENT_FEATURES.values())
+    values = np.abs(components[columns].to_numpy(dtype=float))
+    counts = np.bincount(codes, minlength=len(keys))
+    means = np.stack([np.bincount(codes, values[:, j], len(keys)) for j in range(len(columns))], axis=1) / counts[:, None]
+
+    table = keys.loc[keys.index.repeat(len(features))].reset_index(drop=True)
+    table['Feature'] = np.tile(features, len(keys))
+    table['Importance'] = means.ravel()
+    return table
+
+
+def results_frames(results):
+    """Flattens the results structure of forecasting_model.run_forecasts() into
+    `(forecasts, components, models)`: long frames of all countries and the model per country."""
+    countries = list(results['forecasts'])
+    forecasts = pd.DataFrame([record for country in countries for record in results['forecasts'][country]])
+    forecasts['ds'] = pd.to_datetime(forecasts['ds'], format='%Y-%m-%d')
+
+    lengths = [len(results['components'][country]) for country in countries]
+    components = pd.DataFrame([record for country in countries for record in results['components'][country]])
+    components['Country'] = np.repeat(countries, lengths)
+
+    models = pd.Series({country: results['metrics'][country].get('model', 'prophet') for country in countries}, name='model')
+    return forecasts, components, models
+
+
+def test_scores(forecasts):
+    """Returns the METRICS of the test-period forecast of every country in `forecasts` (the
+    long frame of results_frames()), with the last training year as 'cutoff'."""
+    train = forecasts[forecasts['type'] == 'Historical (Train)']
+    actual = forecasts.loc[forecasts['type'] == 'Historical (Test)', ['Country', 'ds', 'y']]
+    predicted = forecasts.loc[forecasts['type'] == 'Forecast (Test)', ['Country', 'ds', 'y']].rename(columns={'y': 'yhat'})
+    table = score(actual.merge(predicted, on=['Country', 'ds'], how='left'), 'Country', naive_scale(train))
+    table.insert(1, 'cutoff', train.groupby('Country')['ds'].max().dt.year.reindex(table['Country']).to_numpy())
+    return table
+
+
+def tidy_table(results, regressors, folds=None):
+    """Returns every metric of the forecasting results (and of the backtest `folds`, if given)
+    as one long table with the TIDY_COLUMNS:
+
+    - the test-period METRICS of every country ('source' is 'test')
+    - the metrics of every backtest fold and model ('backtest')
+    - the component importance of every country ('Metric' is 'Importance', with the 'Feature')
+    """
+    forecasts, components, models = results_frames(results)
+    id_columns = ['Country', 'model', 'source', 'cutoff']
+
+    tests = test_scores(forecasts)
+    tests.insert(1, 'model', models.reindex(tests['Country']).to_numpy())
+    tests.insert(2, 'source', 'test')
+    parts = [tests.melt(id_columns, METRICS, 'Metric', 'Value')]
+
+    if folds is not None and not folds.empty:
+        folds = folds.assign(source='backtest')
+        if 'model' not in folds.columns:
+            folds['model'] = 'prophet'
+        metric_columns = [metric for metric in METRICS if metric in folds.columns]
+        parts.append(folds.melt(id_columns, metric_columns, 'Metric', 'Value'))
+
+    importance = component_importance(components, regressors)
+    importance = importance.rename(columns={'Importance': 'Value'}).assign(
+        model=models.reindex(importance['Country']).to_numpy(), source='test', Metric='Importance',
+        cutoff=tests.set_index('Country')['cutoff'].reindex(importance['Country']).to_numpy()
+    )
+    parts.append(importance)
+
+    table = pd.concat(parts, ignore_index=True)
+    table['Feature'] = table['Feature'].fillna('') if 'Feature' in table.columns else ''
+    return table[TIDY_COLUMNS]
+
+
+def importance_table(tidy):
+    """Returns the component importance rows of a tidy table as 'Country', 'Feature' and 'Importance'."""
+    importance = tidy[tidy['Metric'] == 'Importance']
+    return importance[['Country', 'Feature', 'Value']].rename(columns={'Value': 'Importance'}).reset_index(drop=True)
@@ -0,0 +1,153 @@
+import os
+import re
+import time
+
+from fingerprint import combine_hashes, frame_hash
+
+# Fitted Prophet models are cached as JSON files in this directory, keyed by the country,
+# a hash of its training data and the model configuration. Re-forecasting a country whose
+# training data did not change then loads the model instead of calling `model.fit`.
+MODEL_CACHE_DIR = os.environ.get('AEO_MODEL_CACHE_DIR', 'model_cache')
+
+# Eviction limits. When a new model is stored, the least recently used models are removed
+# until the cache holds at most MAX_ENTRIES models and MAX_BYTES bytes.
+MAX_ENTRIES = int(os.environ.get('AEO_MODEL_CACHE_MAX_ENTRIES', 512))
+MAX_BYTES = int(os.environ.get('AEO_MODEL_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+
+def _country_slug(country):
+    return re.sub(r'[^A-Za-z0-9]+', '_', country).strip('_')
+
+
+def model_key(country, train_data, model_config):
+    """Returns the cache key of the model of `country` fitted on `train_data` with `model_config`."""
+    from prophet import __version__ as prophet_version
+
+    return combine_hashes({
+        'country': country,
+        'train': frame_hash(train_data),
+        'config': model_config,
+        'prophet': prophet_version,
+    })
+
+
+def model_path(country, key):
+    """Returns the path of a cached model. The country is part of the file name so that the
+    models of one country can be listed without opening them."""
+    return os.path.join(MODEL_CACHE_DIR, f'{_country_slug(country)}--{key}.json')
+
+
+def load_model(country, key):
+    """Returns the cached model for `key`, or None if it is not cached."""
+    from prophet.serialize import model_from_json
+
+    path = model_path(country, key)
+    try:
+        with open(path, 'r') as f:
+            model = model_from_json(f.read())
+    except FileNotFoundError:
+        return None
+
+    # Mark the model as recently used for the LRU eviction
+    os.utime(path)
+    return model
+
+
+def save_model(country, key, model):
+    """Stores a fitted model in the cache and evicts the least recently used models if needed."""
+    from prophet.serialize import model_to_json
+
+    os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+    path = model_path(country, key)
+
+    # Write to a temporary file first so that a concurrent reader (e.g. another worker
+    # process) never sees a partially written model
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(model_to_json(model))
+    os.replace(tmp_path, path)
+
+    evict()
+
+
+def cached_models(country=None):
+    """Lists the cached models (optionally of one country) as dicts, most recently used first."""
+    if not os.path.isdir(MODEL_CACHE_DIR):
+        return []
+
+    prefix = f'{_country_slug(country)}--' if country is not None else ''
+    entries = []
+    for entry in os.scandir(MODEL_CACHE_DIR):
+        if not entry.name.endswith('.json') or not entry.name.startswith(prefix):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            # Evicted by another process in the meantime
+            continue
+        entries.append({
+            'path': entry.path,
+            'key': entry.name[:-len('.json')].split('--', 1)[-1],
+            'bytes': stat.st_size,
+            'last_used': stat.st_mtime,
+        })
+
+    return sorted(entries, key=lambda e: e['last_used'], reverse=True)
+
+
+def evict(max_entries=None, max_bytes=None):
+    """Removes the least recently used models until the cache is within the limits.
+
+    Returns the number of models removed.
+    """
+    max_entries = MAX_ENTRIES if max_entries is None else max_entries
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+
+    entries = cached_models()
+    total_bytes = sum(e['bytes'] for e in entries)
+    removed = 0
+
+    while entries and (len(entries) > max_entries or total_bytes > max_bytes):
+        oldest = entries.pop()
+        try:
+            os.remove(oldest['path'])
+        except FileNotFoundError:
+            pass
+        total_bytes -= oldest['bytes']
+        removed += 1
+
+    return removed
+
+
+def get_or_fit(country, train_data, model_config, fit_fn):
+    """Returns `(model, cache_hit, seconds)` for the model of `country`.
+
+    The model is loaded from the cache if it was already fitted on the same training data
+    with the same configuration; otherwise `fit_fn()` is called and its model is cached.
+    """
+    start_time = time.perf_counter()
+    key = model_key(country, train_data, model_config)
+
+    model = load_model(country, key)
+    if model is not None:
+        return model, True, time.perf_counter() - start_time
+
+    model = fit_fn()
+    save_model(country, key, model)
+    return model, False, time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect or clear the fitted-model cache.')
+    parser.add_argument('--clear', action='store_true', help='Remove every cached model.')
+    args = parser.parse_args()
+
+    if args.clear:
+        print(f"Removed {evict(max_entries=0)} cached models from {MODEL_CACHE_DIR}/")
+    else:
+        entries = cached_models()
+        print(f"{len(entries)} cached models, {sum(e['bytes'] for e in entries) / 1e6:.1f} MB in {MODEL_CACHE_DIR}/")
+        for entry in entries:
+            print(f"  {os.path.basename(entry['path'])}  {entry['bytes'] / 1e3:.0f} kB")
@@ -1,65 +1,95 @@
+import os
 import pandas as pd
-import json
-import numpy as np
-
-# Load the forecasting results
-with open('forecasting_results.json', 'r') as f:
-    results = json.load(f)
-
-# --- 1. Summarize Evaluation Metrics ---
-print("--- Model Evaluation Summary (on Test Set 2016-2020) ---")
-metrics_df = pd.DataFrame.from_dict(results['metrics'], orient='index')
-metrics_df.index.name = 'Country'
-print(metrics_df.to_markdown())
-
-# --- 2. Prepare Feature Importance Data (Regressors' Average Absolute Effect) ---
-# Prophet's "feature importance" is best represented by the magnitude of the regressor effects.
-# We will calculate the average absolute effect of each regressor over the test period.
-
-regressors = ['Fiscal_Balance', 'Current_Account_Balance', 'Inflation']
-feature_importance_data = []
-
-for country, components_list in results['components'].items():
-    components_df = pd.DataFrame(components_list)
-    
-    # Calculate the average absolute effect for each regressor
-    avg_abs_effects = components_df[regressors].abs().mean().to_dict()
-    
-    # Calculate the average absolute effect for the trend and seasonality for comparison
-    avg_abs_effects['Trend'] = components_df['trend'].abs().mean()
-    avg_abs_effects['Seasonality'] = components_df['yearly'].abs().mean()
-    
-    # Convert to a list of dictionaries for easy Altair visualization
-    for feature, importance in avg_abs_effects.items():
-        feature_importance_data.append({
-            'Country': country,
-            'Feature': feature,
-            'Importance': importance
-        })
-
-feature_importance_df = pd.DataFrame(feature_importance_data)
-
-# Save the feature importance data for the dashboard
-feature_importance_df.to_csv('feature_importance_data.csv', index=False)
-print("\nFeature importance data (average absolute effect) saved to feature_importance_data.csv")
-
-# --- 3. Textual Insights on Model Performance and Interpretability ---
-insights = """
---- Model Performance and Interpretability Insights ---
-
-**Model Performance (Test Set 2016-2020):**
-- **Kenya** shows the best performance with the lowest RMSE and MAE, and a reasonable MAPE (17.23%). This suggests the model is a good fit for Kenya's relatively stable time series.
-- **South Africa** has a low RMSE/MAE, but a high MAPE (132.13%). This is a common issue when actual values (GDP growth) are close to zero, causing the percentage error to be inflated. The low absolute errors (MAE/RMSE) suggest the model is still useful.
-- **Nigeria** has the worst performance by far (RMSE: 6.55, MAE: 6.38, MAPE: 445.45%). This confirms the earlier EDA finding that Nigeria's GDP growth is highly volatile and difficult to predict with a simple Prophet model, especially during the 2016-2020 period which included a major recession. The high error suggests a more complex model (like LSTM or a model incorporating more structural breaks) would be necessary for Nigeria.
-
-**Feature Interpretability (Prophet Decomposition):**
-- The feature importance data, based on the average absolute effect on the forecast, will be used to understand the drivers of the forecast.
-- **Trend** and **Seasonality** (yearly) are the inherent components of the Prophet model.
-- The **Regressors** (Fiscal Balance, Current Account Balance, Inflation) represent the external macroeconomic factors. Their relative importance compared to the inherent components will provide insight into whether external factors or internal time dynamics are the primary drivers of the forecast.
-"""
-print(insights)
-
-# Save the insights to a file
-with open('model_insights.txt', 'w') as f:
-    f.write(insights)
-print("Model insights saved to model_insights.txt")
+import metrics
+from backtest import BACKTEST_FILE
+from config import REGRESSORS, TEST_END_YEAR, TEST_START_YEAR
+from results_store import load_results
+
+# A MAPE above this (in %) is put down to actual growth values close to zero
+HIGH_MAPE = 100
+
+
+def model_insights(metrics_df, importance):
+    """Returns the textual insights on the test metrics of every country (`metrics_df`, see
+    metrics_table()) and on the components of their forecasts (the 'Importance' rows of the
+    tidy metrics table), in Markdown."""
+    lines = [
+        "",
+        "--- Model Performance and Interpretability Insights ---",
+        "",
+        f"**Model Performance (Test Set {TEST_START_YEAR}-{TEST_END_YEAR}):**",
+    ]
+    ranked = metrics_df.sort_values('RMSE')
+    for rank, (country, row) in enumerate(ranked.iterrows()):
+        line = (f"- **{country}** ({row.get('model', 'prophet')}): RMSE {row['RMSE']:.2f}, "
+                f"MAE {row['MAE']:.2f}, MAPE {row['MAPE']:.2f}%.")
+        if len(ranked) > 1 and rank == 0:
+            line += " The lowest RMSE of all countries."
+        elif len(ranked) > 1 and rank == len(ranked) - 1:
+            line += " The highest RMSE of all countries."
+        if row['MAPE'] > HIGH_MAPE:
+            line += (" The MAPE is inflated by actual growth values close to zero, so the absolute"
+                     " errors (RMSE/MAE) are the better guide.")
+        lines.append(line)
+    if 'model' in metrics_df.columns and metrics_df['model'].nunique() > 1:
+        lines.append("- Each country uses the model with the lowest backtest error on the training years "
+                     "(see backtest.py), so the models differ between countries.")
+
+    lines += ["", "**Feature Interpretability (Average Absolute Effect on the Test Forecast):**"]
+    for country, effects in importance.groupby('Country', sort=False):
+        effects = effects.set_index('Feature')['Value']
+        effects = effects[effects > 0].sort_values(ascending=False)
+        if effects.empty:
+            continue
+        drivers = ', '.join(f"{feature.replace('_', ' ')} ({value:.2f})" for feature, value in effects.items())
+        lines.append(f"- **{country}**: {drivers}.")
+    lines.append("- Trend and Seasonality are the inherent components of the models; the regressors are the "
+                 "external macroeconomic factors. Regressors that a country's model does not use have no effect.")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_table(results):
+    """Returns the evaluation metrics of every country as a DataFrame indexed by country."""
+    metrics_df = pd.DataFrame.from_dict(results['metrics'], orient='index')
+    metrics_df.index.name = 'Country'
+    return metrics_df
+
+
+def summary_table(results, folds=None, regressors=REGRESSORS):
+    """Returns every metric of the results (and of the backtest `folds`) as one tidy table.
+
+    Besides the test and backtest errors, it holds the average absolute effect of each
+    regressor, the trend and the seasonality over the test period (Metric 'Importance'),
+    which is Prophet's closest equivalent of a feature importance. See metrics.tidy_table().
+    """
+    return metrics.tidy_table(results, regressors, folds)
+
+
+def main():
+    # Load the forecasting results
+    results = load_results()
+
+    # --- 1. Summarize Evaluation Metrics ---
+    print("--- Model Evaluation Summary (on Test Set 2016-2020) ---")
+    print(metrics_table(results).to_markdown())
+
+    # --- 2. All Metrics and the Feature Importance (Regressors' Average Absolute Effect) ---
+    folds = pd.read_csv(BACKTEST_FILE) if os.path.exists(BACKTEST_FILE) else None
+    summary_df = summary_table(results, folds)
+
+    # Save the tidy metrics table for the dashboard
+    summary_df.to_csv(metrics.METRICS_FILE, index=False, float_format='%.6g')
+    print(f"\nMetrics and feature importance ({len(summary_df)} rows) saved to {metrics.METRICS_FILE}")
+
+    # --- 3. Textual Insights on Model Performance and Interpretability ---
+    insights = model_insights(metrics_table(results), summary_df[summary_df['Metric'] == 'Importance'])
+    print(insights)
+
+    # Save the insights to a file
+    with open('model_insights.txt', 'w') as f:
+        f.write(insights)
+    print("Model insights saved to model_insights.txt")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+import argparse
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from compact import compact_panel, panel_years
+from config import SOURCE_FILE, COUNTRY_COL, REGION_ID_COL, INDICATOR_CODE_COL, INDICATOR_COL
+from instrumentation import span
+from regions import country_region
+
+# In-process store of the AEO panel (see compact.py), indexed for slicing by indicator,
+# region, country and year without scanning the table.
+#
+# The values of every series (one per country and indicator) are rows of a single
+# (series x year) float32 array, ordered by indicator, then region (regions.py), then
+# country. So the series of an indicator, and of an indicator in one region, are contiguous
+# rows, and a range of years is a range of columns: such queries return basic slices of the
+# array, i.e. views with no copy, found through dictionaries built once. A query costs the
+# size of its result, not of the store, where a boolean mask (df[df[col] == value]) reads
+# every row of the table. The views are read-only, so the store cannot be modified through
+# a query result.
+#
+# The RegionId column of the source holds the ISO2 code of each country (not its region),
+# so it is indexed as another key of the countries: queries accept 'KE' for Kenya.
+
+PanelStore = namedtuple('PanelStore', [
+    'values',            # (series x year) float32, NaN where missing
+    'observed',          # (series x year) bool
+    'years',             # the years of the columns, ascending
+    'series_country',    # country of every series
+    'series_indicator',  # indicator code of every series
+    'indicators',        # indicator code -> slice of its series
+    'regions',           # (indicator code, region) -> slice of its series
+    'series',            # (indicator code, country) -> position of the series
+    'countries',         # country -> positions of its series, in indicator order
+    'region_ids',        # RegionId (ISO2 code) -> country
+    'indicator_names',   # indicator code -> indicator name
+])
+
+# Result of a query: (label x year) values and observed mask, with the label (country or
+# indicator) of every row and the years of the columns
+PanelSlice = namedtuple('PanelSlice', ['values', 'observed', 'labels', 'years'])
+
+# Stores built by load_store(), per source file
+_stores = {}
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+def _bounds(positions):
+    """Turns the dict of contiguous positions of groupby().indices into slices."""
+    return {key: slice(rows[0], rows[-1] + 1) for key, rows in positions.items()}
+
+
+def build_store(panel, regions=None):
+    """Builds the store of a compact panel. `regions` maps countries to regions
+    (regions.COUNTRY_REGIONS by default); the aggregates and unmapped rows are in OTHER_REGION.
+
+    Raises ValueError if the panel has more than one series per country and indicator.
+    """
+    years = panel_years(panel).astype(int)
+    step = max(len(years), 1)
+    rows = panel.iloc[::step]
+    country = rows[COUNTRY_COL].to_numpy(dtype=object)
+    indicator = rows[INDICATOR_CODE_COL].to_numpy(dtype=object)
+    region = np.array([country_region(name, regions) for name in country], dtype=object)
+
+    # Series ordered by indicator, region and country (codes of the sorted values)
+    order = np.lexsort([pd.factorize(key, sort=True)[0] for key in (country, region, indicator)])
+    keys = pd.DataFrame({'indicator': indicator[order], 'region': region[order], 'country': country[order]})
+    series = dict(zip(zip(keys['indicator'], keys['country']), range(len(keys))))
+    if len(series) < len(keys):
+        raise ValueError("The panel has more than one series for some countries and indicators")
+
+    region_ids = rows[[REGION_ID_COL, COUNTRY_COL]].dropna().drop_duplicates(REGION_ID_COL)
+    indicator_names = rows[[INDICATOR_CODE_COL, INDICATOR_COL]].drop_duplicates(INDICATOR_CODE_COL)
+    return PanelStore(
+        values=_read_only(panel['value'].to_numpy().reshape(-1, step)[:, :len(years)][order]),
+        observed=_read_only(panel['observed'].to_numpy().reshape(-1, step)[:, :len(years)][order]),
+        years=_read_only(years),
+        series_country=_read_only(keys['country'].to_numpy()),
+        series_indicator=_read_only(keys['indicator'].to_numpy()),
+        indicators=_bounds(keys.groupby('indicator', sort=False).indices),
+        regions=_bounds(keys.groupby(['indicator', 'region'], sort=False).indices),
+        series=series,
+        countries={name: _read_only(rows) for name, rows in keys.groupby('country', sort=False).indices.items()},
+        region_ids=dict(zip(region_ids[REGION_ID_COL].astype(str), region_ids[COUNTRY_COL].astype(str))),
+        indicator_names=dict(zip(indicator_names[INDICATOR_CODE_COL].astype(str), indicator_names[INDICATOR_COL].astype(str))),
+    )
+
+
+def load_store(path=SOURCE_FILE, regions=None):
+    """Returns the store of every country and indicator of the source CSV. It is built once
+    per process, and again only if the file changed."""
+    import data_loader
+
+    modified = os.path.getmtime(path)
+    key = (os.path.abspath(path), None if regions is None else tuple(sorted(regions.items())))
+    if key not in _stores or _stores[key][0] != modified:
+        with span('panel_store.build', path=path) as fields:
+            store = build_store(compact_panel(data_loader.load_source(path)), regions)
+            fields['series'] = len(store.values)
+        _stores[key] = (modified, store)
+    return _stores[key][1]
+
+
+def year_slice(store, start=None, end=None):
+    """Returns the columns of the years from `start` to `end` (both included) as a slice."""
+    first = 0 if start is None else int(np.searchsorted(store.years, start, side='left'))
+    last = len(store.years) if end is None else int(np.searchsorted(store.years, end, side='right'))
+    return slice(first, last)
+
+
+def country_name(store, country):
+    """Returns the country name of a name or RegionId (ISO2 code)."""
+    return store.region_ids.get(country, country)
+
+
+def _slice(store, rows, years, labels):
+    return PanelSlice(store.values[rows, years], store.observed[rows, years], labels[rows], store.years[years])
+
+
+def query(store, indicator, countries=None, region=None, start=None, end=None):
+    """Returns the (country x year) values of `indicator` from `start` to `end` (included), for
+    `countries` (names or RegionIds), for the countries of `region`, or for all countries.
+
+    The values are views of the store unless several `countries` are given, in which case
+    their rows are gathered into new arrays. Raises KeyError for an unknown indicator,
+    region or country.
+    """
+    years = year_slice(store, start, end)
+    if countries is not None:
+        positions = []
+        for country in countries:
+            key = (indicator, country_name(store, country))
+            if key not in store.series:
+                raise KeyError(f"No series of {indicator} for {country}")
+            positions.append(store.series[key])
+        rows = slice(positions[0], positions[0] + 1) if len(positions) == 1 else np.array(positions, dtype=np.intp)
+    elif region is not None:
+        if (indicator, region) not in store.regions:
+            raise KeyError(f"No series of {indicator} in {region}")
+        rows = store.regions[(indicator, region)]
+    else:
+        if indicator not in store.indicators:
+            raise KeyError(f"Unknown indicator {indicator}")
+        rows = store.indicators[indicator]
+    return _slice(store, rows, years, store.series_country)
+
+
+def country_series(store, country, indicators=None, start=None, end=None):
+    """Returns the (indicator x year) values of `country` (a name or RegionId) from `start` to
+    `end`, for `indicators` or all of them. The rows are gathered into new arrays."""
+    name = country_name(store, country)
+    if name not in store.countries:
+        raise KeyError(f"Unknown country {country}")
+    if indicators is None:
+        rows = store.countries[name]
+    else:
+        missing = [indicator for indicator in indicators if (indicator, name) not in store.series]
+        if missing:
+            raise KeyError(f"No series of {', '.join(missing)} for {country}")
+        rows = np.array([store.series[(indicator, name)] for indicator in indicators], dtype=np.intp)
+    return _slice(store, rows, year_slice(store, start, end), store.series_indicator)
+
+
+def to_frame(result):
+    """Returns a query result as a DataFrame (one row per label, one column per year)."""
+    return pd.DataFrame(result.values, index=pd.Index(result.labels), columns=result.years)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the AEO panel by indicator, region, country and years.')
+    parser.add_argument('indicator', nargs='?', help='Indicator code, e.g. NY.GDP.MKTP.KD.ZG (default with --country: all).')
+    parser.add_argument('--countries', help='Comma-separated country names or RegionIds (ISO2 codes).')
+    parser.add_argument('--region', help='Region of regions.py, e.g. "East Africa".')
+    parser.add_argument('--country', help='All the indicators of one country (name or RegionId).')
+    parser.add_argument('--start', type=int, help='First year.')
+    parser.add_argument('--end', type=int, help='Last year.')
+    parser.add_argument('--source', default=SOURCE_FILE, help=f'Source CSV (default: {SOURCE_FILE}).')
+    args = parser.parse_args()
+    if args.indicator is None and args.country is None:
+        parser.error('give an indicator code or --country')
+
+    store = load_store(args.source)
+    try:
+        if args.country:
+            indicators = [args.indicator] if args.indicator else None
+            result = country_series(store, args.country, indicators, args.start, args.end)
+        else:
+            countries = [country.strip() for country in args.countries.split(',')] if args.countries else None
+            result = query(store, args.indicator, countries, args.region, args.start, args.end)
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+        return
+
+    if args.indicator:
+        print(f"{args.indicator}: {store.indicator_names.get(args.indicator, '')}")
+    print(to_frame(result).to_string(float_format='{:.2f}'.format))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,394 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from artifact_store import artifact_path, read_artifact
+from backtest import BACKTEST_FILE
+from feature_screening import SCREENING_FILE, SELECTION_FILE
+from fingerprint import file_hash, frame_hash, group_hashes, combine_hashes, module_hashes
+from metrics import METRICS_FILE
+from regressor_forecast import REGRESSOR_ARTIFACT
+import instrumentation
+import results_store
+import vintages
+
+# Fingerprints of the last successful run of every stage
+STATE_FILE = '.pipeline_state.json'
+
+# Index of the per-country results (see results_store.py). It holds a content hash of every
+# country's files, so it changes whenever any forecast changes.
+RESULTS_FILE = results_store.index_path()
+
+
+def build_stages(config):
+    """Returns the pipeline stages as a DAG.
+
+    Each stage declares the stages it depends on, the files it reads and writes, and the
+    configuration values it uses. A stage is re-run only when the fingerprint of its script
+    (and of the local modules it imports), inputs and configuration differs from the last
+    run (or one of its outputs is missing).
+    Because the fingerprint uses the content of the inputs, a stage whose upstream re-ran
+    but produced identical data is still skipped.
+    """
+    return {
+        # Every version of the source is stored as a vintage (see vintages.py); a new one is
+        # applied as a delta when the artifacts are up to date with an earlier one
+        'data_loader': {
+            'script': 'data_loader.py',
+            'depends_on': [],
+            'inputs': [config.SOURCE_FILE],
+            'outputs': [artifact_path('initial_filtered_data')],
+            'config': {
+                'COUNTRIES': config.COUNTRIES,
+                'REGRESSOR_INDICATORS': config.REGRESSOR_INDICATORS,
+            },
+            'vintaged': True,
+        },
+        'data_prep': {
+            'script': 'data_prep.py',
+            'depends_on': ['data_loader'],
+            'inputs': [artifact_path('initial_filtered_data')],
+            'outputs': [artifact_path('gdp_growth_clean_data')],
+            'config': {},
+        },
+        'eda_and_viz': {
+            'script': 'eda_and_viz.py',
+            'depends_on': ['data_prep'],
+            'inputs': [artifact_path('gdp_growth_clean_data')],
+            'outputs': [
+                artifact_path('gdp_growth_final_clean_data'),
+                'historical_gdp_growth.png',
+                'gdp_growth_boxplot.png',
+                'eda_insights.txt',
+            ],
+            'config': {},
+        },
+        'feature_split': {
+            'script': 'feature_split.py',
+            'depends_on': ['data_loader', 'eda_and_viz'],
+            'inputs': [artifact_path('initial_filtered_data'), artifact_path('gdp_growth_final_clean_data')],
+            'outputs': [
+                artifact_path('gdp_growth_multivariate_data'),
+                artifact_path('train_data'),
+                artifact_path('test_data'),
+            ],
+            'config': {
+                'TRAIN_END_YEAR': config.TRAIN_END_YEAR,
+                'TEST_START_YEAR': config.TEST_START_YEAR,
+                'TEST_END_YEAR': config.TEST_END_YEAR,
+                'REGRESSOR_INDICATORS': config.REGRESSOR_INDICATORS,
+            },
+        },
+        # Screens every indicator of the source and selects the regressors of every country
+        'feature_screening': {
+            'script': 'feature_screening.py',
+            'depends_on': ['feature_split'],
+            'inputs': [config.SOURCE_FILE, artifact_path('train_data')],
+            'outputs': [SCREENING_FILE, SELECTION_FILE],
+            'config': {
+                'TRAIN_END_YEAR': config.TRAIN_END_YEAR,
+                'BACKTEST_FIRST_CUTOFF': config.BACKTEST_FIRST_CUTOFF,
+                'REGRESSOR_INDICATORS': config.REGRESSOR_INDICATORS,
+                'SELECT_REGRESSORS': config.SELECT_REGRESSORS,
+            },
+        },
+        # Scores Prophet (with the selected regressors of every country), the baselines and the
+        # pooled model on the training years; forecasting_model picks each country's model from it
+        'backtest': {
+            'script': 'backtest.py',
+            'depends_on': ['feature_split', 'feature_screening'],
+            'inputs': [artifact_path('gdp_growth_multivariate_data'), SELECTION_FILE],
+            'outputs': [BACKTEST_FILE],
+            'config': {
+                'TRAIN_END_YEAR': config.TRAIN_END_YEAR,
+                'BACKTEST_FIRST_CUTOFF': config.BACKTEST_FIRST_CUTOFF,
+                'REGRESSORS': config.REGRESSORS,
+                'SELECT_REGRESSORS': config.SELECT_REGRESSORS,
+            },
+        },
+        # Forecasts the regressors of every country over the forecast period (cached per country)
+        'regressor_forecast': {
+            'script': 'regressor_forecast.py',
+            'depends_on': ['feature_split'],
+            'inputs': [artifact_path('train_data'), artifact_path('test_data')],
+            'outputs': [artifact_path(REGRESSOR_ARTIFACT)],
+            'config': {
+                'REGRESSORS': config.REGRESSORS,
+                'REGRESSOR_MODEL': config.REGRESSOR_MODEL,
+                'FORECAST_YEARS': list(config.FORECAST_YEARS),
+            },
+        },
+        # Fitted per country: only the countries whose training/test rows (or selected
+        # regressors, or regressor forecasts) changed are refitted.
+        'forecasting_model': {
+            'script': 'forecasting_model.py',
+            'depends_on': ['feature_split', 'feature_screening', 'backtest', 'regressor_forecast'],
+            'inputs': [artifact_path('train_data'), artifact_path('test_data')],
+            'outputs': [RESULTS_FILE],
+            'config': {
+                'REGRESSORS': config.REGRESSORS,
+                'SELECT_REGRESSORS': config.SELECT_REGRESSORS,
+                'INTERVAL_MODE': config.INTERVAL_MODE,
+                'INTERVAL_SAMPLES': config.INTERVAL_SAMPLES,
+            },
+            'per_country': True,
+        },
+        'model_summary': {
+            'script': 'model_summary.py',
+            'depends_on': ['forecasting_model'],
+            'inputs': [RESULTS_FILE, BACKTEST_FILE],
+            'outputs': [METRICS_FILE, 'model_insights.txt'],
+            'config': {},
+        },
+    }
+
+
+def topological_order(stages):
+    """Orders the stages so that every stage comes after the stages it depends on."""
+    order = []
+    visiting = set()
+
+    def visit(name):
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Cycle in pipeline stages at '{name}'")
+        visiting.add(name)
+        for dependency in stages[name]['depends_on']:
+            visit(dependency)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in stages:
+        visit(name)
+    return order
+
+
+def stage_fingerprint(stage):
+    """Fingerprints the script (with the local modules it imports), input files and
+    configuration of a stage."""
+    return combine_hashes({
+        'modules': module_hashes(stage['script']),
+        'inputs': {path: file_hash(path) for path in stage['inputs']},
+        'config': stage['config'],
+    })
+
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {}
+    with open(STATE_FILE, 'r') as f:
+        return json.load(f)
+
+
+def save_state(state):
+    with open(STATE_FILE, 'w') as f:
+        json.dump(state, f, indent=4)
+
+
+def run_script_stage(name, stage, state, force=False):
+    """Runs a whole-dataset stage as a script if its fingerprint changed. Returns True if it ran."""
+    fingerprint = stage_fingerprint(stage)
+    outputs_exist = all(os.path.exists(path) for path in stage['outputs'])
+
+    if not force and outputs_exist and state.get(name, {}).get('fingerprint') == fingerprint:
+        print(f"[skip] {name}: up to date")
+        instrumentation.count('stage.skipped', stage=name)
+        return False
+
+    print(f"[run]  {name}", flush=True)
+    # With profiling on, the script runs under the profilers (see instrumentation.py)
+    command = [sys.executable, stage['script']]
+    if instrumentation.profilers():
+        command = [sys.executable, 'instrumentation.py', 'run', stage['script'], '--name', name]
+    with instrumentation.span(f'stage.{name}'):
+        subprocess.run(command, check=True)
+    state[name] = {'fingerprint': fingerprint}
+    return True
+
+
+def run_ingest_stage(name, stage, stages, state, force=False):
+    """Stores the source as a vintage and brings the data stages up to date with it: by
+    applying the cells that changed since the vintage their artifacts were built from (see
+    vintages.apply_delta()), or else by running the stage script. Returns True if it ran."""
+    fingerprint = stage_fingerprint(stage)
+    previous = state.get(name, {})
+    outputs_exist = all(os.path.exists(path) for path in stage['outputs'])
+    if not force and outputs_exist and previous.get('fingerprint') == fingerprint and previous.get('vintage'):
+        print(f"[skip] {name}: up to date (vintage {previous['vintage']})")
+        instrumentation.count('stage.skipped', stage=name)
+        return False
+
+    vintage = vintages.add_vintage(stage['inputs'][0])
+    # A delta applies when only the source changed since the last run, and the artifacts of
+    # the stages the delta rewrites were up to date with the vintage before
+    settings = combine_hashes({
+        'modules': {**module_hashes(stage['script']), **module_hashes('vintages.py')},
+        'config': stage['config'],
+    })
+    delta = (
+        not force and outputs_exist
+        and previous.get('vintage') not in (None, vintage['id'])
+        and previous.get('settings') == settings
+        and all(
+            state.get(downstream, {}).get('fingerprint') == stage_fingerprint(stages[downstream])
+            and all(os.path.exists(path) for path in stages[downstream]['outputs'])
+            for downstream in vintages.DELTA_STAGES
+        )
+    )
+
+    if delta:
+        with instrumentation.span(f'stage.{name}', vintage=vintage['id'], delta=True):
+            diff = vintages.diff_vintages(previous['vintage'], vintage['id'])
+            countries = vintages.apply_delta(vintage['id'])
+        print(f"[delta] {name}: vintage {vintage['id']} changes {len(diff)} cells since {previous['vintage']}; "
+              f"updated the data of {len(countries)} countries {countries}", flush=True)
+        for downstream in vintages.DELTA_STAGES:
+            state[downstream] = {'fingerprint': stage_fingerprint(stages[downstream])}
+    else:
+        print(f"[run]  {name} (vintage {vintage['id']})", flush=True)
+        command = [sys.executable, stage['script']]
+        if instrumentation.profilers():
+            command = [sys.executable, 'instrumentation.py', 'run', stage['script'], '--name', name]
+        with instrumentation.span(f'stage.{name}', vintage=vintage['id']):
+            subprocess.run(command, check=True)
+    state[name] = {'fingerprint': fingerprint, 'vintage': vintage['id'], 'settings': settings}
+    return True
+
+
+def run_forecasting_stage(name, stage, state, force=False, workers=1):
+    """Refits only the countries whose training/test data changed. Returns True if any were refitted."""
+    # Imported here so that Prophet is only loaded when a forecast has to be computed.
+    import config
+    import forecasting_model
+
+    df_train = read_artifact('train_data')
+    df_test = read_artifact('test_data')
+
+    # Everything the fit of each country depends on besides its own rows and regressor forecasts
+    shared = {
+        'modules': module_hashes(stage['script']),
+        'config': stage['config'],
+    }
+    paths = forecasting_model.regressor_forecast.load_paths(df_train, df_test)
+
+    # The model of each country is picked from the backtest results, so a new backtest refits
+    # the countries whose model changed
+    countries = df_train['Country'].unique().tolist()
+    selection = forecasting_model.select_models(countries)
+    regressor_selection = forecasting_model.feature_screening.load_selection()
+    # The pooled model is fitted on all countries, so its countries depend on all the data
+    panel_hash = combine_hashes({'train': frame_hash(df_train), 'test': frame_hash(df_test)})
+    # The rows of every country, hashed in one pass (a country without rows has the hash of
+    # an empty frame)
+    no_rows = frame_hash(df_test.iloc[:0])
+    train_hashes = group_hashes(df_train, 'Country')
+    test_hashes = group_hashes(df_test, 'Country')
+    path_hashes = group_hashes(paths, 'Country', columns=['ds'] + config.REGRESSORS)
+    country_fingerprints = {
+        country: combine_hashes({
+            'shared': shared,
+            'model': selection[country],
+            'regressors': regressor_selection.get(country, config.REGRESSORS),
+            'train': train_hashes[country],
+            'test': test_hashes.get(country, no_rows),
+            'future_regressors': path_hashes.get(country, no_rows),
+            **({'panel': panel_hash} if selection[country] == 'pooled' else {}),
+        })
+        for country in countries
+    }
+
+    previous_countries = set()
+    if os.path.exists(RESULTS_FILE):
+        previous_countries = set(results_store.read_index()['Country'])
+    previous_fingerprints = state.get(name, {}).get('countries', {})
+
+    stale = [
+        country for country in countries
+        if force
+        or previous_fingerprints.get(country) != country_fingerprints[country]
+        or country not in previous_countries
+    ]
+    removed = sorted(previous_countries - set(countries))
+
+    if not stale and not removed:
+        print(f"[skip] {name}: all {len(countries)} countries up to date")
+        instrumentation.count('stage.skipped', stage=name)
+        return False
+
+    print(f"[run]  {name}: refitting {len(stale)} of {len(countries)} countries {stale}", flush=True)
+    with instrumentation.span(f'stage.{name}', countries=len(stale)), instrumentation.profiled(name):
+        new_results = {'forecasts': {}, 'metrics': {}, 'components': {}}
+        if stale:
+            new_results, _ = forecasting_model.run_forecasts(df_train, df_test, workers=workers, countries=stale)
+
+        # Only the refitted countries are rewritten; the index keeps the up-to-date ones, in the
+        # order of the training data, and drops the removed ones
+        results_store.write_results(new_results, countries=countries)
+    state[name] = {'countries': country_fingerprints}
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the forecasting pipeline, skipping the stages that are up to date.')
+    parser.add_argument('--force', action='store_true', help='Re-run every stage and refit every country.')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes used to fit countries in parallel.')
+    parser.add_argument(
+        '--countries',
+        help='Comma-separated countries/regions to forecast, or "all" (default: $AEO_COUNTRIES or config.py).'
+    )
+    parser.add_argument(
+        '--regressors',
+        help='Comma-separated regressor indicator codes, or "all" (default: $AEO_REGRESSORS or config.py).'
+    )
+    parser.add_argument(
+        '--profile', nargs='+', choices=list(instrumentation.PROFILERS) + ['all'],
+        help='Profile every stage that runs (default: $AEO_PROFILE, or no profiling).'
+    )
+    parser.add_argument('--no-trace', action='store_true', help=f'Do not record the timings of this run in {instrumentation.RUN_DIR}/.')
+    args = parser.parse_args()
+
+    # The selection is passed to the stage scripts through the environment, so it has to be
+    # set before config.py is imported here or in a stage.
+    if args.countries:
+        os.environ['AEO_COUNTRIES'] = args.countries
+    if args.regressors:
+        os.environ['AEO_REGRESSORS'] = args.regressors
+    if args.profile:
+        os.environ['AEO_PROFILE'] = ','.join(args.profile)
+    # The script stages that fit in parallel (feature_screening.py) read it from there too
+    os.environ['FORECAST_WORKERS'] = str(args.workers)
+    import config
+
+    # Every stage (and the worker processes it starts) records its timings in the trace of
+    # this run, through the environment
+    run = None if args.no_trace else instrumentation.start_run(force=args.force, workers=args.workers)
+
+    stages = build_stages(config)
+    state = load_state()
+    with instrumentation.span('pipeline'):
+        for name in topological_order(stages):
+            stage = stages[name]
+            os.environ['AEO_STAGE'] = name
+            if stage.get('per_country'):
+                run_forecasting_stage(name, stage, state, force=args.force, workers=args.workers)
+                # The forecasts of the countries that changed are recorded for the vintage
+                if state.get('data_loader', {}).get('vintage'):
+                    vintages.record_forecasts(state['data_loader']['vintage'])
+            elif stage.get('vintaged'):
+                run_ingest_stage(name, stage, stages, state, force=args.force)
+            else:
+                run_script_stage(name, stage, state, force=args.force)
+            # Save after every stage so that a failure does not discard the progress so far
+            save_state(state)
+        os.environ.pop('AEO_STAGE', None)
+
+    print("\nPipeline complete.")
+    if run is not None:
+        print(f"Timings saved to {instrumentation.run_path(run)} (summary: python instrumentation.py report)")
+
+
+if __name__ == '__main__':
+    main()
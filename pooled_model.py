@@ -0,0 +1,206 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from baseline_models import INTERVAL_Z
+from config import REGRESSORS
+from regions import country_region
+
+# A pooled model of the GDP growth of all countries, fitted at once.
+#
+# Every country has a linear model of its growth with an intercept, a linear trend and the
+# regressors (standardized per country):
+#
+#   y = a + b * (year - last training year) / 10 + sum of beta_j * x_j + noise
+#
+# Instead of fitting each country on its own ~35 points, the coefficients of a country get a
+# normal prior centered on the mean of its region (regions.py), and the region means are
+# themselves pulled towards the mean of all countries. A region with a single country has
+# nothing to pool, so that country's prior is centered on the mean of all countries. Short or volatile series then borrow
+# strength from their neighbors. The prior variances and the noise of every country are
+# estimated from the data (empirical Bayes), alternating with the coefficients, which are
+# solved for all countries in one batched linear solve per iteration.
+
+# Weight of the mean of all countries in a region mean, in countries
+REGION_PSEUDO_COUNT = 2.0
+
+# Lower bounds of the prior variances and of the noise variance. Without them, a prior
+# variance that goes to zero (all countries alike) is approached very slowly.
+MIN_PRIOR_VARIANCE = 1e-2
+MIN_NOISE_VARIANCE = 1e-2
+
+# The fit stops when no coefficient moves by more than TOLERANCE (percentage points)
+MAX_ITERATIONS = 500
+TOLERANCE = 1e-4
+
+# Names of the coefficients, in the order of the design matrix
+COEFFICIENTS = ['Intercept', 'Trend'] + REGRESSORS
+
+# The fitted model. `countries` is an Index, `regions` the region of each country, `coef`
+# and `cov` the posterior mean (country x coefficient) and covariance of the coefficients,
+# `noise_var` the noise variance per country, `prior_mean` (country x coefficient) and
+# `prior_var` (per coefficient) the fitted priors, `center`/`scale` the regressor
+# standardization and `anchor` the last training year per country.
+PooledFit = namedtuple('PooledFit', ['countries', 'regions', 'coef', 'cov', 'noise_var', 'prior_mean', 'prior_var', 'center', 'scale', 'anchor',
+                                     'iterations', 'seconds'])
+
+
+def _rows(df, columns):
+    """Drops the rows with a missing value in `columns`."""
+    return df.dropna(subset=columns)
+
+
+def design_matrix(fit, df):
+    """Returns `(codes, X)`: the country index of every row of `df` and its design matrix."""
+    codes = fit.countries.get_indexer(df['Country'])
+    if (codes < 0).any():
+        raise ValueError(f"Countries not in the pooled fit: {sorted(set(df['Country'][codes < 0]))}")
+    trend = (df['ds'].dt.year.to_numpy() - fit.anchor[codes]) / 10
+    regressors = (df[REGRESSORS].to_numpy(dtype=float) - fit.center[codes]) / fit.scale[codes]
+    return codes, np.column_stack([np.ones(len(df)), trend, regressors])
+
+
+def _country_sums(codes, values, n_countries):
+    """Sums the rows of `values` (rows x ...) per country."""
+    sums = np.zeros((n_countries,) + values.shape[1:])
+    np.add.at(sums, codes, values)
+    return sums
+
+
+def fit(df_train, regions=None):
+    """Fits the pooled model on the training rows of every country ('Country', 'ds', 'y' and
+    the regressors). `regions` maps countries to regions (regions.COUNTRY_REGIONS by default)."""
+    start_time = time.perf_counter()
+    df_train = _rows(df_train, ['y'] + REGRESSORS)
+    countries = pd.Index(df_train['Country'].unique())
+    country_regions = np.array([country_region(country, regions) for country in countries])
+    region_codes, region_names = pd.factorize(country_regions)
+
+    grouped = df_train.groupby('Country', sort=False)
+    center = grouped[REGRESSORS].mean().reindex(countries).to_numpy()
+    scale = grouped[REGRESSORS].std().reindex(countries).fillna(0.0).to_numpy()
+    scale = np.where(scale == 0, 1.0, scale)
+    anchor = grouped['ds'].max().reindex(countries).dt.year.to_numpy()
+    model = PooledFit(countries, country_regions, None, None, None, None, None, center, scale, anchor, 0, 0.0)
+
+    codes, X = design_matrix(model, df_train)
+    y = df_train['y'].to_numpy(dtype=float)
+    n_countries, n_coef = len(countries), X.shape[1]
+    gram = _country_sums(codes, X[:, :, None] * X[:, None, :], n_countries)
+    moment = _country_sums(codes, X * y[:, None], n_countries)
+    n_rows = np.bincount(codes, minlength=n_countries)
+
+    # Start from a common model of all countries, with wide priors
+    prior_mean = np.repeat(np.linalg.lstsq(X, y, rcond=None)[0][None, :], n_countries, axis=0)
+    prior_var = np.full(n_coef, 10.0)
+    coef = prior_mean
+    residuals = y - (X * coef[codes]).sum(axis=1)
+    noise_var = np.maximum(np.bincount(codes, residuals ** 2, n_countries) / n_rows, MIN_NOISE_VARIANCE)
+
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        # Posterior of the coefficients of every country, given the priors and noise
+        precision = gram / noise_var[:, None, None] + np.diag(1 / prior_var)
+        cov = np.linalg.inv(precision)
+        new_coef = np.einsum('cij,cj->ci', cov, moment / noise_var[:, None] + prior_mean / prior_var)
+
+        # Noise per country, from the expected squared residuals
+        residuals = y - (X * new_coef[codes]).sum(axis=1)
+        expected_rss = np.bincount(codes, residuals ** 2, n_countries) + np.einsum('cij,cji->c', gram, cov)
+        noise_var = np.maximum(expected_rss / n_rows, MIN_NOISE_VARIANCE)
+
+        # Region means, pulled towards the mean of all countries
+        overall_mean = new_coef.mean(axis=0)
+        region_sums = _country_sums(region_codes, new_coef, len(region_names))
+        region_counts = np.bincount(region_codes, minlength=len(region_names))[:, None]
+        region_means = (region_sums + REGION_PSEUDO_COUNT * overall_mean) / (region_counts + REGION_PSEUDO_COUNT)
+        region_means[region_counts[:, 0] == 1] = overall_mean
+        prior_mean = region_means[region_codes]
+
+        # Prior variances: the expected spread of the countries around their region mean
+        spread = (new_coef - prior_mean) ** 2 + np.diagonal(cov, axis1=1, axis2=2)
+        prior_var = np.maximum(spread.mean(axis=0), MIN_PRIOR_VARIANCE)
+
+        converged = np.abs(new_coef - coef).max() < TOLERANCE
+        coef = new_coef
+        if converged:
+            break
+
+    return model._replace(coef=coef, cov=cov, noise_var=noise_var, prior_mean=prior_mean, prior_var=prior_var, iterations=iteration,
+                          seconds=time.perf_counter() - start_time)
+
+
+def predict(model, df):
+    """Forecasts the rows of `df` ('Country', 'ds' and the regressors).
+
+    Returns 'Country', 'ds', 'yhat', 'yhat_lower', 'yhat_upper' (an 80% interval, like
+    Prophet's), the 'trend' (intercept and trend) and the effect of every regressor.
+    """
+    codes, X = design_matrix(model, df)
+    effects = X * model.coef[codes]
+    yhat = effects.sum(axis=1)
+    # Noise plus the uncertainty of the coefficients
+    std = np.sqrt(model.noise_var[codes] + np.einsum('ri,rij,rj->r', X, model.cov[codes], X))
+
+    forecast = pd.DataFrame({
+        'Country': df['Country'].to_numpy(),
+        'ds': df['ds'].to_numpy(),
+        'yhat': yhat,
+        'yhat_lower': yhat - INTERVAL_Z * std,
+        'yhat_upper': yhat + INTERVAL_Z * std,
+        'trend': effects[:, 0] + effects[:, 1],
+    })
+    for i, regressor in enumerate(REGRESSORS):
+        forecast[regressor] = effects[:, 2 + i]
+    return forecast
+
+
+def coefficients(model):
+    """Returns the coefficients of every country as a table, with its region."""
+    table = pd.DataFrame(model.coef, columns=COEFFICIENTS)
+    table.insert(0, 'Country', model.countries)
+    table.insert(1, 'Region', model.regions)
+    return table
+
+
+def regressor_effects(model, country):
+    """Returns the change of a country's forecast per unit of each regressor."""
+    i = model.countries.get_loc(country)
+    return model.coef[i, 2:] / model.scale[i]
+
+
+def backtest_pooled(df, cutoffs, horizon, window=None, regions=None):
+    """Forecasts the pooled model on the same rolling-origin folds as backtest.py (one fit of
+    all countries per cutoff). Like the Prophet folds, the test years use the actual regressors.
+
+    Returns the forecasts of the test rows of every cutoff, in the format of
+    metrics.fold_predictions().
+    """
+    years = df['ds'].dt.year
+    rows = []
+    for cutoff in cutoffs:
+        train_mask = years <= cutoff
+        if window is not None:
+            train_mask &= years > cutoff - window
+        df_train = _rows(df[train_mask], ['y'] + REGRESSORS)
+        df_test = _rows(df[(years > cutoff) & (years <= cutoff + horizon)], ['y'] + REGRESSORS)
+
+        # Same fold rules as the Prophet backtest: at least 3 training years and a test period
+        train_sizes = df_train['Country'].value_counts()
+        eligible = train_sizes.index[train_sizes >= 3].intersection(df_test['Country'].unique())
+        df_train = df_train[df_train['Country'].isin(eligible)]
+        df_test = df_test[df_test['Country'].isin(eligible)]
+        if df_test.empty:
+            continue
+
+        model = fit(df_train, regions)
+        y_pred = predict(model, df_test)['yhat'].to_numpy()
+        rows.append(metrics.fold_predictions(
+            'pooled', cutoff, df_test, y_pred, train_sizes, metrics.naive_scale(df_train), model.seconds / len(model.countries)
+        ))
+
+    if not rows:
+        return pd.DataFrame()
+    return pd.concat(rows, ignore_index=True)
@@ -0,0 +1,77 @@
+# Regions of the African Development Bank, as used for the regional aggregates of the
+# African Economic Outlook ('Central Africa', 'East Africa', ...). The source file has no
+# region column for the countries (RegionId holds their ISO2 code), so the mapping is static.
+COUNTRY_REGIONS = {
+    # Central Africa
+    'Cameroon': 'Central Africa',
+    'Central African Republic': 'Central Africa',
+    'Chad': 'Central Africa',
+    'Congo, Dem. Rep.': 'Central Africa',
+    'Congo, Rep.': 'Central Africa',
+    'Equatorial Guinea': 'Central Africa',
+    'Gabon': 'Central Africa',
+    'Sao Tome and Principe': 'Central Africa',
+    # East Africa
+    'Burundi': 'East Africa',
+    'Comoros': 'East Africa',
+    'Djibouti': 'East Africa',
+    'Eritrea': 'East Africa',
+    'Ethiopia': 'East Africa',
+    'Kenya': 'East Africa',
+    'Rwanda': 'East Africa',
+    'Seychelles': 'East Africa',
+    'Somalia': 'East Africa',
+    'South Sudan': 'East Africa',
+    'Sudan': 'East Africa',
+    'Tanzania': 'East Africa',
+    'Uganda': 'East Africa',
+    # North Africa
+    'Algeria': 'North Africa',
+    'Egypt': 'North Africa',
+    'Libya': 'North Africa',
+    'Mauritania': 'North Africa',
+    'Morocco': 'North Africa',
+    'Tunisia': 'North Africa',
+    # Southern Africa
+    'Angola': 'Southern Africa',
+    'Botswana': 'Southern Africa',
+    'eSwatini': 'Southern Africa',
+    'Lesotho': 'Southern Africa',
+    'Madagascar': 'Southern Africa',
+    'Malawi': 'Southern Africa',
+    'Mauritius': 'Southern Africa',
+    'Mozambique': 'Southern Africa',
+    'Namibia': 'Southern Africa',
+    'South Africa': 'Southern Africa',
+    'Zambia': 'Southern Africa',
+    'Zimbabwe': 'Southern Africa',
+    # West Africa
+    'Benin': 'West Africa',
+    'Burkina Faso': 'West Africa',
+    'Cabo Verde': 'West Africa',
+    "Cote d'Ivoire": 'West Africa',
+    'Gambia': 'West Africa',
+    'Ghana': 'West Africa',
+    'Guinea': 'West Africa',
+    'Guinea-Bissau': 'West Africa',
+    'Liberia': 'West Africa',
+    'Mali': 'West Africa',
+    'Niger': 'West Africa',
+    'Nigeria': 'West Africa',
+    'Senegal': 'West Africa',
+    'Sierra Leone': 'West Africa',
+    'Togo': 'West Africa',
+}
+
+REGIONS = sorted(set(COUNTRY_REGIONS.values()))
+
+# Rows of the source file that aggregate several countries rather than being one
+AGGREGATES = ['Africa', 'Sub-Saharan Africa'] + REGIONS
+
+# Region of the countries missing from COUNTRY_REGIONS
+OTHER_REGION = 'Other'
+
+
+def country_region(country, regions=None):
+    """Returns the region of `country`, OTHER_REGION if it is not mapped."""
+    return (COUNTRY_REGIONS if regions is None else regions).get(country, OTHER_REGION)
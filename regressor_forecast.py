@@ -0,0 +1,244 @@
+import argparse
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from artifact_store import artifact_exists, artifact_path, read_artifact, write_artifact
+from baseline_models import series_matrix
+from config import REGRESSORS, FORECAST_YEARS, REGRESSOR_MODEL
+from fingerprint import combine_hashes
+from instrumentation import count, span
+
+# Forecasts of the regressors of every country over the forecast period, which the GDP
+# growth forecasts are predicted with (Prophet and the pooled model need the future values
+# of their regressors).
+#
+# Like the baselines of baseline_models.py, the models are fitted for all countries at
+# once on the stacked (country x year x regressor) history of the split data (training and
+# test years), each series standardized:
+#
+#   'var'   z_t = c + z_{t-1} B, the regressors of a country forecast jointly; the
+#           coefficients of all countries come from one batched least squares solve
+#   'ar'    z_t = c + phi z_{t-1} for every regressor on its own, in closed form
+#   'last'  the last value carried forward (the behaviour before this module)
+#
+# A country whose VAR is not stable (a spectral radius of B above MAX_RADIUS, i.e. a
+# forecast that would trend away or oscillate with growing amplitude) or that has too few
+# years for it uses the AR model, with phi clipped to MAX_RADIUS; a series with fewer than
+# three usable years keeps its last value. The multi-step forecasts iterate the fitted model
+# from the last year of each country.
+#
+# The paths are cached in the regressor_forecasts artifact, with a key per country (a hash
+# of its history and of the settings), so the countries whose history did not change reuse
+# their paths on the next run and only the others are forecast.
+
+REGRESSOR_ARTIFACT = 'regressor_forecasts'
+# Significant digits of the CSV export: the last digits of the fits vary from run to run,
+# and the export is tracked with the other outputs
+CSV_FLOAT_FORMAT = '%.10g'
+REGRESSOR_MODELS = ['var', 'ar', 'last']
+
+# Largest spectral radius of a fitted model (see above)
+MAX_RADIUS = 0.95
+
+
+def history_frame(df_train, df_test, regressors=REGRESSORS):
+    """Returns the regressor history of every country in the split data ('Country', 'ds' and
+    the regressors, by date), with missing values after the first observation forward-filled."""
+    history = pd.concat([df_train, df_test], ignore_index=True)[['Country', 'ds'] + list(regressors)]
+    history = history.sort_values('ds', kind='stable')
+    filled = history.groupby('Country', sort=False)[list(regressors)].ffill()
+    return history.assign(**{regressor: filled[regressor] for regressor in regressors})
+
+
+def standardize(values, lengths):
+    """Returns `(z, mean, std)` of the (country x year x regressor) `values`, standardized per
+    series over the years within its length (a constant series gets a std of 1)."""
+    within = np.arange(values.shape[1])[None, :, None] < lengths[:, None, None]
+    valid = within & np.isfinite(values)
+    n = np.maximum(valid.sum(axis=1), 1)
+    mean = np.where(valid, values, 0.0).sum(axis=1) / n
+    std = np.sqrt(np.where(valid, (values - mean[:, None]) ** 2, 0.0).sum(axis=1) / n)
+    std = np.where(std > 0, std, 1.0)
+    return (values - mean[:, None]) / std[:, None], mean, std
+
+
+def _pairs(z, lengths):
+    """Returns the (country x sample x regressor) lagged and target values and the mask of
+    the samples (consecutive years within the length, with every value known)."""
+    lag, target = z[:, :-1], z[:, 1:]
+    valid = np.arange(1, z.shape[1])[None, :] < lengths[:, None]
+    valid = valid[..., None] & np.isfinite(lag) & np.isfinite(target)
+    return np.where(valid, lag, 0.0), np.where(valid, target, 0.0), valid
+
+
+def fit_ar(z, lengths, max_radius=MAX_RADIUS):
+    """Fits z_t = c + phi z_{t-1} to every (country, regressor) series. Returns `(c, phi, n)`,
+    (country x regressor) arrays, with phi clipped to [-max_radius, max_radius]."""
+    lag, target, valid = _pairs(z, lengths)
+    n = valid.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lag_mean = lag.sum(axis=1) / n
+        target_mean = target.sum(axis=1) / n
+        cross = (lag * target).sum(axis=1) - n * lag_mean * target_mean
+        spread = (lag ** 2).sum(axis=1) - n * lag_mean ** 2
+        phi = np.clip(np.nan_to_num(cross / spread), -max_radius, max_radius)
+    return np.nan_to_num(target_mean - phi * lag_mean), phi, n
+
+
+def fit_var(z, lengths):
+    """Fits z_t = c + z_{t-1} B to the regressors of every country, by least squares in one
+    batched solve. Returns `(c, B, n)`: (country x regressor), (country x regressor x regressor)
+    and the sample count of every country."""
+    lag, target, valid = _pairs(z, lengths)
+    complete = valid.all(axis=-1)
+    design = np.concatenate([np.ones_like(lag[..., :1]), lag], axis=-1) * complete[..., None]
+    target = target * complete[..., None]
+
+    # A tiny ridge term keeps the normal equations solvable for constant series
+    gram = np.einsum('csi,csj->cij', design, design) + 1e-8 * np.eye(design.shape[-1])
+    coef = np.linalg.solve(gram, np.einsum('csi,csj->cij', design, target))
+    return coef[:, 0], coef[:, 1:], complete.sum(axis=1)
+
+
+def forecast_paths(values, lengths, horizon, model=REGRESSOR_MODEL, max_radius=MAX_RADIUS):
+    """Forecasts the (country x year x regressor) `values` (left-aligned, see
+    baseline_models.series_matrix) `horizon` years past the end of every country.
+
+    Returns the (country x horizon x regressor) forecasts and the model used per country.
+    """
+    if model not in REGRESSOR_MODELS:
+        raise ValueError(f"Unknown regressor model {model!r} (expected one of {REGRESSOR_MODELS})")
+    n_countries, _, n_regressors = values.shape
+    z, mean, std = standardize(values, lengths)
+    last = z[np.arange(n_countries), lengths - 1]
+
+    intercept, phi, n = fit_ar(z, lengths, max_radius)
+    slope = phi[:, :, None] * np.eye(n_regressors)
+    used = np.full(n_countries, 'ar', dtype=object)
+
+    if model == 'var':
+        var_intercept, var_slope, var_n = fit_var(z, lengths)
+        radius = np.abs(np.linalg.eigvals(var_slope)).max(axis=-1, initial=0.0)
+        stable = (var_n >= n_regressors + 3) & (radius <= max_radius)
+        intercept[stable], slope[stable], used[stable] = var_intercept[stable], var_slope[stable], 'var'
+
+    # Series too short for a fit (or the 'last' model) keep their last value
+    keep_last = np.full((n_countries, n_regressors), model == 'last') | (n < 3)
+    intercept = np.where(keep_last, 0.0, intercept)
+    slope = np.where(keep_last[:, None, :], np.eye(n_regressors), slope)
+    used[keep_last.all(axis=1)] = 'last'
+
+    forecast = np.empty((n_countries, horizon, n_regressors))
+    level = last
+    for h in range(horizon):
+        level = intercept + np.einsum('ci,cij->cj', level, slope)
+        forecast[:, h] = level
+    return forecast * std[:, None] + mean[:, None], used
+
+
+def forecast_regressors(history, model=REGRESSOR_MODEL, years=FORECAST_YEARS, regressors=REGRESSORS):
+    """Forecasts the regressors of every country of a history frame (see history_frame())
+    over `years`. Returns a long frame: 'Country', 'ds', the regressors and 'Model'."""
+    columns = [series_matrix(history, regressor) for regressor in regressors]
+    countries, _, lengths, last_years = columns[0]
+    values = np.stack([matrix for _, matrix, _, _ in columns], axis=-1)
+
+    horizon = max(max(years) - int(last_years.min()), 1)
+    paths, used = forecast_paths(values, lengths, horizon, model)
+
+    path_years = last_years[:, None] + 1 + np.arange(horizon)
+    keep = np.isin(path_years, list(years))
+    rows = np.nonzero(keep)[0]
+    return pd.DataFrame({
+        'Country': np.asarray(countries, dtype=object)[rows],
+        'ds': pd.to_datetime(path_years[keep].astype(str), format='%Y'),
+        **{regressor: paths[..., i][keep] for i, regressor in enumerate(regressors)},
+        'Model': used[rows],
+    })
+
+
+def country_keys(history, model=REGRESSOR_MODEL):
+    """Returns the cache key of every country of a history frame: a hash of the settings and
+    of its rows (their hashes, as fingerprint.frame_hash() computes them, are computed at once)."""
+    settings = combine_hashes({'model': model, 'years': list(FORECAST_YEARS), 'max_radius': MAX_RADIUS, 'regressors': REGRESSORS})
+    row_hashes = pd.util.hash_pandas_object(history, index=False).to_numpy()
+    return {
+        country: hashlib.sha256(settings.encode('utf-8') + row_hashes[rows].tobytes()).hexdigest()
+        for country, rows in history.groupby('Country', sort=False).indices.items()
+    }
+
+
+def load_paths(df_train, df_test, model=REGRESSOR_MODEL, use_cache=True, update=True):
+    """Returns the regressor forecasts of every country of the split data (see
+    forecast_regressors()), in the order of the countries.
+
+    With `use_cache`, the paths of the countries whose history is unchanged are read from the
+    regressor_forecasts artifact, and only the others are forecast; with `update`, the
+    artifact is then rewritten with them (keeping the cached paths of other countries).
+    """
+    history = history_frame(df_train, df_test)
+    keys = country_keys(history, model)
+
+    cached = pd.DataFrame(columns=['Country', 'Key'])
+    if use_cache and artifact_exists(REGRESSOR_ARTIFACT):
+        cached = read_artifact(REGRESSOR_ARTIFACT)
+        if not {'Country', 'Key', *REGRESSORS} <= set(cached.columns):
+            cached = pd.DataFrame(columns=['Country', 'Key'])
+    fresh = cached[cached['Key'] == cached['Country'].map(keys)]
+    fresh_countries = set(fresh['Country'])
+    stale = [country for country in keys if country not in fresh_countries]
+
+    count('regressor_forecast.hit', value=len(keys) - len(stale))
+    count('regressor_forecast.miss', value=len(stale))
+    if stale:
+        with span('regressor_forecast.fit', model=model, countries=len(stale)):
+            new = forecast_regressors(history[history['Country'].isin(stale)], model)
+        new = new.assign(Key=new['Country'].map(keys))
+        fresh = pd.concat([fresh, new], ignore_index=True)
+        if use_cache and update:
+            write_artifact(
+                pd.concat([cached[~cached['Country'].isin(keys)], fresh], ignore_index=True), REGRESSOR_ARTIFACT,
+                float_format=CSV_FLOAT_FORMAT
+            )
+
+    order = {country: i for i, country in enumerate(keys)}
+    fresh = fresh.assign(ds=pd.to_datetime(fresh['ds']), order=fresh['Country'].map(order))
+    return fresh.sort_values(['order', 'ds']).drop(columns='order').reset_index(drop=True)
+
+
+def country_paths(paths, country, regressors=REGRESSORS):
+    """Returns the 'ds' and regressor columns of the forecasts of one country."""
+    return paths[paths['Country'] == country][['ds'] + list(regressors)].reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Forecast the regressors of every country over the forecast period.')
+    parser.add_argument(
+        '--model', default=REGRESSOR_MODEL, choices=REGRESSOR_MODELS,
+        help=f"Regressor model (default: {REGRESSOR_MODEL}, or $AEO_REGRESSOR_MODEL)."
+    )
+    parser.add_argument('--no-cache', action='store_true', help='Forecast every country instead of reusing the cached paths.')
+    args = parser.parse_args()
+
+    df_train = read_artifact('train_data')
+    df_test = read_artifact('test_data')
+
+    start_time = time.perf_counter()
+    paths = load_paths(df_train, df_test, args.model, use_cache=not args.no_cache)
+    seconds = time.perf_counter() - start_time
+    # (With every path cached in the CSV export only, the Parquet artifact is written too)
+    if args.no_cache or not os.path.exists(artifact_path(REGRESSOR_ARTIFACT)):
+        write_artifact(paths, REGRESSOR_ARTIFACT, float_format=CSV_FLOAT_FORMAT)
+
+    print(f"--- Regressor Forecasts ({min(FORECAST_YEARS)}-{max(FORECAST_YEARS)}) ---")
+    report = paths.assign(Year=paths['ds'].dt.year).drop(columns=['ds', 'Key'])
+    print(report[['Country', 'Year', 'Model'] + REGRESSORS].to_markdown(index=False, floatfmt='.2f'))
+    print(f"\n{paths['Country'].nunique()} countries in {seconds * 1000:.1f} ms; the paths are in the {REGRESSOR_ARTIFACT} artifact")
+
+
+if __name__ == '__main__':
+    main()
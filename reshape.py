@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+# Wide-to-long reshaping shared by data_prep.py and feature_split.py (through the compact
+# panel of compact.py, whose series rows go through rows_to_cube()).
+#
+# The AEO table is wide: one row per (country, indicator) and one column per year. Instead
+# of melting it to a long frame and interpolating each country with groupby().apply(), the
+# whole table is turned into a dense (country x indicator x year) NumPy cube in one pass and
+# the missing years are interpolated for every series at once along the year axis.
+
+COUNTRY_COL = 'Country and Regions Name'
+INDICATOR_COL = 'Indicators Name'
+
+
+def year_columns(df):
+    """Returns the year columns of a wide AEO table (the 4-digit column names)."""
+    return [col for col in df.columns if str(col).isdigit() and len(str(col)) == 4]
+
+
+def wide_to_cube(df, countries=None, indicators=None, country_col=COUNTRY_COL, indicator_col=INDICATOR_COL):
+    """Turns a wide AEO table into a (country x indicator x year) cube.
+
+    Returns `(cube, countries, indicators, years)`. `countries` and `indicators` default to
+    the sorted values present in `df`; rows for other countries or indicators are ignored,
+    and combinations without a row are all-NaN. Duplicate (country, indicator) rows are
+    averaged like `pivot_table` does.
+    """
+    year_cols = year_columns(df)
+    years = np.array([int(col) for col in year_cols])
+    return rows_to_cube(df[country_col], df[indicator_col], lambda keep: df.loc[keep, year_cols].to_numpy(dtype=float),
+                        years, countries, indicators)
+
+
+def rows_to_cube(row_countries, row_indicators, row_values, years, countries=None, indicators=None):
+    """Scatters series rows (one row of yearly values per country and indicator) into a
+    (country x indicator x year) cube; see wide_to_cube(). `row_values(keep)` returns the
+    values of the rows selected by the boolean mask `keep`, as a (row x year) array."""
+    if countries is None:
+        countries = sorted(pd.Series(row_countries).dropna().unique())
+    if indicators is None:
+        indicators = sorted(pd.Series(row_indicators).dropna().unique())
+
+    country_codes = pd.Categorical(row_countries, categories=countries).codes
+    indicator_codes = pd.Categorical(row_indicators, categories=indicators).codes
+    keep = (country_codes >= 0) & (indicator_codes >= 0)
+
+    values = row_values(keep)
+    flat_index = country_codes[keep].astype(np.int64) * len(indicators) + indicator_codes[keep]
+    n_series = len(countries) * len(indicators)
+
+    if len(np.unique(flat_index)) == len(flat_index):
+        # One row per series: scatter the rows straight into the cube
+        cube = np.full((n_series, len(years)), np.nan)
+        cube[flat_index] = values
+    else:
+        # Average duplicate rows, ignoring missing values
+        observed = ~np.isnan(values)
+        sums = np.zeros((n_series, len(years)))
+        counts = np.zeros((n_series, len(years)))
+        np.add.at(sums, flat_index, np.where(observed, values, 0.0))
+        np.add.at(counts, flat_index, observed)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cube = np.where(counts > 0, sums / counts, np.nan)
+
+    return cube.reshape(len(countries), len(indicators), len(years)), list(countries), list(indicators), years
+
+
+def interpolate_cube(cube):
+    """Linearly interpolates the missing values of every series along the last (year) axis.
+
+    Matches `Series.interpolate(method='linear')` on each series: gaps between two observed
+    values are filled on the straight line between them, missing values after the last
+    observation take the last observed value, and missing values before the first
+    observation stay NaN.
+    """
+    cube = np.asarray(cube, dtype=float)
+    n_years = cube.shape[-1]
+    observed = ~np.isnan(cube)
+    positions = np.broadcast_to(np.arange(n_years), cube.shape)
+
+    # Position of the previous and next observed value of every cell
+    prev_pos = np.maximum.accumulate(np.where(observed, positions, -1), axis=-1)
+    next_pos = np.flip(
+        np.minimum.accumulate(np.flip(np.where(observed, positions, n_years), axis=-1), axis=-1),
+        axis=-1
+    )
+
+    prev_val = np.take_along_axis(cube, np.clip(prev_pos, 0, n_years - 1), axis=-1)
+    next_val = np.take_along_axis(cube, np.clip(next_pos, 0, n_years - 1), axis=-1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (next_val - prev_val) / (next_pos - prev_pos)
+        interpolated = slope * (positions - prev_pos) + prev_val
+
+    result = np.where(next_pos < n_years, interpolated, prev_val)
+    result = np.where(prev_pos < 0, np.nan, result)
+    return np.where(observed, cube, result)
+
+
+def cube_to_long(cube, countries, years, value_name='y'):
+    """Turns a (country x year) slice of a cube into a long frame with 'ds', 'Country' and
+    `value_name` columns, sorted by country and year."""
+    n_countries, n_years = cube.shape
+    return pd.DataFrame({
+        'ds': pd.to_datetime(np.tile(years, n_countries).astype(str), format='%Y'),
+        'Country': np.repeat(np.asarray(countries, dtype=object), n_years),
+        value_name: cube.reshape(-1),
+    })
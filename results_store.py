@@ -0,0 +1,215 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from fingerprint import frame_hash
+
+# Forecasting results, partitioned by country.
+#
+# forecasting_model.py writes the forecasts and the components of every country to their own
+# Parquet files, and an index with one row per country (its metrics, model and files):
+#
+#   forecast_results/index.parquet
+#   forecast_results/forecasts/<country>.parquet
+#   forecast_results/components/<country>.parquet
+#   forecast_results/comparison.parquet
+#
+# The dashboard reads the index on start and the files of a country only when it is
+# selected. comparison.parquet holds the actual GDP growth of all countries ('Country',
+# 'ds', 'y'), precomputed for the dashboard's cross-country chart. The results can still be exported as one strict JSON file (no NaN literals) in
+# the former forecasting_results.json layout; if only that file exists (e.g. a checkout that
+# predates this store), it is read instead.
+RESULTS_DIR = 'forecast_results'
+
+# The former results file, now only written by export_json()
+JSON_EXPORT_FILE = 'forecasting_results.json'
+
+PARTS = ('forecasts', 'components')
+
+# Rows of the forecasts holding the actual values
+HISTORY_TYPES = ['Historical (Train)', 'Historical (Test)']
+
+
+def _country_slug(country):
+    return re.sub(r'[^A-Za-z0-9]+', '_', country).strip('_')
+
+
+def index_path(base_dir='.'):
+    return os.path.join(base_dir, RESULTS_DIR, 'index.parquet')
+
+
+def comparison_path(base_dir='.'):
+    return os.path.join(base_dir, RESULTS_DIR, 'comparison.parquet')
+
+
+def partition_path(part, country, base_dir='.'):
+    """Returns the Parquet file of the `part` ('forecasts' or 'components') of `country`."""
+    return os.path.join(base_dir, RESULTS_DIR, part, f'{_country_slug(country)}.parquet')
+
+
+def _records_to_frame(records):
+    df = pd.DataFrame(records).drop(columns='Country', errors='ignore')
+    df['ds'] = pd.to_datetime(df['ds'])
+    if 'type' in df.columns:
+        df['type'] = df['type'].astype('category')
+    return df
+
+
+def _history(forecasts, country):
+    """Returns the actual values ('Country', 'ds', 'y') of a country's forecast frame."""
+    history = forecasts.loc[forecasts['type'].isin(HISTORY_TYPES), ['ds', 'y']]
+    return history.assign(Country=country)[['Country', 'ds', 'y']]
+
+
+def _frame_to_records(df):
+    df = df.copy()
+    df['ds'] = df['ds'].dt.strftime('%Y-%m-%d')
+    if 'type' in df.columns:
+        df['type'] = df['type'].astype(str)
+    return df.to_dict(orient='records')
+
+
+def write_results(results, base_dir='.', countries=None):
+    """Writes the results of run_forecasts() (forecasts, metrics and components per country).
+
+    Only the countries in `results` are (re)written. `countries` is the complete, ordered list
+    of countries the index should have afterwards: the countries of the previous index that
+    are not in `results` are kept, and those not in `countries` are removed. By default the
+    index holds exactly the countries of `results`.
+    """
+    if countries is None:
+        countries = list(results['forecasts'])
+    results_dir = os.path.join(base_dir, RESULTS_DIR)
+    for part in PARTS:
+        os.makedirs(os.path.join(results_dir, part), exist_ok=True)
+
+    rows = {}
+    histories = {}
+    if os.path.exists(index_path(base_dir)):
+        previous = pd.read_parquet(index_path(base_dir))
+        rows = {row['Country']: row for row in previous.to_dict(orient='records')}
+    if os.path.exists(comparison_path(base_dir)):
+        histories = dict(tuple(pd.read_parquet(comparison_path(base_dir)).groupby('Country', sort=False)))
+
+    for country in results['forecasts']:
+        row = {'Country': country, **results['metrics'][country]}
+        hashes = []
+        for part in PARTS:
+            df = _records_to_frame(results[part][country])
+            path = partition_path(part, country, base_dir)
+            df.to_parquet(path, index=False)
+            row[part] = os.path.relpath(path, results_dir)
+            hashes.append(frame_hash(df))
+            if part == 'forecasts':
+                histories[country] = _history(df, country)
+        # Changes whenever one of the country's files changes, so that fingerprinting the
+        # index (pipeline.py) is enough to detect new results
+        row['content_hash'] = frame_hash(pd.DataFrame({'hash': hashes}))
+        rows[country] = row
+
+    # Remove the files of the countries that are no longer forecast
+    kept = set(countries)
+    for country, row in rows.items():
+        if country not in kept:
+            for part in PARTS:
+                path = os.path.join(results_dir, row[part])
+                if os.path.exists(path):
+                    os.remove(path)
+
+    # The comparison dataset follows the order of the index. Countries kept from a store
+    # written without it are read from their files.
+    for country in countries:
+        if country not in histories:
+            histories[country] = _history(pd.read_parquet(partition_path('forecasts', country, base_dir)), country)
+    comparison = [histories[country] for country in countries]
+    if comparison:
+        pd.concat(comparison, ignore_index=True).to_parquet(comparison_path(base_dir), index=False)
+    elif os.path.exists(comparison_path(base_dir)):
+        os.remove(comparison_path(base_dir))
+
+    index = pd.DataFrame([rows[country] for country in countries])
+    index.to_parquet(index_path(base_dir), index=False)
+    return index
+
+
+def _read_json_export(base_dir='.'):
+    with open(os.path.join(base_dir, JSON_EXPORT_FILE), 'r') as f:
+        return json.load(f)
+
+
+def read_index(base_dir='.'):
+    """Returns the index: one row per country with its metrics, model and partition files."""
+    if os.path.exists(index_path(base_dir)):
+        return pd.read_parquet(index_path(base_dir))
+
+    results = _read_json_export(base_dir)
+    index = pd.DataFrame.from_dict(results['metrics'], orient='index')
+    index.index.name = 'Country'
+    return index.reset_index()
+
+
+def read_country(country, part='forecasts', base_dir='.'):
+    """Returns the `part` ('forecasts' or 'components') of one country as a DataFrame, with
+    'ds' as datetime."""
+    if os.path.exists(index_path(base_dir)):
+        df = pd.read_parquet(partition_path(part, country, base_dir))
+    else:
+        results = _read_json_export(base_dir)
+        df = _records_to_frame(results[part][country])
+    if part == 'forecasts':
+        df['Country'] = country
+    return df
+
+
+def read_comparison(base_dir='.'):
+    """Returns the actual GDP growth of all countries, as 'Country', 'ds' and 'y' columns."""
+    if os.path.exists(index_path(base_dir)):
+        return pd.read_parquet(comparison_path(base_dir))
+
+    results = _read_json_export(base_dir)
+    histories = [_history(_records_to_frame(results['forecasts'][country]), country) for country in results['forecasts']]
+    return pd.concat(histories, ignore_index=True)
+
+
+def load_results(base_dir='.'):
+    """Loads the results of every country in the structure returned by run_forecasts()."""
+    index = read_index(base_dir)
+    metric_cols = [col for col in index.columns if col not in ('Country', 'content_hash') + PARTS]
+    results = {'forecasts': {}, 'metrics': {}, 'components': {}}
+    for row in index.to_dict(orient='records'):
+        country = row['Country']
+        results['metrics'][country] = {col: row[col] for col in metric_cols}
+        for part in PARTS:
+            results[part][country] = _frame_to_records(read_country(country, part, base_dir))
+    return results
+
+
+def _strict(value):
+    """Replaces the NaN floats of a JSON-like structure with None (null)."""
+    if isinstance(value, dict):
+        return {key: _strict(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_strict(item) for item in value]
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def export_json(path=JSON_EXPORT_FILE, base_dir='.'):
+    """Exports the results as one strict JSON file (missing values as null) and returns the path."""
+    results = _strict(load_results(base_dir))
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=4, allow_nan=False)
+    return path
+
+
+if __name__ == '__main__':
+    import sys
+
+    # Usage: python results_store.py [<path>]  (default: forecasting_results.json)
+    print(f"Exported the forecasting results to {export_json(*sys.argv[1:2])}")
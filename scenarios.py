@@ -0,0 +1,209 @@
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from artifact_store import read_artifact
+from config import REGRESSORS
+import intervals
+import results_store
+
+# What-if forecasts for paths of the regressors over the forecast period (2021-2025).
+#
+# forecasting_model.py predicts with the regressor forecasts of regressor_forecast.py, and
+# predicting any other path with Prophet means building a frame and calling `model.predict` for it. But the
+# regressors enter a Prophet forecast linearly: an additive regressor adds
+# `coef * (x - center)` to yhat, a multiplicative one `trend * coef * (x - center)`, and
+# the rest of the forecast does not depend on them. So every country is predicted once,
+# with the regressors at their centers, and the forecast of a scenario is
+#
+#   yhat = base + sum over regressors of (x - center) * effect
+#
+# which is evaluated for thousands of scenarios (a (scenario x year x regressor) array of
+# paths) in one einsum. The pooled model (pooled_model.py) is linear in the regressors too.
+# The baseline models are univariate, so their forecast is the same for every scenario.
+
+# Quantiles of the scenario forecasts reported per year
+SCENARIO_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# Everything needed to evaluate scenarios for one country. `ds` has the forecast dates,
+# `base` the forecast with the regressors at `center`, `effect` the change of the forecast
+# per unit of each regressor (year x regressor), `reference` the regressor forecasts the
+# stored forecast was predicted with (year x regressor; a scenario shifts the regressors
+# from them), `lower`/`upper` the offsets of the model's interval from its forecast, and
+# `step_cov` the covariance of the year-over-year changes of the regressors.
+ScenarioBase = namedtuple('ScenarioBase', ['country', 'model', 'ds', 'base', 'effect', 'center', 'reference', 'lower', 'upper', 'step_cov'])
+
+
+def regressor_history(df_country):
+    """Returns the last values of the regressors (TEST_END_YEAR in the split data) and the
+    covariance of the year-over-year changes of the regressors of one country."""
+    history = df_country.sort_values('ds')[REGRESSORS].ffill().dropna()
+    reference = history.iloc[-1].to_numpy(dtype=float)
+    steps = history.diff().dropna().to_numpy(dtype=float)
+    if len(steps) < 2:
+        return reference, np.zeros((len(REGRESSORS), len(REGRESSORS)))
+    return reference, np.cov(steps, rowvar=False).reshape(len(REGRESSORS), len(REGRESSORS))
+
+
+def prophet_base(model, ds):
+    """Returns `(base, effect, center, lower, upper)` of a fitted Prophet model at the dates `ds`.
+
+    The regressors the model does not use (see feature_screening.py) have no effect.
+    """
+    from prophet.utilities import regressor_coefficients
+
+    coefficients = pd.DataFrame(columns=['regressor', 'regressor_mode', 'center', 'coef'])
+    if model.extra_regressors:
+        coefficients = regressor_coefficients(model)
+    coefficients = coefficients.set_index('regressor').reindex(REGRESSORS).fillna({'regressor_mode': 'additive', 'center': 0.0, 'coef': 0.0})
+    center = coefficients['center'].to_numpy(dtype=float)
+
+    future = ds.to_frame()
+    for regressor, value in zip(REGRESSORS, center):
+        future[regressor] = value
+    forecast = intervals.predict(model, future)
+
+    # Multiplicative regressors scale with the trend
+    multiplicative = (coefficients['regressor_mode'] == 'multiplicative').to_numpy()
+    trend = forecast['trend'].to_numpy()[:, None]
+    effect = coefficients['coef'].to_numpy(dtype=float) * np.where(multiplicative, trend, 1.0)
+
+    base = forecast['yhat'].to_numpy()
+    return base, effect, center, forecast['yhat_lower'].to_numpy() - base, forecast['yhat_upper'].to_numpy() - base
+
+
+def prepare_country(country, df_train, df_test, model='prophet', use_cache=True, base_dir='.'):
+    """Prepares the scenario evaluation of one country.
+
+    For Prophet, the country's model is taken from the model cache (the one forecasting_model.py
+    fitted on the same training data), or fitted and cached if it is not there. For a
+    baseline or pooled model, the stored forecast of the country is used, and the pooled
+    model is refitted on the training data of all countries for its regressor effects.
+    """
+    from forecasting_model import future_dates
+
+    import regressor_forecast
+
+    df_country = pd.concat([df_train, df_test], ignore_index=True)
+    _, step_cov = regressor_history(df_country)
+    ds = future_dates()
+    paths = regressor_forecast.load_paths(df_train, df_test, update=False)
+    reference = regressor_forecast.country_paths(paths, country).set_index('ds').reindex(ds)[REGRESSORS].to_numpy(dtype=float)
+
+    if model == 'prophet':
+        import model_cache
+        from feature_screening import country_regressors
+        from forecasting_model import fit_model, model_config
+
+        regressors = country_regressors(country)
+        training_frame = df_train[['ds', 'y'] + regressors]
+        if use_cache:
+            fitted, _, _ = model_cache.get_or_fit(
+                country, training_frame, model_config(regressors), lambda: fit_model(training_frame, regressors)
+            )
+        else:
+            fitted = fit_model(training_frame, regressors)
+        base, effect, center, lower, upper = prophet_base(fitted, ds)
+    else:
+        forecast = results_store.read_country(country, 'forecasts', base_dir)
+        forecast = forecast[forecast['type'] == 'Forecast (Future)'].set_index('ds').reindex(ds)
+        base = forecast['y'].to_numpy(dtype=float)
+        effect = np.zeros((len(ds), len(REGRESSORS)))
+        center = reference
+        if model == 'pooled':
+            import pooled_model
+
+            fitted = pooled_model.fit(read_artifact('train_data'))
+            effect[:] = pooled_model.regressor_effects(fitted, country)
+        lower = forecast['yhat_lower'].to_numpy(dtype=float) - base
+        upper = forecast['yhat_upper'].to_numpy(dtype=float) - base
+
+    return ScenarioBase(country, model, ds, base, effect, center, reference, lower, upper, step_cov)
+
+
+def load_scenario_base(country, base_dir='.', use_cache=True):
+    """Prepares the scenario evaluation of a forecast country from the pipeline outputs."""
+    df_train = read_artifact('train_data', countries=[country])
+    df_test = read_artifact('test_data', countries=[country])
+    index = results_store.read_index(base_dir).set_index('Country')
+    model = index.loc[country, 'model'] if 'model' in index.columns else 'prophet'
+    return prepare_country(country, df_train, df_test, model, use_cache, base_dir)
+
+
+def constant_paths(scenario_base, shifts):
+    """Returns the (scenario x year x regressor) paths of the regressors at their reference
+    values (or paths) plus `shifts`, a (scenario x regressor) array, in every year."""
+    shifts = np.asarray(shifts, dtype=float).reshape(-1, len(REGRESSORS))
+    reference = np.broadcast_to(scenario_base.reference, (len(scenario_base.ds), len(REGRESSORS)))
+    return reference[None, :, :] + shifts[:, None, :]
+
+
+def grid_paths(scenario_base, shifts):
+    """Returns the paths of every combination of constant shifts of the regressors.
+
+    `shifts` maps regressors to the shifts (from the reference value) to try; the other
+    regressors stay at their reference value. Returns `(paths, scenarios)`, with one row per
+    scenario and its shift of every regressor in `scenarios`.
+    """
+    grid = pd.MultiIndex.from_product([shifts.get(regressor, [0.0]) for regressor in REGRESSORS], names=REGRESSORS)
+    scenarios = grid.to_frame(index=False)
+    return constant_paths(scenario_base, scenarios.to_numpy()), scenarios
+
+
+def monte_carlo_paths(scenario_base, n, shift=None, seed=0):
+    """Returns `n` random paths: the reference paths (plus a constant `shift` per regressor),
+    with random-walk deviations drawn with the covariance of the historical yearly changes."""
+    rng = np.random.default_rng(seed)
+    n_years = len(scenario_base.ds)
+    steps = rng.multivariate_normal(np.zeros(len(REGRESSORS)), scenario_base.step_cov, size=(n, n_years))
+    start = scenario_base.reference + (0.0 if shift is None else np.asarray(shift, dtype=float))
+    return start + np.cumsum(steps, axis=1)
+
+
+def evaluate(scenario_base, paths):
+    """Returns the (scenario x year) forecasts of the (scenario x year x regressor) `paths`."""
+    return scenario_base.base + np.einsum('syr,yr->sy', paths - scenario_base.center, scenario_base.effect)
+
+
+def summarize(scenario_base, forecasts, quantiles=SCENARIO_QUANTILES):
+    """Returns the mean and `quantiles` of scenario forecasts per year, with the forecast of
+    the reference paths of the regressors ('reference', the stored forecast) for comparison."""
+    summary = pd.DataFrame(np.quantile(forecasts, quantiles, axis=0).T, columns=[f'q{round(q * 100):02d}' for q in quantiles])
+    summary.insert(0, 'ds', scenario_base.ds.to_numpy())
+    summary['mean'] = forecasts.mean(axis=0)
+    summary['reference'] = evaluate(scenario_base, constant_paths(scenario_base, np.zeros(len(REGRESSORS))))[0]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate regressor scenarios against the fitted model of a country.')
+    parser.add_argument('country', help='A forecast country.')
+    parser.add_argument('--draws', type=int, default=10000, help='Number of Monte-Carlo paths (default: 10000).')
+    parser.add_argument('--seed', type=int, default=0)
+    for regressor in REGRESSORS:
+        parser.add_argument(f'--{regressor.lower().replace("_", "-")}', dest=regressor, type=float, default=0.0,
+                            help=f'Shift of {regressor} from its forecast (default: 0).')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    scenario_base = load_scenario_base(args.country)
+    prepare_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    paths = monte_carlo_paths(scenario_base, args.draws, [getattr(args, regressor) for regressor in REGRESSORS], args.seed)
+    forecasts = evaluate(scenario_base, paths)
+    summary = summarize(scenario_base, forecasts)
+    seconds = time.perf_counter() - start_time
+
+    print(f"Scenario forecasts for {args.country} ({scenario_base.model}), {args.draws} Monte-Carlo paths:")
+    summary['ds'] = summary['ds'].dt.strftime('%Y')
+    print(summary.rename(columns={'ds': 'Year'}).to_markdown(index=False, floatfmt='.2f'))
+    print(f"Prepared in {prepare_seconds:.2f}s; evaluated {args.draws} scenarios in {seconds * 1000:.1f} ms "
+          f"({args.draws / seconds:,.0f} scenarios/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,389 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter, OrderedDict, deque, namedtuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from config import REGRESSORS
+import scenarios
+
+# A local HTTP service answering forecast queries: the forecast of a country over a horizon
+# of the forecast period, under a scenario of the regressors.
+#
+#   GET  /forecast?country=Kenya&horizon=3&Inflation=2.5   -> the forecast with Inflation 2.5
+#                                                              points above its forecast
+#   POST /forecast  {"country": "Kenya", "horizon": 3, "shifts": {"Inflation": [1, 2, 3]}}
+#   GET  /countries, /stats, /health;  POST /reload (after a pipeline run)
+#
+# A shift is a change of a regressor from its forecast (see regressor_forecast.py), either
+# one number for all years or one number per year of the horizon. The forecasts come from the scenario engine of
+# scenarios.py: the model of a country (taken from the model cache, see model_cache.py) is
+# prepared once, on its first request, and a scenario is then one einsum. Requests for the
+# same country that are waiting at the same time (read in the same iteration of the event
+# loop, or within BATCH_WINDOW seconds) are evaluated together in one einsum, and recent
+# responses are kept in an LRU cache.
+#
+# The server only uses the standard library (asyncio streams, HTTP/1.1 with keep-alive) and
+# listens on localhost by default.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# How long the first request of a batch waits for more requests for the same country, and
+# the largest batch (a full batch is evaluated at once). With no window, a batch collects
+# the requests read in the same event loop iteration, which only adds latency under load.
+BATCH_WINDOW = float(os.environ.get('AEO_SERVE_BATCH_WINDOW', 0.0))
+MAX_BATCH = int(os.environ.get('AEO_SERVE_MAX_BATCH', 256))
+
+# Number of responses kept in the LRU cache (0 disables it)
+CACHE_SIZE = int(os.environ.get('AEO_SERVE_CACHE_SIZE', 4096))
+
+# Number of recent forecast requests the latency percentiles and throughput are computed over
+LATENCY_WINDOW = 10000
+
+# State of a running server. `countries` is the list of forecast countries (read again by
+# `list_countries()` on a reload, unless it is None), `bases` holds the prepared ScenarioBase
+# of every loaded country, `loading` the tasks preparing the others, `pending` the open batch
+# of every country ([shifts, futures, timer, the ScenarioBase it is evaluated with]), `cache`
+# the LRU cache of responses, `latencies` the (finish time, seconds) of recent forecast
+# requests and `counters` the request counts.
+ServerState = namedtuple('ServerState', [
+    'countries', 'list_countries', 'loader', 'bases', 'loading', 'pending', 'cache', 'latencies', 'counters',
+    'batch_window', 'max_batch', 'cache_size', 'started'
+])
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+    """An invalid request, answered with `status`."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def default_countries(base_dir='.'):
+    """Returns the forecast countries of the pipeline outputs."""
+    import results_store
+
+    return results_store.read_index(base_dir)['Country'].tolist()
+
+
+def make_state(countries=None, loader=None, batch_window=BATCH_WINDOW, max_batch=MAX_BATCH, cache_size=CACHE_SIZE):
+    """Returns the state of a new server. `loader(country)` returns the ScenarioBase of a
+    country (by default scenarios.load_scenario_base, from the pipeline outputs). Without
+    `countries`, the countries of the pipeline outputs are served (and read again on a reload)."""
+    list_countries = default_countries if countries is None else None
+    return ServerState(
+        countries=list(default_countries() if countries is None else countries),
+        list_countries=list_countries,
+        loader=loader or scenarios.load_scenario_base,
+        bases={}, loading={}, pending={}, cache=OrderedDict(), latencies=deque(maxlen=LATENCY_WINDOW),
+        counters=Counter(), batch_window=batch_window, max_batch=max_batch, cache_size=cache_size,
+        started=time.perf_counter()
+    )
+
+
+async def get_base(state, country):
+    """Returns the ScenarioBase of `country`, preparing it in a worker thread on first use
+    (concurrent requests wait for the same preparation)."""
+    if country in state.bases:
+        return state.bases[country]
+    if country not in state.countries:
+        raise RequestError(404, f"Unknown country: {country!r}")
+    task = state.loading.get(country)
+    if task is None:
+        task = asyncio.ensure_future(asyncio.get_running_loop().run_in_executor(None, state.loader, country))
+        state.loading[country] = task
+    try:
+        base = await asyncio.shield(task)
+    except BaseException:
+        if state.loading.get(country) is task:
+            state.loading.pop(country)
+        raise
+    if state.loading.get(country) is task:
+        # (A preparation started before a reload is not kept)
+        state.loading.pop(country)
+        state.bases[country] = base
+    return base
+
+
+def _flush(state, country):
+    """Evaluates the open batch of `country` in one einsum and resolves its requests."""
+    batch = state.pending.pop(country, None)
+    if batch is None:
+        return
+    shifts, futures, timer, base = batch
+    if timer is not None:
+        timer.cancel()
+    try:
+        forecasts = scenarios.evaluate(base, base.reference + np.stack(shifts))
+    except Exception as error:
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+        return
+    state.counters['batches'] += 1
+    state.counters['batched_requests'] += len(futures)
+    for future, forecast in zip(futures, forecasts):
+        if not future.done():
+            future.set_result(forecast)
+
+
+async def evaluate_batched(state, base, shifts):
+    """Returns the forecast (one value per forecast year) of the (year x regressor) `shifts`
+    with the ScenarioBase `base`, evaluated together with the other requests for its country
+    of the same batch window."""
+    loop = asyncio.get_running_loop()
+    country = base.country
+    batch = state.pending.get(country)
+    if batch is None:
+        batch = [[], [], None, base]
+        state.pending[country] = batch
+        if state.max_batch > 1:
+            batch[2] = loop.call_later(state.batch_window, _flush, state, country)
+    future = loop.create_future()
+    batch[0].append(shifts)
+    batch[1].append(future)
+    if len(batch[1]) >= state.max_batch:
+        _flush(state, country)
+    return await future
+
+
+def parse_query(base, horizon, shifts):
+    """Validates a query against the ScenarioBase of its country. Returns the horizon and the
+    (year x regressor) shifts over the whole forecast period (zero after the horizon)."""
+    n_years = len(base.ds)
+    try:
+        horizon = n_years if horizon is None else int(horizon)
+    except (TypeError, ValueError):
+        raise RequestError(400, f"Invalid horizon: {horizon!r}")
+    if not 1 <= horizon <= n_years:
+        raise RequestError(400, f"The horizon must be between 1 and {n_years} years")
+
+    unknown = set(shifts) - set(REGRESSORS)
+    if unknown:
+        raise RequestError(400, f"Unknown regressors: {', '.join(sorted(unknown))} (expected {', '.join(REGRESSORS)})")
+    matrix = np.zeros((n_years, len(REGRESSORS)))
+    for i, regressor in enumerate(REGRESSORS):
+        values = shifts.get(regressor, 0.0)
+        try:
+            values = np.atleast_1d(np.asarray(values, dtype=float))
+        except (TypeError, ValueError):
+            raise RequestError(400, f"Invalid shift of {regressor}: {values!r}")
+        if values.ndim != 1 or len(values) not in (1, horizon) or not np.isfinite(values).all():
+            raise RequestError(400, f"The shift of {regressor} must be one number or {horizon} numbers")
+        matrix[:horizon, i] = values
+    return horizon, matrix
+
+
+def cache_get(state, key):
+    body = state.cache.get(key)
+    if body is not None:
+        state.cache.move_to_end(key)
+    return body
+
+
+def cache_put(state, key, body):
+    if state.cache_size <= 0:
+        return
+    state.cache[key] = body
+    state.cache.move_to_end(key)
+    while len(state.cache) > state.cache_size:
+        state.cache.popitem(last=False)
+
+
+async def forecast(state, country, horizon=None, shifts=None):
+    """Answers a forecast query; returns the JSON response body."""
+    if not isinstance(country, str):
+        raise RequestError(400, "The query needs a country")
+    base = await get_base(state, country)
+    horizon, matrix = parse_query(base, horizon, shifts or {})
+
+    key = (country, horizon, matrix[:horizon].tobytes())
+    body = cache_get(state, key)
+    if body is not None:
+        state.counters['cache_hits'] += 1
+        return body
+
+    reloads = state.counters['reloads']
+    yhat = (await evaluate_batched(state, base, matrix))[:horizon]
+    body = json.dumps({
+        'country': country,
+        'model': base.model,
+        'horizon': horizon,
+        'shifts': {regressor: matrix[:horizon, i].tolist() for i, regressor in enumerate(REGRESSORS)},
+        'forecast': [
+            {'ds': ds, 'yhat': value, 'yhat_lower': value + lower, 'yhat_upper': value + upper}
+            for ds, value, lower, upper in zip(
+                base.ds.dt.strftime('%Y-%m-%d')[:horizon], yhat.tolist(), base.lower[:horizon].tolist(), base.upper[:horizon].tolist()
+            )
+        ],
+    }).encode('utf-8')
+    if state.counters['reloads'] == reloads:
+        # (Not a response of the models a reload dropped while it was evaluated)
+        cache_put(state, key, body)
+    return body
+
+
+def stats(state):
+    """Returns the request counts, the latency percentiles and the throughput of the recent
+    forecast requests."""
+    now = time.perf_counter()
+    latencies = np.array([seconds for _, seconds in state.latencies])
+    batches = state.counters['batches']
+    report = {
+        'uptime_seconds': now - state.started,
+        'requests': state.counters['requests'],
+        'errors': state.counters['errors'],
+        'cache_hits': state.counters['cache_hits'],
+        'cache_entries': len(state.cache),
+        'batches': batches,
+        'mean_batch_size': state.counters['batched_requests'] / batches if batches else None,
+        'countries_loaded': len(state.bases),
+        'latency_ms': None,
+        'throughput_rps': None,
+    }
+    if len(latencies):
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+        report['latency_ms'] = {'p50': p50, 'p90': p90, 'p99': p99, 'max': latencies.max() * 1000}
+        elapsed = now - (state.latencies[0][0] - state.latencies[0][1])
+        report['throughput_rps'] = len(latencies) / elapsed if elapsed > 0 else None
+    return report
+
+
+def reload(state):
+    """Drops the prepared models and the cached responses, and reads the countries again, so
+    that the next requests use the current pipeline outputs. The open batches are evaluated
+    first, with the models their requests were made with."""
+    for country in list(state.pending):
+        _flush(state, country)
+    state.bases.clear()
+    state.loading.clear()
+    state.cache.clear()
+    state.counters['reloads'] += 1
+    if state.list_countries is not None:
+        state.countries[:] = state.list_countries()
+    return {'reloaded': True, 'countries': len(state.countries)}
+
+
+async def route(state, method, target, body):
+    """Returns the status and JSON body of the response to a request."""
+    url = urlsplit(target)
+    if url.path == '/forecast':
+        if method == 'GET':
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            country = query.pop('country', None)
+            horizon = query.pop('horizon', None)
+            shifts = {name: value.split(',') for name, value in query.items()}
+        elif method == 'POST':
+            try:
+                query = json.loads(body or b'{}')
+            except ValueError:
+                raise RequestError(400, "The body must be a JSON object")
+            if not isinstance(query, dict) or not isinstance(query.get('shifts', {}), dict):
+                raise RequestError(400, "The body must be a JSON object with an object of 'shifts'")
+            country, horizon, shifts = query.get('country'), query.get('horizon'), query.get('shifts')
+        else:
+            raise RequestError(405, f"{method} is not allowed on /forecast")
+        return 200, await forecast(state, country, horizon, shifts)
+
+    routes = {
+        ('GET', '/health'): lambda: {'status': 'ok'},
+        ('GET', '/countries'): lambda: {'countries': state.countries, 'loaded': sorted(state.bases)},
+        ('GET', '/stats'): lambda: stats(state),
+        ('POST', '/reload'): lambda: reload(state),
+    }
+    if (method, url.path) not in routes:
+        paths = {path for _, path in routes}
+        raise RequestError(405 if url.path in paths else 404, f"No route for {method} {url.path}")
+    return 200, json.dumps(routes[method, url.path]()).encode('utf-8')
+
+
+async def handle_connection(state, reader, writer):
+    """Serves the HTTP/1.1 requests of one connection (kept alive until the client closes it)."""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            method, target, version = request_line.decode('latin-1').split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+            start = time.perf_counter()
+            try:
+                status, payload = await route(state, method, target, body)
+            except RequestError as error:
+                status, payload = error.status, json.dumps({'error': str(error)}).encode('utf-8')
+            except Exception as error:
+                status, payload = 500, json.dumps({'error': f'{type(error).__name__}: {error}'}).encode('utf-8')
+            if urlsplit(target).path == '/forecast':
+                state.counters['requests'] += 1
+                state.counters['errors'] += status != 200
+                finished = time.perf_counter()
+                state.latencies.append((finished, finished - start))
+
+            keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+            writer.write(
+                f"{version} {status} {REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + payload
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(state, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Starts serving `state` on `host`:`port` (0 picks a free port); returns the asyncio server."""
+    return await asyncio.start_server(lambda reader, writer: handle_connection(state, reader, writer), host, port)
+
+
+async def serve(state, host, port, preload=False):
+    if preload:
+        start_time = time.perf_counter()
+        await asyncio.gather(*(get_base(state, country) for country in state.countries))
+        print(f"Prepared {len(state.countries)} countries in {time.perf_counter() - start_time:.2f}s")
+    server = await start_server(state, host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving forecasts of {len(state.countries)} countries on http://{address[0]}:{address[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve forecast queries over HTTP on localhost.')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--batch-window', type=float, default=BATCH_WINDOW * 1000,
+                        help=f'Milliseconds a batch waits for more requests (default: {BATCH_WINDOW * 1000:g}).')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help='Largest batch (1 disables batching).')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help='Responses kept in the LRU cache (0 disables it).')
+    parser.add_argument('--preload', action='store_true', help='Prepare the models of all countries before serving.')
+    args = parser.parse_args()
+
+    state = make_state(batch_window=args.batch_window / 1000, max_batch=args.max_batch, cache_size=args.cache_size)
+    try:
+        asyncio.run(serve(state, args.host, args.port, args.preload))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
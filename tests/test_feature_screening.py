@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+import feature_screening
+from compact import compact_panel
+from config import (COUNTRY_CODE_COL, COUNTRY_COL, INDICATOR_CODE_COL, INDICATOR_COL, REGION_ID_COL, REGRESSORS,
+                    TARGET_KPI_CODE)
+
+
+def make_source(drivers, others, n_years=100, seed=0):
+    """A source table of one country whose growth is the sum of the `drivers` indicators,
+    with `others` unrelated indicators."""
+    rng = np.random.default_rng(seed)
+    codes = [f'IND.{i}' for i in range(drivers + others)]
+    indicators = rng.normal(size=(len(codes), n_years))
+    growth = 3.0 + indicators[:drivers].sum(axis=0) + rng.normal(0.0, 0.5, n_years)
+    years = [str(2020 - n_years + year) for year in range(n_years)]
+    rows = [
+        {COUNTRY_CODE_COL: 'KEN', COUNTRY_COL: 'Kenya', REGION_ID_COL: 'EA', INDICATOR_CODE_COL: code,
+         INDICATOR_COL: code, **dict(zip(years, series))}
+        for code, series in zip([TARGET_KPI_CODE] + codes, [growth, *indicators])
+    ]
+    return pd.DataFrame(rows), codes
+
+
+def test_default_regressors_fit_in_the_shortlist():
+    assert feature_screening.SHORTLIST_SIZE >= len(REGRESSORS)
+
+
+def test_shortlist_prunes_a_wider_set_of_regressors():
+    size = feature_screening.SHORTLIST_SIZE
+    df, codes = make_source(drivers=size, others=3)
+    columns = [code.replace('.', '_') for code in codes]
+    table = feature_screening.screening_table(compact_panel(df), last_year=2019, configured=codes)
+
+    # Only the indicators that drive growth are fitted with Prophet
+    assert sorted(feature_screening.shortlist(table, columns)['Kenya']) == columns[:size]
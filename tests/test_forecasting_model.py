@@ -0,0 +1,34 @@
+import pandas as pd
+
+from config import TEST_END_YEAR, TRAIN_END_YEAR
+from forecasting_model import select_models
+
+
+def write_folds(path, rows):
+    columns = ['Country', 'cutoff', 'horizon', 'model', 'RMSE']
+    pd.DataFrame(rows, columns=columns).to_csv(path, index=False)
+    return path
+
+
+def test_select_models_uses_the_folds_before_the_test_years(tmp_path):
+    training_folds = [
+        ('Kenya', TRAIN_END_YEAR - 5, 5, 'prophet', 2.0),
+        ('Kenya', TRAIN_END_YEAR - 5, 5, 'damped_trend', 3.0),
+    ]
+    selection = select_models(['Kenya'], backtest_path=write_folds(tmp_path / 'train.csv', training_folds))
+    assert selection == {'Kenya': 'prophet'}
+
+    # A fold forecasting the test years, where damped_trend is far better, must not change it
+    test_folds = training_folds + [
+        ('Kenya', TEST_END_YEAR - 5, 5, 'prophet', 10.0),
+        ('Kenya', TEST_END_YEAR - 5, 5, 'damped_trend', 0.1),
+    ]
+    assert select_models(['Kenya'], backtest_path=write_folds(tmp_path / 'all.csv', test_folds)) == selection
+
+
+def test_select_models_picks_a_better_alternative(tmp_path):
+    folds = [
+        ('Kenya', TRAIN_END_YEAR - 5, 5, 'prophet', 3.0),
+        ('Kenya', TRAIN_END_YEAR - 5, 5, 'damped_trend', 2.0),
+    ]
+    assert select_models(['Kenya'], backtest_path=write_folds(tmp_path / 'folds.csv', folds)) == {'Kenya': 'damped_trend'}
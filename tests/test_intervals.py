@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import intervals
+from config import REGRESSORS
+from forecasting_model import fit_model
+from benchmarks.bench_intervals import prediction_frames, synthetic_countries
+
+
+@pytest.fixture(scope='module')
+def fitted():
+    """A Prophet model of a synthetic country, and its test and forecast periods."""
+    _, df_train, df_test = synthetic_countries(1)[0]
+    model = fit_model(df_train, REGRESSORS)
+    return model, pd.concat(prediction_frames(df_test), ignore_index=True)
+
+
+@pytest.mark.parametrize('mode', ['analytic', 'cached'])
+def test_intervals_match_prophet(fitted, mode):
+    model, df = fitted
+    # Prophet's own intervals, with enough samples for their percentiles to be stable
+    model.uncertainty_samples = 20000
+    np.random.seed(0)
+    reference = model.predict(df)
+    model.uncertainty_samples = 1000
+
+    forecast = intervals.predict(model, df, mode=mode, samples=5000)
+    np.testing.assert_allclose(forecast['yhat'], reference['yhat'])
+    width = (reference['yhat_upper'] - reference['yhat_lower']).to_numpy()
+    for bound in ['yhat_lower', 'yhat_upper']:
+        error = np.abs(forecast[bound] - reference[bound]).to_numpy()
+        assert (error < 0.05 * width).all(), f"{bound}: {error / width}"
@@ -0,0 +1,39 @@
+from pipeline import run_script_stage, stage_fingerprint
+
+
+def write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def make_stage(tmp_path):
+    """A stage whose script writes its output through a helper module (imported inside a
+    function, as the stages do with their heavy imports)."""
+    write(tmp_path / 'helper.py', "def value():\n    return 1\n")
+    write(tmp_path / 'other.py', "VALUE = 1\n")
+    script = write(tmp_path / 'stage.py', (
+        "import sys\n"
+        "def main():\n"
+        "    from helper import value\n"
+        f"    open({str(tmp_path / 'out.txt')!r}, 'w').write(str(value()))\n"
+        "main()\n"
+    ))
+    return {'script': script, 'depends_on': [], 'inputs': [], 'outputs': [str(tmp_path / 'out.txt')], 'config': {}}
+
+
+def test_editing_a_helper_reruns_its_stage(tmp_path):
+    stage = make_stage(tmp_path)
+    state = {}
+    assert run_script_stage('stage', stage, state)
+    assert not run_script_stage('stage', stage, state)
+
+    write(tmp_path / 'helper.py', "def value():\n    return 2\n")
+    assert run_script_stage('stage', stage, state)
+    assert (tmp_path / 'out.txt').read_text() == '2'
+
+
+def test_modules_the_stage_does_not_import_do_not_change_its_fingerprint(tmp_path):
+    stage = make_stage(tmp_path)
+    fingerprint = stage_fingerprint(stage)
+    write(tmp_path / 'other.py', "VALUE = 2\n")
+    assert stage_fingerprint(stage) == fingerprint
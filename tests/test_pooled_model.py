@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+import pooled_model
+from config import REGRESSORS
+
+
+def make_panel(countries, n_years=25, seed=0):
+    """Synthetic training rows of `countries`, with a growth linear in the regressors."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for country in countries:
+        df = pd.DataFrame({'Country': country, 'ds': pd.to_datetime([f'{1991 + year}-01-01' for year in range(n_years)])})
+        for regressor in REGRESSORS:
+            df[regressor] = rng.normal(0.0, 2.0, n_years)
+        df['y'] = rng.normal(4.0, 1.0) + df[REGRESSORS].to_numpy() @ rng.normal(0.5, 0.3, len(REGRESSORS)) + rng.normal(0.0, 1.0, n_years)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+REGIONS = {'Kenya': 'East Africa', 'Uganda': 'East Africa', 'Tanzania': 'East Africa', 'Ghana': 'West Africa'}
+
+
+def test_fit_and_predict_shapes():
+    df = make_panel(list(REGIONS))
+    model = pooled_model.fit(df, REGIONS)
+    n_countries, n_coef = len(REGIONS), len(pooled_model.COEFFICIENTS)
+    assert list(model.countries) == list(REGIONS)
+    assert model.coef.shape == (n_countries, n_coef)
+    assert model.cov.shape == (n_countries, n_coef, n_coef)
+    assert model.noise_var.shape == (n_countries,)
+
+    future = df.groupby('Country').tail(5).assign(ds=lambda frame: frame['ds'] + pd.DateOffset(years=5))
+    forecast = pooled_model.predict(model, future)
+    assert len(forecast) == len(future)
+    assert list(forecast.columns) == ['Country', 'ds', 'yhat', 'yhat_lower', 'yhat_upper', 'trend'] + REGRESSORS
+    assert (forecast['yhat_lower'] < forecast['yhat']).all() and (forecast['yhat'] < forecast['yhat_upper']).all()
+    # The forecast is the sum of the trend and the regressor effects
+    np.testing.assert_allclose(forecast['yhat'], forecast[['trend'] + REGRESSORS].sum(axis=1))
+
+
+def test_single_country_region_falls_back_to_the_global_prior():
+    model = pooled_model.fit(make_panel(list(REGIONS)), REGIONS)
+    overall_mean = model.coef.mean(axis=0)
+    ghana = model.countries.get_loc('Ghana')
+    np.testing.assert_allclose(model.prior_mean[ghana], overall_mean)
+
+    # The countries of East Africa are drawn towards their region instead
+    kenya = model.countries.get_loc('Kenya')
+    assert not np.allclose(model.prior_mean[kenya], overall_mean)
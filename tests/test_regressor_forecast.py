@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+import regressor_forecast
+from baseline_models import series_matrix
+from config import FORECAST_YEARS, REGRESSORS, TEST_END_YEAR
+
+# A stable VAR(1) of the regressors, x_t = c + x_{t-1} A (spectral radius 0.56)
+INTERCEPT = np.array([1.0, -2.0, 3.0])
+SLOPE = np.array([[0.5, 0.2, 0.0], [0.1, 0.4, -0.2], [0.0, 0.3, 0.6]])
+
+
+def make_history(countries, n_years=200, noise=0.01, seed=0):
+    """History frames of `countries` simulated from the VAR, from a random start and ending
+    at TEST_END_YEAR."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for country in countries:
+        values = np.empty((n_years, len(REGRESSORS)))
+        values[0] = rng.normal(0.0, 5.0, len(REGRESSORS))
+        for t in range(1, n_years):
+            values[t] = INTERCEPT + values[t - 1] @ SLOPE + rng.normal(0.0, noise, len(REGRESSORS))
+        years = np.arange(TEST_END_YEAR - n_years + 1, TEST_END_YEAR + 1)
+        frames.append(pd.DataFrame(values, columns=REGRESSORS).assign(
+            Country=country, ds=pd.to_datetime(years.astype(str), format='%Y')
+        ))
+    return pd.concat(frames, ignore_index=True)[['Country', 'ds'] + REGRESSORS]
+
+
+def expected_paths(history, country):
+    level = history[history['Country'] == country][REGRESSORS].to_numpy()[-1]
+    paths = []
+    for _ in FORECAST_YEARS:
+        level = INTERCEPT + level @ SLOPE
+        paths.append(level)
+    return np.array(paths)
+
+
+def test_fit_var_recovers_the_coefficients():
+    history = make_history(['Kenya', 'Ghana'])
+    columns = [series_matrix(history, regressor) for regressor in REGRESSORS]
+    lengths = columns[0][2]
+    z, mean, std = regressor_forecast.standardize(np.stack([matrix for _, matrix, _, _ in columns], axis=-1), lengths)
+    intercept, slope, n = regressor_forecast.fit_var(z, lengths)
+
+    # Back from the standardized series: x_t = mean + std c + (x_{t-1} - mean) A
+    for i in range(len(lengths)):
+        raw_slope = slope[i] / std[i][:, None] * std[i][None, :]
+        raw_intercept = mean[i] + intercept[i] * std[i] - mean[i] @ raw_slope
+        np.testing.assert_allclose(raw_slope, SLOPE, atol=0.05)
+        np.testing.assert_allclose(raw_intercept, INTERCEPT, atol=0.05)
+    assert list(n) == [len(history) // 2 - 1] * 2
+
+
+def test_var_forecast_follows_the_known_coefficients():
+    history = make_history(['Kenya', 'Ghana'])
+    paths = regressor_forecast.forecast_regressors(history, model='var')
+    assert (paths['Model'] == 'var').all()
+    for country, path in paths.groupby('Country'):
+        assert list(path['ds'].dt.year) == list(FORECAST_YEARS)
+        np.testing.assert_allclose(path[REGRESSORS].to_numpy(), expected_paths(history, country), atol=0.01)
+
+    # The AR model of each regressor on its own misses the effects between them
+    ar_paths = regressor_forecast.forecast_regressors(history, model='ar')
+    errors = [np.abs(path[REGRESSORS].to_numpy() - expected_paths(history, country)).max()
+              for country, path in ar_paths.groupby('Country')]
+    assert max(errors) > 0.01
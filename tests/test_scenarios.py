@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import scenarios
+from config import REGRESSORS
+from forecasting_model import fit_model, future_dates
+
+
+@pytest.fixture(scope='module')
+def scenario_base():
+    """A ScenarioBase of a Prophet model fitted on a synthetic country, whose growth depends
+    linearly on the regressors."""
+    rng = np.random.default_rng(0)
+    n_years = 30
+    train = pd.DataFrame({'ds': pd.to_datetime([f'{1986 + year}-01-01' for year in range(n_years)])})
+    for regressor in REGRESSORS:
+        train[regressor] = rng.normal(0.0, 2.0, n_years)
+    train['y'] = 3.0 + train[REGRESSORS].to_numpy() @ np.linspace(0.8, -0.5, len(REGRESSORS)) + rng.normal(0.0, 0.3, n_years)
+    model = fit_model(train, REGRESSORS)
+
+    ds = future_dates()
+    base, effect, center, lower, upper = scenarios.prophet_base(model, ds)
+    reference = rng.normal(0.0, 2.0, (len(ds), len(REGRESSORS)))
+    return model, scenarios.ScenarioBase('Kenya', 'prophet', ds, base, effect, center, reference, lower, upper,
+                                         np.eye(len(REGRESSORS)))
+
+
+def prophet_forecast(model, ds, values):
+    future = ds.to_frame()
+    future[REGRESSORS] = values
+    model.uncertainty_samples = 0
+    return model.predict(future)['yhat'].to_numpy()
+
+
+def test_reference_paths_match_prophet(scenario_base):
+    model, sb = scenario_base
+    forecast = scenarios.evaluate(sb, scenarios.constant_paths(sb, np.zeros(len(REGRESSORS))))[0]
+    np.testing.assert_allclose(forecast, prophet_forecast(model, sb.ds, sb.reference), atol=1e-8)
+
+
+def test_shift_moves_the_forecast_by_the_coefficients(scenario_base):
+    from prophet.utilities import regressor_coefficients
+
+    model, sb = scenario_base
+    shift = np.array([1.5, -2.0, 0.5])[:len(REGRESSORS)]
+    forecasts = scenarios.evaluate(sb, scenarios.constant_paths(sb, np.stack([np.zeros(len(REGRESSORS)), shift])))
+
+    beta = regressor_coefficients(model).set_index('regressor').loc[REGRESSORS, 'coef'].to_numpy()
+    np.testing.assert_allclose(forecasts[1] - forecasts[0], np.full(len(sb.ds), beta @ shift), atol=1e-8)
+    np.testing.assert_allclose(forecasts[1], prophet_forecast(model, sb.ds, sb.reference + shift), atol=1e-8)
@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import numpy as np
+
+import scenarios
+import serve
+from config import REGRESSORS
+from forecasting_model import future_dates
+
+
+def make_base(country, level=3.0):
+    ds = future_dates()
+    n_years, n_regressors = len(ds), len(REGRESSORS)
+    center = np.zeros(n_regressors)
+    return scenarios.ScenarioBase(
+        country, 'prophet', ds, np.full(n_years, level), np.full((n_years, n_regressors), 0.5),
+        center, center + 1.0, np.full(n_years, -2.0), np.full(n_years, 2.0), np.eye(n_regressors)
+    )
+
+
+def make_state(bases, countries=None, **settings):
+    return serve.make_state(list(bases) if countries is None else countries, bases.__getitem__, **settings)
+
+
+def shifts(value):
+    return {REGRESSORS[0]: value}
+
+
+def test_concurrent_requests_are_one_batch():
+    state = make_state({'Kenya': make_base('Kenya')}, batch_window=0.05, cache_size=0)
+
+    async def run():
+        await serve.get_base(state, 'Kenya')
+        return await asyncio.gather(*(serve.forecast(state, 'Kenya', 2, shifts(i)) for i in range(5)))
+
+    bodies = [json.loads(body) for body in asyncio.run(run())]
+    assert state.counters['batches'] == 1
+    assert state.counters['batched_requests'] == 5
+    # Every request gets the forecast of its own shift (from the reference, one above the center)
+    assert [body['forecast'][0]['yhat'] for body in bodies] == [3.0 + 0.5 * (len(REGRESSORS) + i) for i in range(5)]
+
+
+def test_repeated_request_is_served_from_the_cache():
+    state = make_state({'Kenya': make_base('Kenya')})
+
+    async def run():
+        first = await serve.forecast(state, 'Kenya', 3, shifts(1.0))
+        second = await serve.forecast(state, 'Kenya', 3, shifts(1.0))
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert state.counters['cache_hits'] == 1
+    assert state.counters['batches'] == 1
+
+
+def test_reload_during_a_pending_batch_resolves_every_request():
+    bases = {'Kenya': make_base('Kenya')}
+    state = make_state(bases, batch_window=0.2)
+
+    async def run():
+        await serve.get_base(state, 'Kenya')
+        requests = [asyncio.ensure_future(serve.forecast(state, 'Kenya', 2, shifts(i))) for i in range(3)]
+        await asyncio.sleep(0.01)
+        assert 'Kenya' in state.pending
+        serve.reload(state)
+        return await asyncio.wait_for(asyncio.gather(*requests), timeout=1.0)
+
+    bodies = asyncio.run(run())
+    assert len(bodies) == 3
+    assert not state.pending and not state.bases
+    # The responses of the dropped models are not cached
+    assert not state.cache
+
+
+def test_reload_reads_the_countries_again():
+    bases = {'Kenya': make_base('Kenya'), 'Ghana': make_base('Ghana', level=5.0)}
+    countries = ['Kenya']
+    state = make_state(bases, list(countries))._replace(list_countries=lambda: list(countries))
+
+    async def run():
+        try:
+            await serve.forecast(state, 'Ghana')
+        except serve.RequestError as error:
+            assert error.status == 404
+        else:
+            raise AssertionError("Ghana is not served yet")
+        countries.append('Ghana')
+        serve.reload(state)
+        return json.loads(await serve.forecast(state, 'Ghana', 1))
+
+    assert asyncio.run(run())['forecast'][0]['yhat'] == 5.0 + 0.5 * len(REGRESSORS)
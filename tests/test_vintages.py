@@ -0,0 +1,26 @@
+import pandas as pd
+
+import vintages
+from artifact_store import csv_path, read_artifact
+from benchmarks.bench_vintages import EXPORTS, rebuild, revise
+from benchmarks.synthetic import make_aeo_table
+
+
+def test_apply_delta_matches_a_full_rebuild(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = make_aeo_table(12, seed=0)
+    first.to_csv('release-1.csv', index=False)
+    revise(first, 5, seed=1).to_csv('release-2.csv', index=False)
+
+    vintages.add_vintage('release-1.csv', 'r1')
+    rebuild(vintages.read_vintage_panel('r1', countries='all'))
+    vintages.add_vintage('release-2.csv', 'r2')
+    countries = vintages.apply_delta('r2', countries='all', plots=False)
+    assert 0 < len(countries) < 12
+    delta = {name: read_artifact(name) for name in EXPORTS}
+    delta_csv = {name: open(csv_path(name), 'rb').read() for name in EXPORTS}
+
+    rebuild(vintages.read_vintage_panel('r2', countries='all'))
+    for name in EXPORTS:
+        pd.testing.assert_frame_equal(delta[name], read_artifact(name))
+        assert delta_csv[name] == open(csv_path(name), 'rb').read(), f"{name}.csv differs"
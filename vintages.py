@@ -0,0 +1,395 @@
+import argparse
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import results_store
+from artifact_store import ARTIFACT_DIR, EXPORT_CSV, artifact_exists, csv_path, read_artifact, splice_csv, write_artifact
+from compact import PANEL_ARTIFACT, panel_years, read_panel, series_rows, wide_table
+from config import SOURCE_FILE, COUNTRIES, COUNTRY_COL, INDICATOR_CODE_COL, TARGET_KPI_CODE, REGRESSOR_INDICATORS
+from data_prep import prepare_gdp_growth
+from eda_and_viz import add_yoy_change, plot_boxplot, plot_history
+from feature_split import build_features, split_train_test
+from fingerprint import file_hash
+from instrumentation import count, span
+
+# Versioned store of the AEO source releases (vintages), and delta ingestion of a new one.
+#
+# Every release of the source CSV is kept as a vintage: the compact panel (see compact.py)
+# of all its countries and indicators, in the artifact 'vintage_<id>', listed in
+# VINTAGE_INDEX with the hash of its file. A new vintage is compared with the previous one
+# cell by cell (country x indicator x year): the two panels are aligned on the union of
+# their series and years, and the cells whose value or missing flag differ are stored in
+# the artifact 'vintage_<id>_diff' ('Country', 'Indicator', 'year', 'old', 'new' and
+# 'change': 'added', 'removed' or 'revised').
+#
+# A release usually revises a few cells, so the pipeline (pipeline.py) applies a new vintage
+# as a delta when its artifacts were built from an earlier one: apply_delta() diffs the
+# pipeline's panel of the new vintage with the one the artifacts were built from, recomputes
+# the interpolated GDP growth (data_prep.py) of the countries whose KPI changed, and the
+# features and split (feature_split.py) of the countries with a changed KPI or regressor
+# series, and splices them into the artifacts in place of their old rows. These steps work
+# country by country, so the spliced artifacts are the same as a full rebuild. The CSV
+# exports are spliced too (see artifact_store.splice_csv()): only the new rows are
+# formatted. The forecasting stage then refits only the countries whose split data
+# changed, and feature_screening.py reuses the regressor selection of the others. (The
+# source CSV is still parsed once in full, and the Parquet artifacts are rewritten.)
+#
+# The future forecasts of every vintage are recorded in the FORECAST_ARTIFACT artifact for
+# the dashboard's comparison: a vintage records only the countries whose forecast changed,
+# the others keep the forecast of the last vintage before it.
+
+VINTAGE_INDEX = os.path.join(ARTIFACT_DIR, 'vintages.json')
+FORECAST_ARTIFACT = 'vintage_forecasts'
+CHANGES = ['added', 'removed', 'revised']
+
+# Artifacts rewritten by apply_delta(), which a full rebuild gets from these stages
+DELTA_STAGES = ['data_prep', 'eda_and_viz', 'feature_split']
+
+
+def vintage_artifact(vintage_id):
+    return f'vintage_{vintage_id}'
+
+
+def diff_artifact(vintage_id):
+    return f'vintage_{vintage_id}_diff'
+
+
+def load_index():
+    """Returns the vintages, in the order they were added (a list of dicts)."""
+    if not os.path.exists(VINTAGE_INDEX):
+        return []
+    with open(VINTAGE_INDEX, 'r') as f:
+        return json.load(f)
+
+
+def save_index(entries):
+    os.makedirs(ARTIFACT_DIR, exist_ok=True)
+    with open(VINTAGE_INDEX, 'w') as f:
+        json.dump(entries, f, indent=4)
+
+
+def get_vintage(vintage_id, entries=None):
+    """Returns the index entry of a vintage. Raises KeyError if there is none."""
+    for entry in entries if entries is not None else load_index():
+        if entry['id'] == vintage_id:
+            return entry
+    raise KeyError(f"Unknown vintage {vintage_id!r}")
+
+
+def _series(panel):
+    """Returns the (country, indicator code) keys, the (series x year) values (NaN where
+    missing) and the years of a panel."""
+    rows, values, years = series_rows(panel)
+    keys = pd.MultiIndex.from_arrays([rows[COUNTRY_COL].astype(object), rows[INDICATOR_CODE_COL].astype(object)],
+                                     names=['Country', 'Indicator'])
+    if not keys.is_unique:
+        raise ValueError("The panel has more than one series for some countries and indicators")
+    return keys, values, years
+
+
+def diff_panels(old, new):
+    """Returns the cells that differ between two panels (see compact.py): 'Country',
+    'Indicator', 'year', 'old' and 'new' values (NaN where missing) and 'change'."""
+    old_keys, old_series, old_years = _series(old)
+    new_keys, new_series, new_years = _series(new)
+    keys = old_keys.append(new_keys).unique()
+    years = np.union1d(old_years, new_years)
+
+    with span('vintages.diff', series=len(keys), years=len(years)) as fields:
+        # Both panels on the union of their series and years (NaN where absent)
+        old_values, new_values = np.full((2, len(keys), len(years)), np.nan)
+        old_values[np.ix_(keys.get_indexer(old_keys), np.searchsorted(years, old_years))] = old_series
+        new_values[np.ix_(keys.get_indexer(new_keys), np.searchsorted(years, new_years))] = new_series
+
+        old_observed, new_observed = ~np.isnan(old_values), ~np.isnan(new_values)
+        changed = (old_observed != new_observed) | (old_observed & new_observed & (old_values != new_values))
+        series, year = np.nonzero(changed)
+        fields['cells'] = len(series)
+
+    change = np.select([~old_observed[series, year], ~new_observed[series, year]], ['added', 'removed'], 'revised')
+    return pd.DataFrame({
+        'Country': keys.get_level_values('Country')[series],
+        'Indicator': keys.get_level_values('Indicator')[series],
+        'year': years[year],
+        'old': old_values[series, year].astype(np.float32),
+        'new': new_values[series, year].astype(np.float32),
+        'change': change,
+    })
+
+
+def add_vintage(path=SOURCE_FILE, label=None):
+    """Stores the source CSV `path` as a vintage (all its countries and indicators) and diffs
+    it with the last vintage. Returns the index entry of the vintage, which is the existing
+    one if a vintage of the same file is already stored.
+
+    `label` is the id of the vintage (default: 'v<n>'). Raises ValueError if it is not a
+    valid artifact name or is already taken.
+    """
+    digest = file_hash(path)
+    entries = load_index()
+    for entry in entries:
+        if entry['file_hash'] == digest:
+            return entry
+
+    vintage_id = label or f'v{len(entries) + 1}'
+    if not re.fullmatch(r'[A-Za-z0-9._-]+', vintage_id) or any(entry['id'] == vintage_id for entry in entries):
+        raise ValueError(f"Invalid or existing vintage id {vintage_id!r}")
+
+    with span('vintages.add', vintage=vintage_id):
+        data_loader.ingest(path, vintage_artifact(vintage_id), countries='all', indicator_codes='all', export_csv=False)
+        panel = read_panel(vintage_artifact(vintage_id))
+        entry = {
+            'id': vintage_id,
+            'source': path,
+            'file_hash': digest,
+            'added': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'series': len(_series(panel)[0]),
+            'cells': int(panel['observed'].sum()),
+            'previous': entries[-1]['id'] if entries else None,
+            'changes': {},
+        }
+        if entry['previous'] is not None:
+            diff = diff_panels(read_panel(vintage_artifact(entry['previous'])), panel)
+            write_artifact(diff, diff_artifact(vintage_id), export_csv=False)
+            entry['changes'] = {change: int(n) for change, n in diff['change'].value_counts().reindex(CHANGES, fill_value=0).items()}
+
+    save_index(entries + [entry])
+    return entry
+
+
+def diff_vintages(old_id, new_id):
+    """Returns the cells that differ between two stored vintages (see diff_panels())."""
+    entry = get_vintage(new_id)
+    if entry['previous'] == old_id and artifact_exists(diff_artifact(new_id)):
+        return read_artifact(diff_artifact(new_id))
+    get_vintage(old_id)
+    return diff_panels(read_panel(vintage_artifact(old_id)), read_panel(vintage_artifact(new_id)))
+
+
+def read_vintage_panel(vintage_id, countries=COUNTRIES, indicator_codes=None):
+    """Returns the panel of the pipeline (the rows data_loader.py keeps) from a stored vintage."""
+    if indicator_codes is None:
+        indicator_codes = [TARGET_KPI_CODE] + list(REGRESSOR_INDICATORS)
+    return read_panel(vintage_artifact(vintage_id), countries=None if countries == 'all' else countries,
+                      indicator_codes=indicator_codes)
+
+
+def write_panel(panel, name=PANEL_ARTIFACT, previous=None, changed=None):
+    """Saves a panel as the artifact `name`, with the CSV export in the wide layout (the 7
+    significant digits the panel keeps). Given the `previous` panel of the artifact and the
+    keys of the `changed` series, only the series that are new or changed are formatted for
+    the CSV export."""
+    write_artifact(panel, name, export_csv=False)
+    if not EXPORT_CSV:
+        return
+    if previous is not None:
+        old_keys, new_keys = _series(previous)[0], _series(panel)[0]
+        rows = np.where(new_keys.isin(changed), -1, old_keys.get_indexer(new_keys))
+        new_rows = np.repeat(rows < 0, max(len(panel_years(panel)), 1))
+        if splice_csv(csv_path(name), rows, wide_table(panel[new_rows]), len(old_keys), float_format='%.7g'):
+            return
+    wide_table(panel).to_csv(csv_path(name), index=False, float_format='%.7g')
+
+
+def _export(df, name, rows, n_previous):
+    """Saves `df` as the artifact `name`, given the row of each of its rows in the current
+    artifact of `n_previous` rows (-1 for a new row): only the new rows are formatted for
+    the CSV export (see splice_csv())."""
+    write_artifact(df, name, export_csv=False)
+    if EXPORT_CSV and not splice_csv(csv_path(name), rows, df[rows < 0], n_previous):
+        df.to_csv(csv_path(name), index=False)
+
+
+def _splice(name, countries, rows, parts=None):
+    """Replaces the rows of `countries` in the artifact `name` with `rows` (None: no rows),
+    keeping the artifact sorted by country and year. `parts` splits an artifact into others
+    made of its rows (a dict of names and DataFrames, e.g. the train and test data), which
+    are saved from the new artifact. Returns the new artifact."""
+    df = read_artifact(name)
+    keep = ~df['Country'].isin(countries).to_numpy()
+    new = pd.concat([df[keep]] + ([rows] if rows is not None else []), ignore_index=True)
+    # The row of every row of the new artifact in the old one (-1 for the spliced rows)
+    old_rows = np.concatenate([np.flatnonzero(keep), np.full(len(new) - keep.sum(), -1)])
+    order = new.sort_values(['Country', 'ds'], kind='stable').index.to_numpy()
+    new, old_rows = new.take(order).reset_index(drop=True), old_rows[order]
+    _export(new, name, old_rows, len(df))
+
+    if parts is not None:
+        old_parts = parts(df)
+        for part_name, part in parts(new).items():
+            # The row of every old row in the old part (the extra last entry maps -1 to -1)
+            part_rows = np.full(len(df) + 1, -1)
+            part_rows[old_parts[part_name].index] = np.arange(len(old_parts[part_name]))
+            _export(part.reset_index(drop=True), part_name, part_rows[old_rows[part.index]], len(old_parts[part_name]))
+    return new
+
+
+def apply_delta(vintage_id, countries=COUNTRIES, regressor_indicators=None, plots=True):
+    """Brings the artifacts of the data_prep, eda_and_viz and feature_split stages, built
+    from an earlier vintage, up to vintage `vintage_id`. The panel of the pipeline is diffed
+    with the one the artifacts were built from, and only the countries with changed cells
+    (or added or removed series) are recomputed; `plots` redraws the EDA charts if a KPI
+    value changed.
+
+    Returns the countries whose split data was recomputed.
+    """
+    if regressor_indicators is None:
+        regressor_indicators = REGRESSOR_INDICATORS
+    indicator_codes = [TARGET_KPI_CODE] + list(regressor_indicators)
+    previous = read_panel(PANEL_ARTIFACT)
+    panel = read_vintage_panel(vintage_id, countries, indicator_codes)
+    old_keys, new_keys = _series(previous)[0], _series(panel)[0]
+    changed = pd.concat([
+        diff_panels(previous, panel)[['Country', 'Indicator']],
+        # (Series without any value are not in the diff, but a full rebuild keeps their rows)
+        old_keys.symmetric_difference(new_keys).to_frame(index=False),
+    ], ignore_index=True).drop_duplicates()
+    count('vintages.changed_series', value=len(changed))
+    if changed.empty:
+        return []
+
+    kpi_countries = sorted(set(changed.loc[changed['Indicator'] == TARGET_KPI_CODE, 'Country']))
+    feature_countries = sorted(set(changed['Country']))
+    with span('vintages.apply_delta', vintage=vintage_id, series=len(changed), countries=len(feature_countries)):
+        write_panel(panel, previous=previous, changed=pd.MultiIndex.from_frame(changed))
+        affected = panel[panel[COUNTRY_COL].isin(feature_countries)]
+
+        if kpi_countries:
+            try:
+                df_clean = prepare_gdp_growth(affected[affected[COUNTRY_COL].isin(kpi_countries)])
+            except ValueError:
+                # (The KPI series of these countries were all removed)
+                df_clean = None
+            _splice('gdp_growth_clean_data', kpi_countries, df_clean)
+            df_final = _splice('gdp_growth_final_clean_data', kpi_countries,
+                               add_yoy_change(df_clean) if df_clean is not None else None)
+            if plots:
+                plot_history(df_final)
+                plot_boxplot(df_final)
+        else:
+            df_final = read_artifact('gdp_growth_final_clean_data')
+
+        df_gdp = df_final[df_final['Country'].isin(feature_countries)]
+        features = build_features(df_gdp, affected, regressor_indicators) if len(df_gdp) else None
+        _splice('gdp_growth_multivariate_data', feature_countries, features,
+                parts=lambda df: dict(zip(['train_data', 'test_data'], split_train_test(df))))
+    return feature_countries
+
+
+def record_forecasts(vintage_id, base_dir='.'):
+    """Records the future forecasts of the results store (see results_store.py) as the
+    forecasts of vintage `vintage_id`: only the countries whose results changed since the
+    vintages before it are stored. Returns those countries."""
+    if not os.path.exists(results_store.index_path(base_dir)):
+        return []
+    entries = load_index()
+    entry = get_vintage(vintage_id, entries)
+    known = {}
+    for earlier in entries[:entries.index(entry) + 1]:
+        known.update(earlier.get('forecasts', {}))
+
+    index = results_store.read_index(base_dir)
+    hashes = dict(zip(index['Country'], index['content_hash']))
+    changed = [country for country, digest in hashes.items() if known.get(country) != digest]
+    if changed:
+        rows = pd.concat([
+            results_store.read_country(country, 'forecasts', base_dir).query("type == 'Forecast (Future)'")
+            for country in changed
+        ], ignore_index=True)
+        rows = rows.assign(Vintage=vintage_id)[['Vintage', 'Country', 'ds', 'y', 'yhat_lower', 'yhat_upper']]
+        if artifact_exists(FORECAST_ARTIFACT):
+            stored = read_artifact(FORECAST_ARTIFACT)
+            stored = stored[~((stored['Vintage'] == vintage_id) & stored['Country'].isin(changed))]
+            rows = pd.concat([stored, rows], ignore_index=True)
+        write_artifact(rows, FORECAST_ARTIFACT, export_csv=False)
+
+    entry['forecasts'] = {**entry.get('forecasts', {}), **{country: hashes[country] for country in changed}}
+    save_index(entries)
+    return changed
+
+
+def load_forecasts():
+    """Returns the recorded forecasts of every vintage and the ids of the vintages with
+    recorded forecasts (in order), or None if none were recorded."""
+    if not artifact_exists(FORECAST_ARTIFACT):
+        return None
+    vintage_ids = [entry['id'] for entry in load_index() if 'forecasts' in entry]
+    return read_artifact(FORECAST_ARTIFACT), vintage_ids
+
+
+def country_forecasts(forecasts, vintage_ids, country):
+    """Returns the future forecasts of `country` at every vintage of `vintage_ids` ('Vintage',
+    'ds', 'y', 'yhat_lower' and 'yhat_upper'): a vintage that did not record the country has
+    the forecast of the last vintage before it that did."""
+    by_vintage = dict(tuple(forecasts[forecasts['Country'] == country].groupby('Vintage', sort=False)))
+    frames, current = [], None
+    for vintage_id in vintage_ids:
+        current = by_vintage.get(vintage_id, current)
+        if current is not None:
+            frames.append(current.assign(Vintage=vintage_id))
+    if not frames:
+        return forecasts.iloc[:0].drop(columns='Country')
+    return pd.concat(frames, ignore_index=True).drop(columns='Country')
+
+
+def summarize_diff(diff):
+    """Returns the changed cells per indicator and change (a table for the reports)."""
+    summary = diff.pivot_table(index='Indicator', columns='change', values='year', aggfunc='size', fill_value=0)
+    summary = summary.reindex(columns=CHANGES, fill_value=0)
+    summary['countries'] = diff.groupby('Indicator')['Country'].nunique()
+    return summary.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Store AEO source releases as vintages and compare them.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add_parser = commands.add_parser('add', help='Store a source CSV as a vintage and diff it with the last one.')
+    add_parser.add_argument('source', nargs='?', default=SOURCE_FILE, help=f'Source CSV (default: {SOURCE_FILE}).')
+    add_parser.add_argument('--label', help='Id of the vintage (default: v<n>).')
+    commands.add_parser('list', help='List the stored vintages.')
+    diff_parser = commands.add_parser('diff', help='Show the cells that differ between two vintages.')
+    diff_parser.add_argument('old')
+    diff_parser.add_argument('new')
+    diff_parser.add_argument('--output', help='Save the changed cells to this CSV file.')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        entries = load_index()
+        if not entries:
+            print("No vintages stored")
+        for entry in entries:
+            changes = ', '.join(f"{n} {change}" for change, n in entry['changes'].items()) or 'first vintage'
+            print(f"{entry['id']}: {entry['source']} ({entry['added']}), {entry['series']} series; {changes}")
+        return
+
+    if args.command == 'add':
+        start_time = time.perf_counter()
+        entry = add_vintage(args.source, args.label)
+        print(f"{args.source} is vintage {entry['id']} ({time.perf_counter() - start_time:.2f}s)")
+        if entry['previous'] is None:
+            return
+        old_id, new_id = entry['previous'], entry['id']
+    else:
+        old_id, new_id = args.old, args.new
+
+    diff = diff_vintages(old_id, new_id)
+    print(f"\n--- Changed Cells from {old_id} to {new_id} ---")
+    if diff.empty:
+        print("None")
+        return
+    print(summarize_diff(diff).to_markdown(index=False))
+    print(f"\n{len(diff)} cells in {diff[['Country', 'Indicator']].drop_duplicates().shape[0]} series of {diff['Country'].nunique()} countries")
+    print(diff.head(20).to_markdown(index=False, floatfmt='.3f'))
+    if getattr(args, 'output', None):
+        diff.to_csv(args.output, index=False)
+        print(f"\nChanged cells saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()